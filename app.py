@@ -1,23 +1,210 @@
+import hmac
+import logging
+import os
+import random
+import tempfile
+import time
+
 import dash
 from dash import html
 import dash_bootstrap_components as dbc
-from flask import Flask
+from flask import Flask, Response, abort, g, request, stream_with_context
+from auth import verificar_exportacion
 from layout import serve_layout
 from callbacks import register_callbacks
+from bcra_client import cliente
+from cache_deudas import cache
+from cache_figuras import figuras
+from compresion import cachear_estatico, comprimir_respuesta, precomprimidos
+from metricas import bytes_por_componente, registrar_etapa, registrar_payload, registro
+from sql_api import obtener_modelo, vuelo
+from utils.exportacion import FORMATOS
+
+# Logging estructurado opcional: APP_LOG_LEVEL=INFO registra cada etapa, DEBUG además las figuras
+logging.basicConfig(level=os.environ.get("APP_LOG_LEVEL", "WARNING").upper(), format="%(message)s")
 
 server = Flask(__name__)
 server.secret_key = "S3cr3tK3y"
 
+registro.describir("appveraz_callback_segundos", "Duración total de cada callback de Dash (incluye serialización)")
+
+# Fracción de callbacks cuyo payload se desglosa por componente (hay que volver a leer la
+# respuesta y serializar cada valor); los totales salen del largo del cuerpo en todos.
+# APP_MEDIR_PAYLOAD=0 lo apaga, 1 desglosa todos (p. ej. para buscar una regresión)
+MEDIR_PAYLOAD = float(os.environ.get("APP_MEDIR_PAYLOAD", "0.01"))
+
+# Token que /metrics exige al scraper (vacío = sin autenticación, p. ej. puerto solo interno)
+TOKEN_METRICAS = os.environ.get("APP_METRICAS_TOKEN", "")
+
+
+# Assets de la app, bundles de los componentes y favicon de Dash
+RUTAS_ESTATICAS = ("/assets/", "/_dash-component-suites/", "/_favicon.ico")
+
+
+# Flask corre los after_request en orden inverso al de registro: este se registra
+# primero para comprimir al final, después de que _registrar_callback midió el payload
+@server.after_request
+def _comprimir(response):
+    estatico = request.path.startswith(RUTAS_ESTATICAS)
+    if estatico:
+        cachear_estatico(response, request)
+    codificacion = comprimir_respuesta(response, request, estatico)
+    if codificacion and "callback" in g:
+        registro.observar(
+            "appveraz_callback_bytes", response.content_length or 0,
+            callback=g.callback, direccion="salida_comprimida",
+        )
+    return response
+
+
+@server.before_request
+def _iniciar_cronometro():
+    g.inicio_request = time.perf_counter()
+
+
+def _nombre_callback(output):
+    # Las series se etiquetan con la función de Python del callback: el id de salida
+    # lo manda el cliente y con ids con patrón no tiene cota
+    funcion = app.callback_map.get(output, {}).get("callback")
+    return getattr(funcion, "__name__", "desconocido")
+
+
+@server.after_request
+def _registrar_callback(response):
+    if request.path.endswith("/_dash-update-component") and "inicio_request" in g:
+        cuerpo = request.get_json(silent=True) or {}
+        callback = g.callback = _nombre_callback(str(cuerpo.get("output", "")))
+        registro.observar("appveraz_callback_segundos", time.perf_counter() - g.inicio_request, callback=callback)
+        medidas = []
+        if response.status_code == 200 and random.random() < MEDIR_PAYLOAD:
+            medidas = bytes_por_componente(cuerpo, response.get_json(silent=True))
+        registrar_payload(callback, request.content_length or 0, response.calculate_content_length() or 0, medidas)
+    return response
+
+
+@server.teardown_request
+def _publicar_metricas(_error):
+    registro.publicar_pendientes()
+
+
+@server.route("/metrics")
+def metrics():
+    # Solo lee el almacén compartido; con APP_METRICAS_TOKEN pide "Authorization: Bearer <token>"
+    if TOKEN_METRICAS and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {TOKEN_METRICAS}"
+    ):
+        abort(403)
+    return Response(registro.exportar_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@server.route("/exportar/<formato>/<cuit>")
+def exportar(formato, cuit):
+    """
+    Exporta la Tabla Unificada de la última consulta del CUIT, generada en el
+    servidor desde el payload ya guardado (nunca sale a la API del BCRA).
+    Solo para la sesión que hizo la consulta (token de firmar_exportacion).
+    """
+    if formato not in FORMATOS or not cuit.isdigit() or len(cuit) != 11:
+        abort(404)
+    if not verificar_exportacion(request.args.get("token"), cuit):
+        abort(403)
+    modelo = obtener_modelo(cuit, solo_cache=True)
+    if modelo is None or not len(modelo.periodos):
+        abort(404)
+
+    exportador, mimetype = FORMATOS[formato]
+    inicio = time.perf_counter()
+    try:
+        contenido = exportador(modelo)
+    except ImportError:
+        abort(501)
+
+    def enviar():
+        # La etapa incluye el envío: el CSV se genera a medida que se manda
+        try:
+            yield from contenido
+        finally:
+            registrar_etapa("exportar", time.perf_counter() - inicio, formato=formato)
+
+    respuesta = Response(
+        stream_with_context(enviar()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="tabla_unificada_{cuit}.{formato}"'}
+    )
+    # Los archivos temporales se borran al cerrar la respuesta aunque no se lleguen a leer
+    if hasattr(contenido, "close"):
+        respuesta.call_on_close(contenido.close)
+    return respuesta
+
+
+def _estado_proceso():
+    # Caches y contadores en memoria de cada proceso (se exportan con la etiqueta proceso)
+    muestras = [
+        ("appveraz_cache_figuras_" + k, {}, v)
+        for k, v in figuras.estadisticas().items()
+    ]
+    muestras += [("appveraz_singleflight_" + k, {}, v) for k, v in vuelo.estadisticas().items()]
+    muestras += [("appveraz_estaticos_comprimidos_" + k, {}, v) for k, v in precomprimidos.estadisticas().items()]
+    if cliente.latencias is not None:
+        # El presupuesto de hedges se lleva por proceso
+        muestras.append(("appveraz_bcra_fraccion_coberturas", {}, cliente.latencias.resumen()["coberturas"]))
+    return muestras
+
+
+def _estado_caches():
+    # Estado en el almacén compartido: es el mismo para todos los procesos
+    deudas = cache.estadisticas()
+    muestras = [
+        ("appveraz_cache_deudas_entradas", {}, deudas["entradas"]),
+        ("appveraz_cache_deudas_bytes", {}, deudas["bytes"]),
+    ]
+    if cliente.circuito is not None:
+        estado, fallas, _ = cliente.circuito.estado()
+        muestras += [
+            ("appveraz_circuito_abierto", {}, int(estado != "cerrado")),
+            ("appveraz_circuito_fallas", {}, fallas),
+        ]
+    if cliente.latencias is not None:
+        latencias = cliente.latencias.resumen()
+        muestras += [
+            ("appveraz_bcra_latencia_segundos", {"quantile": q}, latencias[f"p{int(q * 100)}"])
+            for q in (0.5, 0.95, 0.99) if latencias["muestras"]
+        ]
+    return muestras
+
+
+registro.agregar_colector(_estado_proceso, por_proceso=True)
+registro.agregar_colector(_estado_caches)
+
+# Las consultas al BCRA que no están en cache corren como jobs en segundo plano, en
+# procesos de larga vida (ver jobs.py)
+try:
+    import diskcache
+    from jobs import GestorJobs
+    background_manager = GestorJobs(
+        diskcache.Cache(os.environ.get("APP_JOBS_DIR", os.path.join(tempfile.gettempdir(), "appveraz_jobs")))
+    )
+except ImportError:
+    background_manager = None
+
 app = dash.Dash(
     __name__,
     server=server,
     external_stylesheets=[dbc.themes.DARKLY],
-    suppress_callback_exceptions=True
+    suppress_callback_exceptions=True,
+    background_callback_manager=background_manager
 )
 app.title = "FV - App Veraz"
 app.layout = serve_layout
 
-register_callbacks(app)
+# APP_RENDER_CLIENTE=1: gráficos y pivot se arman en el navegador desde el modelo compacto
+register_callbacks(
+    app,
+    segundo_plano=background_manager is not None,
+    render_cliente=os.environ.get("APP_RENDER_CLIENTE", "0") == "1"
+)
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # Los procesos del pool de jobs se forkean desde el worker: con otros threads vivos el
+    # hijo puede heredar locks tomados (p. ej. el de SQLite) y colgarse
+    app.run(debug=True, threaded=background_manager is None)
@@ -0,0 +1,386 @@
+/* assets/clientside.js */
+
+(function () {
+    // Paleta corporativa de tres tonos (igual que utils/plot_helpers.py)
+    var CORP_PALETTE = ["#0d6efd", "#DFA83D", "#947F57"];
+    var FUENTE = "Fuente: API BCRA – Central de Deudores";
+    var TRANSICION = {duration: 500, easing: "cubic-in-out"};
+
+    function componente(namespace, tipo, props) {
+        return {namespace: namespace, type: tipo, props: props};
+    }
+
+    function grafico(figura, estilo) {
+        return componente("dash_core_components", "Graph", {
+            figure: figura,
+            config: {responsive: true},
+            style: estilo
+        });
+    }
+
+    // Equivalente a textwrap.wrap(texto, ancho): corta en espacios y guiones,
+    // y parte las palabras más largas que el ancho
+    function envolver(texto, ancho) {
+        var trozos = [];
+        texto.replace(/\s/g, " ").split(/( +)/).forEach(function (parte) {
+            if (!parte) {
+                return;
+            }
+            if (parte.trim() === "") {
+                trozos.push(parte);
+            } else {
+                parte.split(/(?<=[^\W\d_]-)(?=\w)/).forEach(function (t) { trozos.push(t); });
+            }
+        });
+        trozos.reverse();
+
+        var lineas = [];
+        while (trozos.length) {
+            var actual = [];
+            var largo = 0;
+            if (lineas.length && trozos[trozos.length - 1].trim() === "") {
+                trozos.pop();
+            }
+            while (trozos.length && largo + trozos[trozos.length - 1].length <= ancho) {
+                largo += trozos[trozos.length - 1].length;
+                actual.push(trozos.pop());
+            }
+            if (trozos.length && trozos[trozos.length - 1].length > ancho) {
+                var trozo = trozos[trozos.length - 1];
+                var fin = Math.max(ancho - largo, 1);
+                var guion = trozo.lastIndexOf("-", fin - 1);
+                if (guion > 0 && /[^-]/.test(trozo.slice(0, guion))) {
+                    fin = guion + 1;
+                }
+                actual.push(trozo.slice(0, fin));
+                trozos[trozos.length - 1] = trozo.slice(fin);
+            }
+            if (actual.length && actual[actual.length - 1].trim() === "") {
+                actual.pop();
+            }
+            if (actual.length) {
+                lineas.push(actual.join(""));
+            }
+        }
+        return lineas;
+    }
+
+    function miles(valor) {
+        return String(Math.trunc(valor)).replace(/\B(?=(\d{3})+(?!\d))/g, ".");
+    }
+
+    // Como f"{x:.1f}": los empates exactos van al par (toFixed los redondea hacia arriba)
+    function unDecimal(x) {
+        var d = x * 10;
+        var n = Math.floor(d);
+        if (d - n === 0.5 && d / 10 === x) {
+            return ((n % 2 ? n + 1 : n) / 10).toFixed(1);
+        }
+        return x.toFixed(1);
+    }
+
+    function textos(etiquetas, valores, total) {
+        return etiquetas.map(function (etiqueta, i) {
+            return envolver(etiqueta, 20).slice(0, 2).join("<br>") + "<br>" +
+                unDecimal(100 * valores[i] / total) + "% ($ " + miles(valores[i]) + ")";
+        });
+    }
+
+    // Arreglo de {dtype, bdata} (base64 little-endian, ver DeudaColumnar.compacto)
+    var TIPOS = {f8: Float64Array, i4: Int32Array, u1: Uint8Array};
+
+    function tipado(codificado) {
+        var binario = atob(codificado.bdata);
+        var bytes = new Uint8Array(binario.length);
+        for (var i = 0; i < binario.length; i++) {
+            bytes[i] = binario.charCodeAt(i);
+        }
+        return Array.from(new TIPOS[codificado.dtype](bytes.buffer));
+    }
+
+    // Matriz entidad × período de situación + 1 (0 = no figura), aplanada por filas
+    function celdasSituacion(modelo) {
+        var bytes = tipado(modelo.situaciones);
+        if (modelo.situaciones.bits === 8) {
+            return bytes;
+        }
+        var celdas = [];
+        bytes.forEach(function (b) { celdas.push(b >> 4, b & 15); });
+        return celdas;
+    }
+
+    // Registros del período más reciente con monto > 0, ordenados desc (ver _slices_torta)
+    function slicesTorta(modelo) {
+        var entidad = tipado(modelo.ultimo.entidad);
+        var monto = tipado(modelo.ultimo.monto);
+        var situacion = tipado(modelo.ultimo.situacion);
+        var slices = [];
+        for (var i = 0; i < monto.length; i++) {
+            if (monto[i] > 0) {
+                slices.push([modelo.entidades[entidad[i]], monto[i], situacion[i]]);
+            }
+        }
+        return slices.sort(function (a, b) { return b[1] - a[1]; });
+    }
+
+    function agruparOtros(slices, total) {
+        var mayores = [];
+        var otros = 0;
+        slices.forEach(function (s) {
+            if (s[1] / total < 0.03) {
+                otros += s[1];
+            } else {
+                mayores.push(s);
+            }
+        });
+        return [mayores, otros];
+    }
+
+    function columna(filas, i) {
+        return filas.map(function (f) { return f[i]; });
+    }
+
+    // Situaciones para el hover: "-" sin dato (0) y "N/A" para "Otros" (ver _situaciones_hover)
+    function situacionesHover(filas) {
+        return filas.map(function (f) { return f[2] === null ? "N/A" : f[2] || "-"; });
+    }
+
+    function figuraBarras(slices, total, plantilla) {
+        var agrupado = agruparOtros(slices, total);
+        var mayores = agrupado[0];
+        if (agrupado[1] > 0) {
+            mayores.unshift(["Otros", agrupado[1], null]);
+        }
+        // "Otros" (o el mayor) abajo, el resto por situación (numérica y estable, como np.argsort)
+        var primero = mayores[0];
+        var resto = mayores.slice(1).sort(function (a, b) { return a[2] - b[2]; });
+        var ordenados = resto.concat([primero]);
+        var etiquetas = columna(ordenados, 0);
+        var valores = columna(ordenados, 1);
+
+        return {
+            data: [{
+                customdata: situacionesHover(ordenados),
+                hovertemplate: "%{y}<br>Situación: %{customdata}<br>Monto: $%{x:,.0f}<extra></extra>",
+                marker: {
+                    color: etiquetas.map(function (_, i) { return CORP_PALETTE[i % CORP_PALETTE.length]; }),
+                    line: {color: "#2D2D2D", width: 1}
+                },
+                orientation: "h",
+                text: textos(etiquetas, valores, total),
+                textangle: 0,
+                textposition: valores.map(function (v) { return v / total >= 0.10 ? "inside" : "outside"; }),
+                x: valores,
+                y: etiquetas,
+                type: "bar"
+            }],
+            layout: {
+                template: plantilla,
+                yaxis: {title: {text: "Acreedores"}, showticklabels: false, categoryorder: "array",
+                        categoryarray: etiquetas},
+                xaxis: {tickformat: "~s", tickprefix: "$", ticks: "outside", gridcolor: "#424242"},
+                font: {color: "white"},
+                margin: {l: 20, r: 20, t: 0, b: 50},
+                transition: TRANSICION,
+                paper_bgcolor: "rgba(0,0,0,0)",
+                plot_bgcolor: "rgba(0,0,0,0)",
+                showlegend: false,
+                annotations: [{font: {color: "white", size: 11}, showarrow: false, text: FUENTE,
+                               x: 0.5, xref: "paper", y: -0.11, yref: "paper"}]
+            }
+        };
+    }
+
+    function figuraTorta(slices, total, plantilla) {
+        var agrupado = agruparOtros(slices, total);
+        var mayores = agrupado[0];
+        if (agrupado[1] > 0) {
+            mayores.push(["Otros", agrupado[1], null]);
+        }
+        var etiquetas = columna(mayores, 0);
+        var valores = columna(mayores, 1);
+
+        return {
+            data: [{
+                domain: {x: [0, 1], y: [0, 1]},
+                hole: 0.4,
+                hovertemplate: "Situación: %{customdata}<extra></extra>",
+                labels: etiquetas,
+                legendgroup: "",
+                name: "",
+                showlegend: true,
+                values: valores,
+                type: "pie",
+                rotation: 90,
+                textfont: {size: 10},
+                marker: {line: {color: "#2D2D2D", width: 1}},
+                customdata: situacionesHover(mayores),
+                pull: valores.map(function (v) { return v / total < 0.10 ? 0.04 : 0; }),
+                text: textos(etiquetas, valores, total),
+                textinfo: "text",
+                textposition: "outside"
+            }],
+            layout: {
+                template: plantilla,
+                legend: {tracegroupgap: 0},
+                margin: {t: 0, l: 20, r: 20, b: 0},
+                piecolorway: etiquetas.map(function (_, i) { return CORP_PALETTE[i % 3]; }),
+                font: {color: "white"},
+                uniformtext: {mode: "hide", minsize: 8},
+                transition: TRANSICION,
+                paper_bgcolor: "rgba(0,0,0,0)",
+                plot_bgcolor: "rgba(0,0,0,0)",
+                showlegend: false,
+                separators: ".,",
+                annotations: [{font: {color: "white", size: 11}, showarrow: false, text: FUENTE,
+                               x: 0.5, xref: "paper", y: -0.01, yref: "paper"}]
+            }
+        };
+    }
+
+    // Mismo gráfico que crear_grafico_torta: barras horizontales con 6 o más acreedores
+    function figuraDistribucion(modelo, plantilla) {
+        var slices = slicesTorta(modelo);
+        if (!slices.length) {
+            return {};
+        }
+        var total = slices.reduce(function (s, x) { return s + x[1]; }, 0);
+        return slices.length >= 6 ? figuraBarras(slices, total, plantilla) : figuraTorta(slices, total, plantilla);
+    }
+
+    // Mismo gráfico que crear_grafico_evolucion
+    function figuraEvolucion(modelo, plantilla) {
+        var n = modelo.periodos.length;
+        if (!n) {
+            return {};
+        }
+        var totales = tipado(modelo.totales);
+
+        // El modelo viene del más reciente al más antiguo; "YYYY-MM" como el datetime64[M] del servidor
+        var fechas = modelo.periodos.slice().reverse().map(function (p) {
+            var mes = p % 100;
+            return Math.floor(p / 100) + "-" + (mes < 10 ? "0" : "") + mes;
+        });
+        var eneros = fechas.filter(function (f) { return f.slice(5, 7) === "01"; });
+
+        return {
+            data: [{
+                line: {color: "#6da8fd"},
+                mode: "lines+markers",
+                name: "Deuda Total",
+                x: fechas,
+                y: totales.reverse(),
+                type: "scatter"
+            }],
+            layout: {
+                template: plantilla,
+                xaxis: {title: {text: "Mes"}, type: "date", dtick: "M1", tickformat: "%b", showgrid: false,
+                        ticks: "outside"},
+                yaxis: {title: {text: "Deuda en pesos"}, tickformat: "~s", tickprefix: "$", ticks: "outside",
+                        gridcolor: "#5c5c5c"},
+                font: {color: "white"},
+                margin: {l: 40, r: 20, t: 0, b: 100},
+                xaxis2: {
+                    type: "date",
+                    title: {text: ""},
+                    tickmode: "array",
+                    tickvals: eneros,
+                    ticktext: eneros.map(function (f) { return f.slice(0, 4); }),
+                    overlaying: "x",
+                    side: "bottom",
+                    anchor: "y",
+                    position: 0,
+                    layer: "above traces",
+                    showgrid: false,
+                    ticks: "outside",
+                    tickfont: {size: 11, color: "white"}
+                },
+                paper_bgcolor: "rgba(0,0,0,0)",
+                plot_bgcolor: "rgba(0,0,0,0)"
+            }
+        };
+    }
+
+    // Mismo pivot que crear_pivot_table_aggrid (con la configuración de config_pivot)
+    function tablaPivot(modelo, config) {
+        if (!modelo.periodos.length) {
+            return componente("dash_html_components", "Div", {children: "No hay datos para mostrar."});
+        }
+        var colIds = modelo.periodos.map(function (p) {
+            var mes = p % 100;
+            return Math.floor(p / 100) + "-" + (mes < 10 ? "0" : "") + mes;
+        });
+
+        // 1) Una fila por entidad: situación y monto del primer registro (el más reciente)
+        var situacion = tipado(modelo.primero.situacion);
+        var monto = tipado(modelo.primero.monto);
+        var celdas = celdasSituacion(modelo);
+        var filas = modelo.entidades.map(function (nombre, e) {
+            var fila = {"Entidad": nombre, "Situación": situacion[e], "Monto": monto[e]};
+            colIds.forEach(function (c, p) {
+                var celda = celdas[e * colIds.length + p];
+                fila[c] = celda ? celda - 1 : "";
+            });
+            return fila;
+        });
+
+        // 2) Columnas fijas y meses agrupados por año, con el tipo "mes" compartido
+        var colDefs = config.columnasFijas.slice();
+        colIds.forEach(function (colId) {
+            var anio = colId.slice(0, 4);
+            var mes = colId.slice(5);
+            var grupo = colDefs[colDefs.length - 1];
+            if (grupo.headerName !== anio || !grupo.children) {
+                grupo = {headerName: anio, children: [], marryChildren: true};
+                colDefs.push(grupo);
+            }
+            grupo.children.push({headerName: config.meses[mes] || mes, field: colId, type: "mes"});
+        });
+        var opciones = Object.assign({}, config.opciones, {
+            columnTypes: {mes: {flex: config.flexMeses / colIds.length, cellClassRules: config.reglasMes}}
+        });
+
+        return componente("dash_html_components", "Div", {
+            children: componente("dash_ag_grid", "AgGrid", {
+                id: "tabla-ag-grid",
+                columnDefs: colDefs,
+                rowData: filas,
+                defaultColDef: config.defaultColDef,
+                dashGridOptions: opciones
+            }),
+            className: "ag-theme-alpine-dark",
+            style: {width: "100%"}
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        interfaz: {
+            // Mostrar u ocultar la contraseña del login
+            alternar_password: function (n_clicks, tipo) {
+                return tipo === "password" ? "text" : "password";
+            }
+        },
+        // Vistas armadas en el navegador desde el modelo compacto de consulta-modelo
+        render: {
+            torta: function (modelo, plantilla) {
+                if (!modelo) {
+                    return window.dash_clientside.no_update;
+                }
+                return grafico(figuraDistribucion(modelo, plantilla),
+                               {flex: "1 1 auto", minHeight: "0", width: "100%"});
+            },
+            evolucion: function (modelo, plantilla) {
+                if (!modelo) {
+                    return window.dash_clientside.no_update;
+                }
+                return grafico(figuraEvolucion(modelo, plantilla), {width: "100%", height: "100%"});
+            },
+            pivot: function (modelo, config) {
+                if (!modelo) {
+                    return window.dash_clientside.no_update;
+                }
+                return tablaPivot(modelo, config);
+            }
+        }
+    });
+})();
@@ -0,0 +1,48 @@
+/* assets/precarga.js */
+
+(function () {
+    // Espera desde la última tecla antes de pedir la precarga del CUIT
+    var DEMORA_MS = 300;
+    var PESOS = [5, 4, 3, 2, 7, 6, 5, 4, 3, 2];
+
+    var temporizador = null;
+    var resolverPendiente = null;
+
+    function cuitValido(cuit) {
+        if (typeof cuit !== "string" || !/^\d{11}$/.test(cuit)) {
+            return false;
+        }
+        var suma = 0;
+        for (var i = 0; i < 10; i++) {
+            suma += Number(cuit[i]) * PESOS[i];
+        }
+        var resto = suma % 11;
+        var verificador = resto ? 11 - resto : 0;
+        return verificador < 10 && verificador === Number(cuit[10]);
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        precarga: {
+            // Publica el CUIT tipeado recién cuando está completo, es válido y el
+            // usuario dejó de escribir; una tecla nueva descarta la espera anterior
+            cuit_completo: function (cuit) {
+                var sinCambios = window.dash_clientside.no_update;
+                clearTimeout(temporizador);
+                if (resolverPendiente) {
+                    resolverPendiente(sinCambios);
+                    resolverPendiente = null;
+                }
+                if (!cuitValido(cuit)) {
+                    return sinCambios;
+                }
+                return new Promise(function (resolver) {
+                    resolverPendiente = resolver;
+                    temporizador = setTimeout(function () {
+                        resolverPendiente = null;
+                        resolver(cuit);
+                    }, DEMORA_MS);
+                });
+            }
+        }
+    });
+})();
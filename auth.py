@@ -1,7 +1,17 @@
 # auth.py
+import os
 import sqlite3
 import hashlib
 
+from flask import current_app, session
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from metricas import cronometrado
+
+# Vigencia de los enlaces de exportación emitidos por una consulta (segundos)
+VIGENCIA_EXPORTACION = int(os.environ.get("APP_VIGENCIA_EXPORTACION", 8 * 3600))
+
+@cronometrado("verificar_credenciales")
 def verificar_credenciales(usuario, contrasena):
     conn = sqlite3.connect("usuarios.db")
     cursor = conn.cursor()
@@ -15,3 +25,32 @@ def verificar_credenciales(usuario, contrasena):
         if stored_hash == hash_input:
             return username, rol
     return None, None
+
+
+def _firmador():
+    return URLSafeTimedSerializer(current_app.secret_key, salt="exportacion")
+
+
+def firmar_exportacion(cuit):
+    """
+    Token que habilita a exportar el CUIT recién consultado al usuario de la
+    sesión (None sin sesión iniciada). Requiere un request de Flask.
+    """
+    usuario = session.get("usuario")
+    if not usuario:
+        return None
+    return _firmador().dumps([usuario, str(cuit)])
+
+
+def verificar_exportacion(token, cuit):
+    """
+    True si el token lo emitió una consulta del CUIT hecha por el usuario de
+    esta sesión y sigue vigente.
+    """
+    usuario = session.get("usuario")
+    if not usuario or not token:
+        return False
+    try:
+        return _firmador().loads(token, max_age=VIGENCIA_EXPORTACION) == [usuario, str(cuit)]
+    except BadSignature:
+        return False
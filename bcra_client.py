@@ -0,0 +1,342 @@
+# bcra_client.py
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturoVencido
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from circuito import Circuito
+from compartido import LimitadorCompartido
+from latencias import HistorialLatencias
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+# Usamos la IP obtenida por nslookup: 45.235.97.44
+# Se debe incluir en las cabeceras el Host original
+URL_BASE = os.environ.get("BCRA_URL_BASE", "https://45.235.97.44")
+HOST = os.environ.get("BCRA_HOST", "api.bcra.gob.ar")
+RUTA_HISTORICAS = "/CentralDeDeudores/v1.0/Deudas/Historicas/{cuit}"
+
+# Conexiones por proceso: debe acompañar la cantidad de threads de cada worker
+TAMANO_POOL = int(os.environ.get("BCRA_POOL_SIZE", 10))
+TIMEOUT_CONEXION = float(os.environ.get("BCRA_TIMEOUT_CONEXION", 3.05))
+# Timeout de lectura máximo; con suficientes muestras se usa FACTOR_TIMEOUT x p99 observado
+TIMEOUT_LECTURA = float(os.environ.get("BCRA_TIMEOUT_LECTURA", 10))
+TIMEOUT_LECTURA_MIN = float(os.environ.get("BCRA_TIMEOUT_LECTURA_MIN", 2))
+FACTOR_TIMEOUT = float(os.environ.get("BCRA_TIMEOUT_FACTOR", 3))
+REINTENTOS = int(os.environ.get("BCRA_REINTENTOS", 2))
+BACKOFF_BASE = float(os.environ.get("BCRA_BACKOFF_BASE", 0.25))
+BACKOFF_MAX = float(os.environ.get("BCRA_BACKOFF_MAX", 4))
+# Tasa máxima de requests salientes sumando todos los workers y jobs (0 = sin límite)
+MAX_RPS = float(os.environ.get("BCRA_MAX_RPS", 0))
+# Hedging: si un request supera el p95 observado se lanza un duplicado y gana el primero
+COBERTURA = os.environ.get("BCRA_COBERTURA", "1") == "1"
+# Fracción máxima de requests que pueden ser duplicados (carga extra sobre la API)
+PRESUPUESTO_COBERTURA = float(os.environ.get("BCRA_COBERTURA_PRESUPUESTO", 0.05))
+# Muestras necesarias antes de confiar en los percentiles (hasta entonces: sin hedge y timeout máximo)
+MIN_MUESTRAS = int(os.environ.get("BCRA_LATENCIAS_MIN_MUESTRAS", 20))
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class ErrorBCRA(Exception):
+    """Error base de la API de la Central de Deudores."""
+
+
+class TimeoutBCRA(ErrorBCRA):
+    """La API no respondió dentro del timeout de conexión o lectura."""
+
+
+class ConexionBCRA(ErrorBCRA):
+    """No se pudo establecer o se cortó la conexión con la API."""
+
+
+class SinDatosBCRA(ErrorBCRA):
+    """La API respondió 404: el CUIT no tiene información."""
+
+
+class RespuestaBCRA(ErrorBCRA):
+    """La API respondió con un estado HTTP de error o un cuerpo inválido."""
+
+    def __init__(self, mensaje, status=None):
+        super().__init__(mensaje)
+        self.status = status
+
+
+class CircuitoAbiertoBCRA(ErrorBCRA):
+    """La API viene fallando: el circuito está abierto y no se la consulta."""
+
+
+class LimitadorTasa:
+    """
+    Token bucket: permite hasta `tasa` requests por segundo con ráfagas de `rafaga`.
+    """
+
+    def __init__(self, tasa, rafaga=None):
+        self.tasa = float(tasa)
+        self.rafaga = float(rafaga or max(1.0, self.tasa))
+        self._tokens = self.rafaga
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _tomar(self):
+        # Devuelve 0 si tomó un token o los segundos que faltan para el próximo
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.tasa
+
+    def adquirir(self):
+        """
+        Bloquea hasta obtener un token.
+        """
+        while True:
+            espera = self._tomar()
+            if not espera:
+                return
+            time.sleep(espera)
+
+    def intentar(self):
+        """
+        Toma un token sin bloquear. Devuelve 0 si lo obtuvo o los segundos a
+        esperar hasta que haya uno disponible.
+        """
+        return self._tomar()
+
+
+class LimitadorCombinado:
+    """
+    Respeta a la vez varios limitadores (p. ej. el compartido entre procesos y
+    uno propio más estricto): la tasa efectiva es la del más restrictivo.
+    """
+
+    def __init__(self, *limitadores):
+        self.limitadores = [limitador for limitador in limitadores if limitador is not None]
+
+    def adquirir(self):
+        # En orden: conviene poner primero el local, para no esperar con un token compartido tomado
+        for limitador in self.limitadores:
+            limitador.adquirir()
+
+
+def decodificar_json(contenido):
+    if orjson is not None:
+        return orjson.loads(contenido)
+    return json.loads(contenido)
+
+
+class ClienteBCRA:
+    """
+    Cliente HTTP reutilizable para la API del BCRA: pool de conexiones
+    keep-alive compartido (reutiliza las sesiones TLS), timeouts configurables
+    y reintentos con backoff exponencial con jitter ante fallas idempotentes.
+
+    Con `latencias` el timeout de lectura se adapta a los percentiles
+    observados y, con `cobertura`, los requests que superan el p95 se duplican
+    (hedging) dentro de `presupuesto_cobertura`.
+    """
+
+    def __init__(self, url_base=URL_BASE, host=HOST, tamano_pool=TAMANO_POOL,
+                 timeout_conexion=TIMEOUT_CONEXION, timeout_lectura=TIMEOUT_LECTURA,
+                 reintentos=REINTENTOS, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 max_rps=MAX_RPS, circuito=None, latencias=None, cobertura=COBERTURA,
+                 presupuesto_cobertura=PRESUPUESTO_COBERTURA, limitador=None):
+        self.url_base = url_base.rstrip("/")
+        self.host = host
+        self.tamano_pool = tamano_pool
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.timeout_lectura_min = min(TIMEOUT_LECTURA_MIN, timeout_lectura)
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Sin un limitador explícito (p. ej. uno compartido entre procesos) se limita este proceso
+        self.limitador = limitador or (LimitadorTasa(max_rps) if max_rps else None)
+        self.circuito = circuito
+        self.latencias = latencias
+        self.cobertura = cobertura
+        self.presupuesto_cobertura = presupuesto_cobertura
+        self._sesion = None
+        self._pid = None
+        self._hilos = None
+        self._lock = threading.Lock()
+
+    def _obtener_sesion(self):
+        # La sesión se crea por proceso: los sockets no deben compartirse tras un fork
+        pid = os.getpid()
+        if self._sesion is None or self._pid != pid:
+            with self._lock:
+                if self._sesion is None or self._pid != pid:
+                    sesion = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.tamano_pool,
+                        pool_block=False,
+                        max_retries=0
+                    )
+                    sesion.mount("https://", adapter)
+                    sesion.mount("http://", adapter)
+                    sesion.verify = False
+                    sesion.headers.update({
+                        "Accept": "application/json",
+                        "Accept-Encoding": "gzip, deflate",
+                        "Host": self.host,
+                    })
+                    self._sesion, self._pid = sesion, pid
+        return self._sesion
+
+    def _espera(self, intento):
+        # Backoff exponencial con "full jitter"
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+
+    def _obtener_hilos(self):
+        # Threads para los requests duplicados, también por proceso
+        pid = os.getpid()
+        if self._hilos is None or self._hilos[1] != pid:
+            with self._lock:
+                if self._hilos is None or self._hilos[1] != pid:
+                    self._hilos = (ThreadPoolExecutor(self.tamano_pool, thread_name_prefix="bcra"), pid)
+        return self._hilos[0]
+
+    def _get(self, ruta, timeout=None):
+        url = self.url_base + ruta
+        if self.limitador is not None:
+            self.limitador.adquirir()
+        try:
+            response = self._obtener_sesion().get(url, timeout=timeout or self.timeout)
+        except requests.Timeout as e:
+            raise TimeoutBCRA(f"Tiempo de espera agotado consultando la API del BCRA ({e})") from e
+        except requests.ConnectionError as e:
+            raise ConexionBCRA(f"No se pudo conectar con la API del BCRA ({e})") from e
+        except requests.RequestException as e:
+            raise ErrorBCRA(str(e)) from e
+
+        if response.status_code == 404:
+            raise SinDatosBCRA("El CUIT consultado no tiene información disponible.")
+        if response.status_code >= 400:
+            raise RespuestaBCRA(
+                f"La API del BCRA respondió {response.status_code} {response.reason}",
+                status=response.status_code
+            )
+        try:
+            return decodificar_json(response.content)
+        except ValueError as e:
+            raise RespuestaBCRA(f"Respuesta inválida de la API del BCRA ({e})", status=response.status_code) from e
+
+    def _es_reintentable(self, error):
+        if isinstance(error, (TimeoutBCRA, ConexionBCRA)):
+            return True
+        return isinstance(error, RespuestaBCRA) and error.status is not None and (
+            error.status >= 500 or error.status == 429
+        )
+
+    def _get_medido(self, ruta, timeout, cobertura=False):
+        inicio = time.monotonic()
+        try:
+            data = self._get(ruta, timeout)
+        except (TimeoutBCRA, SinDatosBCRA):
+            # Timeouts y 404 también son latencia observada; las fallas rápidas (conexión rechazada) no
+            self.latencias.registrar(time.monotonic() - inicio, cobertura)
+            raise
+        self.latencias.registrar(time.monotonic() - inicio, cobertura)
+        return data
+
+    def _get_cubierto(self, ruta):
+        """
+        GET con timeout adaptativo y, si el request se demora más que el p95
+        observado y hay presupuesto, un duplicado: gana la primera respuesta.
+        """
+        if self.latencias is None:
+            return self._get(ruta)
+        self.latencias.lanzado()
+        resumen = self.latencias.resumen()
+        if resumen["muestras"] < MIN_MUESTRAS:
+            return self._get_medido(ruta, self.timeout)
+
+        lectura = min(self.timeout[1], max(self.timeout_lectura_min, FACTOR_TIMEOUT * resumen["p99"]))
+        timeout = (self.timeout[0], lectura)
+        if not self.cobertura or resumen["coberturas"] >= self.presupuesto_cobertura:
+            return self._get_medido(ruta, timeout)
+
+        hilos = self._obtener_hilos()
+        original = hilos.submit(self._get_medido, ruta, timeout)
+        try:
+            return original.result(timeout=resumen["p95"])
+        except FuturoVencido:
+            pass
+        # El hedge cuenta para el presupuesto al lanzarlo, aunque termine en un error de conexión
+        self.latencias.lanzado(cobertura=True)
+        pendientes = {original, hilos.submit(self._get_medido, ruta, timeout, True)}
+        error = None
+        while pendientes:
+            listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                e = futuro.exception()
+                if e is None:
+                    return futuro.result()
+                # Un 404 es la respuesta: no tiene sentido esperar al otro
+                if not self._es_reintentable(e):
+                    raise e
+                error = e
+        raise error
+
+    def _get_con_circuito(self, ruta):
+        if self.circuito is None:
+            return self._get_cubierto(ruta)
+        if not self.circuito.permitir():
+            raise CircuitoAbiertoBCRA("La API del BCRA no está respondiendo; se reintentará en unos segundos.")
+        inicio = time.monotonic()
+        try:
+            data = self._get_cubierto(ruta)
+        except ErrorBCRA as e:
+            # Un 404 o un 4xx son respuestas válidas: la API está funcionando
+            self.circuito.registrar(not self._es_reintentable(e))
+            raise
+        self.circuito.registrar(True, time.monotonic() - inicio)
+        return data
+
+    def circuito_abierto(self):
+        return self.circuito is not None and self.circuito.abierto()
+
+    def get_json(self, ruta):
+        """
+        GET idempotente con reintentos. Levanta una subclase de ErrorBCRA si falla
+        (CircuitoAbiertoBCRA, sin esperar, si la API viene fallando).
+        """
+        intento = 0
+        while True:
+            try:
+                return self._get_con_circuito(ruta)
+            except CircuitoAbiertoBCRA:
+                raise
+            except ErrorBCRA as e:
+                if intento >= self.reintentos or not self._es_reintentable(e):
+                    raise
+                time.sleep(self._espera(intento))
+                intento += 1
+
+    def deudas_historicas(self, cuit):
+        """
+        Devuelve el bloque 'results' de Deudas/Historicas para el CUIT.
+        """
+        data = self.get_json(RUTA_HISTORICAS.format(cuit=cuit))
+        return data.get("results") or {}
+
+
+cliente = ClienteBCRA(
+    circuito=Circuito("bcra"),
+    latencias=HistorialLatencias("bcra"),
+    limitador=LimitadorCompartido("bcra", MAX_RPS) if MAX_RPS else None,
+)
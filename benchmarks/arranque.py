@@ -0,0 +1,111 @@
+# benchmarks/arranque.py
+"""
+Arranque de un worker: cuánto tarda en importar la app y en dar su primera
+respuesta completa (consulta de un deudor en cache, gráficos, detalle).
+Compara un worker que arranca en frío (intérprete nuevo que importa todo)
+con uno forkeado de un maestro precalentado por wsgi.py, como hace
+gunicorn con preload_app: es lo que se paga al sumar workers en una ráfaga.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.arranque --repeticiones 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.presupuesto_payload import medir_consulta, preparar_entorno
+
+# Cada worker arma sus figuras: sin el cache compartido el primero no le deja trabajo hecho al resto
+os.environ["FIGURAS_CACHE_COMPARTIDO"] = "0"
+
+CODIGO_FRIO = """
+import sys, time
+inicio = time.perf_counter()
+from benchmarks.presupuesto_payload import medir_consulta, preparar_entorno
+preparar_entorno(sys.argv[1], False)
+import app
+print(time.perf_counter() - inicio, flush=True)
+medir_consulta(int(sys.argv[2]), int(sys.argv[3]))
+print("listo", flush=True)
+"""
+
+
+def arranque_frio(entidades, meses):
+    """
+    (segundos de import de la app, segundos hasta la primera respuesta),
+    medidos desde que se lanza el intérprete.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(
+            [sys.executable, "-c", CODIGO_FRIO, directorio, str(entidades), str(meses)],
+            stdout=subprocess.PIPE, text=True
+        )
+        importado = float(proceso.stdout.readline())
+        proceso.stdout.readline()
+        primera = time.perf_counter() - inicio
+        proceso.wait()
+    return importado, primera
+
+
+def arranque_forkeado(entidades, meses):
+    """
+    Segundos desde el fork (en un maestro ya precalentado) hasta que el
+    worker da su primera respuesta.
+    """
+    from wsgi import al_forkear
+
+    lectura, escritura = os.pipe()
+    inicio = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        os.close(lectura)
+        try:
+            al_forkear()
+            medir_consulta(entidades, meses)
+            os.write(escritura, b"1")
+        finally:
+            os._exit(0)
+    os.close(escritura)
+    os.read(lectura, 1)
+    primera = time.perf_counter() - inicio
+    os.close(lectura)
+    os.waitpid(pid, 0)
+    return primera
+
+
+def _resumen(valores):
+    return f"{statistics.median(valores):>9.3f} {min(valores):>9.3f} {max(valores):>9.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--entidades", type=int, default=20)
+    parser.add_argument("--meses", type=int, default=24)
+    args = parser.parse_args()
+
+    # 1) Workers en frío: cada uno importa y precalienta por su cuenta
+    frios = [arranque_frio(args.entidades, args.meses) for _ in range(args.repeticiones)]
+
+    # 2) Maestro precalentado una vez y workers forkeados
+    with tempfile.TemporaryDirectory() as directorio:
+        preparar_entorno(directorio, False)
+        inicio = time.perf_counter()
+        import wsgi  # noqa: F401  (importa la app y la precalienta)
+        maestro = time.perf_counter() - inicio
+        forkeados = [arranque_forkeado(args.entidades, args.meses) for _ in range(args.repeticiones)]
+
+    print(f"{'segundos':<40} {'mediana':>9} {'min':>9} {'max':>9}")
+    print(f"{'frío: import de la app':<40} {_resumen([f[0] for f in frios])}")
+    print(f"{'frío: hasta la primera respuesta':<40} {_resumen([f[1] for f in frios])}")
+    print(f"{'maestro: import + precalentamiento':<40} {maestro:>9.3f}")
+    print(f"{'forkeado: hasta la primera respuesta':<40} {_resumen(forkeados)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_pivot.py
+"""
+Compara el pivot vectorizado de crear_pivot_table_aggrid con el constructor
+anterior (dicts anidados + DataFrame, sin cambios) y verifica que la salida
+sea idéntica salvo el redondeo de los montos (round en vez de int).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_pivot
+"""
+import timeit
+
+import pandas as pd
+
+from benchmarks.generador import generar_periodos
+from utils.data_tables_aggrid import crear_pivot_table_aggrid
+from utils.modelo_deuda import normalizar_periodos
+
+
+def pivot_anterior(periodos):
+    """
+    Constructor previo (copiado sin cambios de crear_pivot_table_aggrid) como referencia.
+    """
+    # 1) Organizar años y meses disponibles y cargar datos crudos
+    columnas_por_anio = {}
+    raw_data = {}
+    for p in periodos:
+        periodo = p.get("periodo", "")
+        if len(periodo) == 5:
+            periodo = periodo[:4] + periodo[4:].zfill(2)
+        if len(periodo) == 6:
+            anio, mes = periodo[:4], periodo[4:6]
+            columnas_por_anio.setdefault(anio, set()).add(mes)
+            for ent in p.get("entidades", []):
+                entidad = ent.get("entidad", "")
+                monto = ent.get("monto", 0) * 1000
+                situacion = ent.get("situacion", 0) or 0
+                if entidad not in raw_data:
+                    raw_data[entidad] = {
+                        "Entidad": entidad,
+                        "Situación": situacion,
+                        "Monto": monto,
+                        "hist": {}
+                    }
+                raw_data[entidad]["hist"][(anio, mes)] = situacion
+
+    sorted_anios = sorted(columnas_por_anio.keys(), reverse=True)
+    for anio in sorted_anios:
+        columnas_por_anio[anio] = sorted(columnas_por_anio[anio], reverse=True)
+
+    # 2) Construir registros para AgGrid
+    registros = []
+    for data in raw_data.values():
+        fila = {
+            "Entidad": data["Entidad"],
+            "Situación": data["Situación"],
+            "Monto": int(data["Monto"])
+        }
+        for anio in sorted_anios:
+            for mes in columnas_por_anio[anio]:
+                key = f"{anio}-{mes}"
+                fila[key] = data["hist"].get((anio, mes), "")
+        registros.append(fila)
+
+    df = pd.DataFrame(registros)
+    columnas = [f"{a}-{m}" for a in sorted_anios for m in columnas_por_anio[a]]
+    return columnas, df.to_dict("records")
+
+
+def pivot_nuevo(periodos):
+    return normalizar_periodos(periodos).pivot()
+
+
+def iguales_salvo_redondeo(nuevas, anteriores):
+    """
+    Mismas filas salvo "Monto": el modelo redondea (round) donde el constructor
+    anterior truncaba (int), así que 4.35 * 1000 = 4349.99… da 4350 y no 4349.
+    """
+    if len(nuevas) != len(anteriores):
+        return False
+    for nueva, anterior in zip(nuevas, anteriores):
+        if {**nueva, "Monto": None} != {**anterior, "Monto": None}:
+            return False
+        if not 0 <= nueva["Monto"] - anterior["Monto"] <= 1:
+            return False
+    return True
+
+
+def main():
+    escalas = [(10, 24), (50, 36), (500, 60)]
+    print(f"{'escala':>10} {'anterior (ms)':>14} {'nuevo (ms)':>11} {'x':>6}")
+    for n_ent, n_meses in escalas:
+        periodos = generar_periodos(n_ent, n_meses)
+
+        # 1) Salida idéntica (filas y columnas), salvo el redondeo de los montos
+        columnas, filas = pivot_nuevo(periodos)
+        columnas_anteriores, filas_anteriores = pivot_anterior(periodos)
+        assert columnas == columnas_anteriores, f"columnas distintas en {n_ent}x{n_meses}"
+        assert iguales_salvo_redondeo(filas, filas_anteriores), f"pivot distinto en {n_ent}x{n_meses}"
+        grid = crear_pivot_table_aggrid(periodos).children
+        assert iguales_salvo_redondeo(grid.rowData, filas_anteriores)
+
+        # 2) Tiempos
+        repeticiones = 20
+        anterior = min(timeit.repeat(lambda: pivot_anterior(periodos), number=1, repeat=repeticiones))
+        nuevo = min(timeit.repeat(lambda: pivot_nuevo(periodos), number=1, repeat=repeticiones))
+        print(f"{n_ent:>4}x{n_meses:<5} {anterior * 1000:>14.2f} {nuevo * 1000:>11.2f} {anterior / nuevo:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
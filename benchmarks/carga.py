@@ -0,0 +1,393 @@
+# benchmarks/carga.py
+"""
+Prueba de carga de punta a punta: N usuarios virtuales concurrentes que
+hacen login y consultan CUITs contra /_dash-update-component como lo haría
+el navegador (incluido el sondeo de los callbacks en segundo plano), piden
+la primera página del detalle y a veces exportan el Excel. Con --tipeo se
+simula además la precarga que dispara el CUIT completo antes del Enter.
+
+Uso (desde la raíz del repo, con la app y el servidor de prueba levantados):
+    python -m benchmarks.servidor_bcra --latencia lognormal:150,0.6 &
+    BCRA_URL_BASE=http://127.0.0.1:8765 python app.py &
+    python -m benchmarks.carga --url http://127.0.0.1:8050 --usuarios 20 --duracion 60
+
+Barrido de workers x threads (la herramienta levanta y baja cada configuración):
+    python -m benchmarks.carga --usuarios 40 --duracion 60 --upstream http://127.0.0.1:8765 \\
+        --barrido 1x1,2x1,4x1,8x1
+    Por defecto cada configuración se levanta como en producción
+    (gunicorn -c gunicorn.conf.py wsgi:server, con APP_WORKERS, APP_THREADS y
+    APP_BIND en el entorno); --comando acepta {workers}, {threads} y {puerto}.
+    Con los callbacks en segundo plano activos (diskcache) gunicorn.conf.py
+    deja un solo thread por worker: el pool de jobs se forkea desde el worker.
+
+Las credenciales se toman de --usuario/--contrasena o de CARGA_USUARIO/CARGA_CONTRASENA.
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.generador import cuits_sinteticos
+
+CUANTILES = (0.5, 0.95, 0.99)
+
+
+def _separar_salidas(clave):
+    # "..a.children...b.data.." -> [{"id": "a", "property": "children"}, ...]
+    partes = clave[2:-2].split("...") if clave.startswith("..") else [clave]
+    salidas = []
+    for parte in partes:
+        id_, _, prop = parte.rpartition(".")
+        if id_.startswith("{"):
+            id_ = json.loads(id_)
+        salidas.append({"id": id_, "property": prop.split("@")[0]})
+    return salidas
+
+
+class Callbacks:
+    """
+    Callbacks del servidor según /_dash-dependencies, indexados por el id
+    del primer Input; los que comparten Input se distinguen por la salida.
+    """
+
+    def __init__(self, url, dependencias=None):
+        if dependencias is None:
+            dependencias = requests.get(url + "/_dash-dependencies", timeout=30).json()
+        self.por_entrada = {}
+        for dep in dependencias:
+            if dep.get("clientside_function"):
+                continue
+            entrada = dep["inputs"][0]["id"]
+            if entrada.startswith("{"):
+                entrada = json.loads(entrada)["type"]
+            self.por_entrada.setdefault(entrada, []).append(dep)
+
+    def _dependencia(self, entrada, salida=None):
+        return next(d for d in self.por_entrada[entrada] if salida is None or salida in d["output"])
+
+    def cuerpo(self, entrada, inputs, state=(), id_patron=None, salida=None):
+        dep = self._dependencia(entrada, salida)
+        salidas = _separar_salidas(dep["output"])
+        if id_patron is not None:
+            for salida in salidas:
+                salida["id"] = id_patron
+        id_cambiado = inputs[0]["id"]
+        if isinstance(id_cambiado, dict):
+            id_cambiado = json.dumps(id_cambiado, sort_keys=True, separators=(",", ":"))
+        return {
+            "output": dep["output"],
+            "outputs": salidas if len(salidas) > 1 else salidas[0],
+            "inputs": list(inputs),
+            "state": list(state),
+            "changedPropIds": [f"{id_cambiado}.{inputs[0]['property']}"],
+        }
+
+    def intervalo(self, entrada):
+        return (self._dependencia(entrada).get("background") or {}).get("interval", 1000) / 1000
+
+
+class Resultados:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.muestras = {}
+
+    def registrar(self, nombre, segundos, bytes_respuesta, ok):
+        with self._lock:
+            self.muestras.setdefault(nombre, []).append((segundos, bytes_respuesta, ok))
+
+    def resumen(self, duracion):
+        resumen = {}
+        for nombre, muestras in sorted(self.muestras.items()):
+            tiempos = sorted(m[0] for m in muestras)
+            errores = sum(1 for m in muestras if not m[2])
+            resumen[nombre] = {
+                "n": len(muestras),
+                "rps": round(len(muestras) / duracion, 2),
+                **{f"p{int(q * 100)}_ms": round(tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))] * 1000, 1)
+                   for q in CUANTILES},
+                "tasa_errores": round(errores / len(muestras), 4),
+                "bytes_promedio": round(sum(m[1] for m in muestras) / len(muestras)),
+            }
+        return resumen
+
+
+class UsuarioVirtual:
+    def __init__(self, url, callbacks, resultados, args, semilla):
+        self.url = url
+        self.callbacks = callbacks
+        self.resultados = resultados
+        self.args = args
+        self.rng = random.Random(semilla)
+        self.sesion = requests.Session()
+        self.actual = None
+
+    def _post(self, nombre, cuerpo, params=None, validar=None):
+        inicio = time.perf_counter()
+        try:
+            r = self.sesion.post(self.url + "/_dash-update-component", json=cuerpo, params=params,
+                                 timeout=self.args.timeout)
+        except requests.RequestException:
+            self.resultados.registrar(nombre, time.perf_counter() - inicio, 0, False)
+            return None
+        ok = r.status_code in (200, 204) and (validar is None or validar(r))
+        self.resultados.registrar(nombre, time.perf_counter() - inicio, len(r.content), ok)
+        return r
+
+    def login(self):
+        cuerpo = self.callbacks.cuerpo(
+            "login-button",
+            [{"id": "login-button", "property": "n_clicks", "value": 1},
+             {"id": "login-username", "property": "n_submit", "value": None},
+             {"id": "login-password", "property": "n_submit", "value": None}],
+            [{"id": "login-username", "property": "value", "value": self.args.usuario},
+             {"id": "login-password", "property": "value", "value": self.args.contrasena}],
+        )
+        # Con credenciales inválidas el callback responde 200 pero no setea current-user
+        r = self._post("login", cuerpo, validar=lambda r: (r.json()["response"].get("current-user") or {}).get("data"))
+        return r is not None
+
+    def consultar(self, cuit):
+        """
+        consulta-datos de la consulta completa, o None si algo falló.
+        """
+        inicio = time.perf_counter()
+        cuerpo = self.callbacks.cuerpo(
+            "consultar-button",
+            [{"id": "consultar-button", "property": "n_clicks", "value": 1},
+             {"id": "input-cuit", "property": "n_submit", "value": None}],
+            [{"id": "input-cuit", "property": "value", "value": cuit}],
+        )
+        r = self._post("ejecutar_consulta", cuerpo)
+        if r is None or r.status_code != 200:
+            self.resultados.registrar("consulta_total", time.perf_counter() - inicio, 0, False)
+            return False
+        respuesta = r.json()["response"]
+        pendiente = respuesta.get("consulta-pendiente", {}).get("data")
+        if pendiente is not None:
+            respuesta = self._segundo_plano("consulta-pendiente", pendiente, "consulta_segundo_plano")
+        ok = respuesta is not None and "consulta-datos" in respuesta
+        self.resultados.registrar("primer_contenido", time.perf_counter() - inicio, 0, ok)
+        datos = respuesta["consulta-datos"]["data"] if ok else None
+        # CUIT y token de exportación de la consulta (como los enlaces del menú)
+        self.actual = respuesta.get("consulta-actual", {}).get("data") if ok else None
+        if ok:
+            ok = self._vistas(datos)
+        self.resultados.registrar("consulta_total", time.perf_counter() - inicio, 0, ok)
+        return datos if ok else None
+
+    def _vistas(self, datos):
+        """
+        Gráficos y detalle: callbacks encadenados que el navegador pide en
+        paralelo (los que se arman en el navegador no pasan por el servidor).
+        """
+        resultados = {}
+
+        def pedir(salida):
+            cuerpo = self.callbacks.cuerpo(
+                "consulta-datos", [{"id": "consulta-datos", "property": "data", "value": datos}], salida=salida
+            )
+            r = self._post("vista_" + salida.replace("-", "_"), cuerpo)
+            resultados[salida] = r is not None and r.status_code == 200
+
+        salidas = [_separar_salidas(d["output"])[0]["id"] for d in self.callbacks.por_entrada.get("consulta-datos", [])]
+        hilos = [threading.Thread(target=pedir, args=(s,)) for s in salidas]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return all(resultados.values())
+
+    def precargar(self, cuit):
+        """
+        Lo que dispara el navegador cuando el CUIT tipeado queda completo: el
+        job de precarga corre en paralelo mientras el usuario llega al Enter.
+        """
+        cuerpo = self.callbacks.cuerpo(
+            "cuit-completo", [{"id": "cuit-completo", "property": "data", "value": cuit}]
+        )
+        r = self._post("precarga", cuerpo)
+        if r is None or r.status_code != 200:
+            return None
+        pendiente = r.json()["response"]["precarga-pendiente"]["data"]
+        hilo = threading.Thread(
+            target=self._segundo_plano, args=("precarga-pendiente", pendiente, "precarga_segundo_plano", "sondeo_precarga"),
+            daemon=True
+        )
+        hilo.start()
+        return hilo
+
+    def _segundo_plano(self, entrada, pendiente, nombre, nombre_sondeo="sondeo"):
+        cuerpo = self.callbacks.cuerpo(entrada, [{"id": entrada, "property": "data", "value": pendiente}])
+        r = self._post(nombre, cuerpo)
+        if r is None or r.status_code != 200:
+            return None
+        datos = r.json()
+        if "response" in datos:
+            # Sin administrador de jobs el callback responde directamente
+            return datos["response"]
+        intervalo = self.args.intervalo_sondeo or self.callbacks.intervalo(entrada)
+        limite = time.monotonic() + self.args.timeout
+        while time.monotonic() < limite:
+            time.sleep(intervalo)
+            r = self._post(nombre_sondeo, cuerpo, params={"cacheKey": datos["cacheKey"], "job": datos["job"]})
+            if r is None or r.status_code not in (200, 204):
+                return None
+            if r.status_code == 200 and "response" in r.json():
+                return r.json()["response"]
+        return None
+
+    def detalle(self, datos):
+        id_grilla = {"cuit": datos["cuit"], "huella": datos["huella"], "type": "tabla-detalle-grid"}
+        cuerpo = self.callbacks.cuerpo(
+            "tabla-detalle-grid",
+            [{"id": id_grilla, "property": "getRowsRequest",
+              "value": {"startRow": 0, "endRow": 100, "sortModel": [], "filterModel": {}}}],
+            id_patron=id_grilla,
+        )
+        self._post("pagina_detalle", cuerpo)
+
+    def exportar(self, cuit):
+        inicio = time.perf_counter()
+        token = (self.actual or {}).get("token")
+        try:
+            r = self.sesion.get(f"{self.url}/exportar/xlsx/{cuit}", params={"token": token}, timeout=self.args.timeout)
+            self.resultados.registrar("exportar_xlsx", time.perf_counter() - inicio, len(r.content), r.status_code == 200)
+        except requests.RequestException:
+            self.resultados.registrar("exportar_xlsx", time.perf_counter() - inicio, 0, False)
+
+    def correr(self, cuits, fin):
+        self.login()
+        while time.monotonic() < fin:
+            cuit = self.rng.choice(cuits)
+            if self.args.tipeo:
+                self.precargar(cuit)
+                time.sleep(self.args.tipeo)
+            datos = self.consultar(cuit)
+            if datos:
+                self.detalle(datos)
+                if self.rng.random() < self.args.prob_exportar:
+                    self.exportar(cuit)
+            if self.args.pausa:
+                time.sleep(self.rng.expovariate(1 / self.args.pausa))
+
+
+def correr_carga(url, args):
+    callbacks = Callbacks(url)
+    resultados = Resultados()
+    cuits = cuits_sinteticos(args.cuits, semilla=args.semilla)
+    fin = time.monotonic() + args.duracion
+    hilos = [
+        threading.Thread(target=UsuarioVirtual(url, callbacks, resultados, args, args.semilla + i).correr,
+                         args=(cuits, fin), daemon=True)
+        for i in range(args.usuarios)
+    ]
+    inicio = time.monotonic()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados.resumen(time.monotonic() - inicio)
+
+
+def imprimir(resumen, titulo=None):
+    if titulo:
+        print(f"\n== {titulo}")
+    print(f"{'callback':<24}{'n':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}{'bytes':>11}")
+    for nombre, r in resumen.items():
+        print(f"{nombre:<24}{r['n']:>7}{r['rps']:>9.2f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['tasa_errores']:>9.2%}{r['bytes_promedio']:>11}")
+
+
+def _esperar_listo(url, proceso, limite=60):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"La app terminó con código {proceso.returncode}")
+        try:
+            if requests.get(url + "/_dash-dependencies", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("La app no respondió a tiempo")
+
+
+def barrer(args):
+    """
+    Levanta la app con cada configuración workers x threads, corre la misma
+    carga y devuelve los resúmenes por configuración.
+    """
+    entorno = dict(os.environ)
+    if args.upstream:
+        entorno["BCRA_URL_BASE"] = args.upstream
+    resultados = {}
+    for config in args.barrido.split(","):
+        workers, threads = (int(x) for x in config.split("x"))
+        comando = args.comando.format(workers=workers, threads=threads, puerto=args.puerto)
+        url = f"http://127.0.0.1:{args.puerto}"
+        entorno.update(APP_WORKERS=str(workers), APP_THREADS=str(threads), APP_BIND=f"127.0.0.1:{args.puerto}")
+        proceso = subprocess.Popen(shlex.split(comando), env=entorno,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _esperar_listo(url, proceso)
+            resultados[config] = correr_carga(url, args)
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+        imprimir(resultados[config], f"{workers} workers x {threads} threads")
+
+    print(f"\n{'config':<10}{'consultas/s':>13}{'p95 consulta ms':>17}{'p99 consulta ms':>17}{'errores':>9}")
+    for config, resumen in resultados.items():
+        total = resumen.get("consulta_total", {"rps": 0, "p95_ms": 0, "p99_ms": 0, "tasa_errores": 1})
+        print(f"{config:<10}{total['rps']:>13.2f}{total['p95_ms']:>17.1f}{total['p99_ms']:>17.1f}"
+              f"{total['tasa_errores']:>9.2%}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de los callbacks de la app")
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="App ya levantada (sin --barrido)")
+    parser.add_argument("--usuarios", type=int, default=10, help="Usuarios virtuales concurrentes")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--cuits", type=int, default=200,
+                        help="CUIT distintos a consultar (menos CUIT = más aciertos de cache)")
+    parser.add_argument("--prob-exportar", type=float, default=0.1, help="Probabilidad de exportar tras consultar")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Pausa media entre consultas de un usuario (s)")
+    parser.add_argument("--intervalo-sondeo", type=float, default=None,
+                        help="Segundos entre sondeos de un job (por defecto el intervalo del callback)")
+    parser.add_argument("--tipeo", type=float, default=0,
+                        help="Segundos entre el CUIT completo (precarga) y el Enter (0 = sin precarga)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--usuario", default=os.environ.get("CARGA_USUARIO", ""))
+    parser.add_argument("--contrasena", default=os.environ.get("CARGA_CONTRASENA", ""))
+    parser.add_argument("--barrido", help="Configuraciones workers x threads, ej. 1x4,2x4,4x8")
+    parser.add_argument("--comando", default="gunicorn -c gunicorn.conf.py wsgi:server",
+                        help="Comando para levantar la app en el barrido (con APP_WORKERS/APP_THREADS/APP_BIND)")
+    parser.add_argument("--puerto", type=int, default=8051, help="Puerto de la app en el barrido")
+    parser.add_argument("--upstream", help="BCRA_URL_BASE para la app levantada en el barrido")
+    parser.add_argument("--salida", help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    if args.barrido:
+        resultados = barrer(args)
+    else:
+        resultados = correr_carga(args.url.rstrip("/"), args)
+        imprimir(resultados)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"args": {k: v for k, v in vars(args).items() if k != "contrasena"},
+                       "resultados": resultados}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
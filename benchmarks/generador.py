@@ -0,0 +1,84 @@
+# benchmarks/generador.py
+import random
+
+from utils.formatter import cuit_valido
+
+# Distribución aproximada de situaciones en la Central de Deudores
+DISTRIBUCION_SITUACIONES = {1: 0.80, 2: 0.07, 3: 0.05, 4: 0.04, 5: 0.03, 6: 0.01}
+
+
+PALABRAS = [
+    "BANCO", "DE", "LA", "NACION", "PROVINCIA", "CREDITO", "COOPERATIVO", "FINANCIERA",
+    "ARGENTINA", "INVERSIONES", "SERVICIOS", "COMERCIAL", "INDUSTRIAL", "FIDEICOMISO",
+]
+
+
+def nombres_entidades(n_entidades, largos=False, semilla=0):
+    """
+    Nombres únicos de entidades; con `largos` se generan razones sociales de
+    60-90 caracteres para ejercitar el wrapping de etiquetas.
+    """
+    if not largos:
+        return [f"BANCO SINTETICO {i:04d} S.A." for i in range(n_entidades)]
+    rng = random.Random(semilla)
+    nombres = []
+    for i in range(n_entidades):
+        nombre = f"{i:04d}"
+        while len(nombre) < rng.randint(60, 90):
+            nombre = f"{rng.choice(PALABRAS)} {nombre}"
+        nombres.append(nombre + " SOCIEDAD ANONIMA")
+    return nombres
+
+
+def generar_periodos(n_entidades, n_meses, semilla=0, ultimo_periodo="202609",
+                     presencia=0.85, situaciones=DISTRIBUCION_SITUACIONES, nombres_largos=False):
+    """
+    Genera una lista `periodos` sintética con el formato de la API
+    (del período más reciente al más antiguo).
+    """
+    rng = random.Random(semilla)
+    nombres = nombres_entidades(n_entidades, nombres_largos, semilla)
+    valores, pesos = list(situaciones), list(situaciones.values())
+
+    anio, mes = int(ultimo_periodo[:4]), int(ultimo_periodo[4:])
+    periodos = []
+    for _ in range(n_meses):
+        entidades = [
+            {
+                "entidad": nombre,
+                "situacion": rng.choices(valores, pesos)[0],
+                "fechaSit1": None,
+                "monto": round(rng.lognormvariate(4, 2), 1),
+                "enRevision": False,
+                "procesoJud": False,
+            }
+            for nombre in nombres if rng.random() < presencia
+        ]
+        periodos.append({"periodo": f"{anio:04d}{mes:02d}", "entidades": entidades})
+        mes -= 1
+        if mes == 0:
+            anio, mes = anio - 1, 12
+    return periodos
+
+
+def cuits_sinteticos(n, semilla=0, prefijos=("20", "23", "27", "30", "33")):
+    """
+    `n` CUIT distintos de 11 dígitos con dígito verificador válido.
+    """
+    rng = random.Random(semilla)
+    cuits = set()
+    while len(cuits) < n:
+        base = rng.choice(prefijos) + f"{rng.randrange(10 ** 8):08d}"
+        cuits.update(base + str(d) for d in range(10) if cuit_valido(base + str(d)))
+    return sorted(cuits)
+
+
+def generar_payload(n_entidades, n_meses, **kwargs):
+    """
+    Bloque `results` completo de Deudas/Historicas.
+    """
+    return {
+        "identificacion": 30000000007,
+        "denominacion": "DEUDOR SINTETICO S.A.",
+        "periodos": generar_periodos(n_entidades, n_meses, **kwargs),
+    }
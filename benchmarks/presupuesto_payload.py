@@ -0,0 +1,135 @@
+# benchmarks/presupuesto_payload.py
+"""
+Presupuesto de bytes por componente: consulta un deudor sintético grande a
+través de /_dash-update-component (con el cliente de prueba de Flask, sin
+red ni API del BCRA) y mide cada entrada y salida de los callbacks con la
+misma función que usa /metrics. Sale con código 1 si algún componente
+supera su presupuesto, para frenar regresiones de tamaño antes de publicar.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.presupuesto_payload
+    python -m benchmarks.presupuesto_payload --render-cliente
+    python -m benchmarks.presupuesto_payload --entidades 80 --meses 60 \\
+        --presupuesto salida:tabla-pivot.children=300000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+# Presupuestos por defecto (bytes) para el deudor de referencia: 60 entidades × 60 meses
+PRESUPUESTOS = {
+    "salida:consulta-message.children": 2_000,
+    "salida:tabla-pivot.children": 80_000,
+    "salida:consulta-datos.data": 256,
+    "salida:consulta-modelo.data": 10_000,
+    "salida:grafico-torta.children": 16_000,
+    "salida:grafico-evolucion.children": 16_000,
+    "salida:tabla-detalle.children": 2_000,
+    "salida:tabla-detalle-grid.getRowsResponse": 16_000,
+    "entrada:consulta-datos.data": 256,
+}
+
+CUIT = "30000000007"
+
+
+def preparar_entorno(directorio, render_cliente):
+    # Cache, estado compartido y jobs aislados; la API nunca se consulta (el deudor queda en cache)
+    os.environ["BCRA_CACHE_DB"] = os.path.join(directorio, "cache.db")
+    os.environ["APP_COMPARTIDO_DB"] = os.path.join(directorio, "compartido.db")
+    os.environ["APP_JOBS_DIR"] = os.path.join(directorio, "jobs")
+    os.environ["BCRA_URL_BASE"] = "http://127.0.0.1:9"
+    os.environ["APP_RENDER_CLIENTE"] = "1" if render_cliente else "0"
+
+
+def medir_consulta(n_entidades, n_meses, respuestas=None):
+    """
+    Máximo de bytes por "direccion:componente" en una consulta completa:
+    ejecutar_consulta, las vistas encadenadas a consulta-datos y la primera
+    página del detalle. Con `respuestas` (lista) agrega ahí (output, cuerpo
+    crudo) de cada callback.
+    """
+    from app import app
+    from benchmarks.carga import Callbacks
+    from benchmarks.generador import generar_payload
+    from cache_deudas import cache
+    from metricas import bytes_por_componente
+
+    cache.guardar(CUIT, generar_payload(n_entidades, n_meses))
+    cliente = app.server.test_client()
+    callbacks = Callbacks(None, cliente.get("/_dash-dependencies").get_json())
+    medidas = {}
+
+    def post(cuerpo):
+        r = cliente.post("/_dash-update-component", json=cuerpo)
+        if r.status_code != 200:
+            sys.exit(f"El callback {cuerpo['output']} respondió {r.status_code}")
+        respuesta = r.get_json()
+        if respuestas is not None:
+            respuestas.append((cuerpo["output"], r.get_data()))
+        for direccion, componente, tamano in bytes_por_componente(cuerpo, respuesta):
+            clave = f"{direccion}:{componente}"
+            medidas[clave] = max(medidas.get(clave, 0), tamano)
+        return respuesta["response"]
+
+    # 1) Consulta (el deudor está en cache: responde en el mismo request)
+    respuesta = post(callbacks.cuerpo(
+        "consultar-button",
+        [{"id": "consultar-button", "property": "n_clicks", "value": 1},
+         {"id": "input-cuit", "property": "n_submit", "value": None}],
+        [{"id": "input-cuit", "property": "value", "value": CUIT}],
+    ))
+    datos = respuesta["consulta-datos"]["data"]
+
+    # 2) Vistas encadenadas que resuelve el servidor
+    for dep in callbacks.por_entrada.get("consulta-datos", []):
+        post(callbacks.cuerpo(
+            "consulta-datos", [{"id": "consulta-datos", "property": "data", "value": datos}], salida=dep["output"]
+        ))
+
+    # 3) Primera página del detalle
+    id_grilla = {"cuit": CUIT, "huella": datos["huella"], "type": "tabla-detalle-grid"}
+    post(callbacks.cuerpo(
+        "tabla-detalle-grid",
+        [{"id": id_grilla, "property": "getRowsRequest",
+          "value": {"startRow": 0, "endRow": 100, "sortModel": [], "filterModel": {}}}],
+        id_patron=id_grilla,
+    ))
+    return medidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entidades", type=int, default=60)
+    parser.add_argument("--meses", type=int, default=60)
+    parser.add_argument("--render-cliente", action="store_true", help="Mide con APP_RENDER_CLIENTE=1")
+    parser.add_argument("--presupuesto", action="append", default=[], metavar="DIRECCION:COMPONENTE=BYTES",
+                        help="Reemplaza o agrega un presupuesto (se puede repetir)")
+    parser.add_argument("--json", action="store_true", help="Imprime las medidas como JSON")
+    args = parser.parse_args()
+
+    presupuestos = dict(PRESUPUESTOS)
+    for item in args.presupuesto:
+        clave, _, valor = item.rpartition("=")
+        presupuestos[clave] = int(valor)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        preparar_entorno(directorio, args.render_cliente)
+        medidas = medir_consulta(args.entidades, args.meses)
+
+    excedidos = [c for c, tamano in medidas.items() if c in presupuestos and tamano > presupuestos[c]]
+    if args.json:
+        print(json.dumps(medidas, indent=2, sort_keys=True))
+    else:
+        print(f"{'componente':<48} {'bytes':>10} {'presupuesto':>12}")
+        for clave in sorted(medidas):
+            limite = presupuestos.get(clave, "-")
+            marca = "  EXCEDIDO" if clave in excedidos else ""
+            print(f"{clave:<48} {medidas[clave]:>10} {limite:>12}{marca}")
+    if excedidos:
+        print(f"\n{len(excedidos)} componente(s) sobre el presupuesto: {', '.join(sorted(excedidos))}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/serializacion_figuras.py
+"""
+Costo de armar y serializar los gráficos con historias largas (evolución con
+cientos o miles de meses) y con carteras de miles de acreedores (torta/barras).
+Compara la figura tal como sale de plot_helpers (base64 tipado en el JSON desde
+MIN_TIPADO puntos, listas debajo) con la misma figura armada toda con listas de
+Python, serializadas ambas con el motor de cache_figuras.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.serializacion_figuras
+    python -m benchmarks.serializacion_figuras --meses 24,120,1000,5000 --entidades 10,100,2000
+"""
+import argparse
+import base64
+import timeit
+
+import numpy as np
+import plotly.graph_objs as go
+
+from benchmarks.generador import generar_periodos
+from cache_figuras import _serializar
+from utils.modelo_deuda import normalizar_periodos
+from utils.plot_helpers import crear_grafico_evolucion, crear_grafico_torta
+
+
+def _a_listas(valor):
+    if isinstance(valor, np.ndarray):
+        if valor.dtype.kind == "M":
+            return valor.astype("datetime64[s]").tolist()
+        return valor.tolist()
+    if isinstance(valor, dict):
+        if "bdata" in valor:
+            # to_plotly_json ya codifica los arreglos numéricos
+            return np.frombuffer(base64.b64decode(valor["bdata"]), dtype=valor["dtype"]).tolist()
+        return {k: _a_listas(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_a_listas(v) for v in valor]
+    return valor
+
+
+def figura_con_listas(fig):
+    """
+    La misma figura con los arreglos pasados a listas (datetime para las fechas).
+    """
+    return go.Figure(_a_listas(fig.to_plotly_json()))
+
+
+def _ms(funcion, repeticiones):
+    return min(timeit.repeat(funcion, number=1, repeat=repeticiones)) * 1000
+
+
+def medir(construir, repeticiones):
+    """
+    (ms armado, bytes y ms con listas, bytes y ms tipado).
+    """
+    fig = construir()
+    listas = figura_con_listas(fig)
+    return (
+        _ms(construir, repeticiones),
+        len(_serializar(listas)), _ms(lambda: _serializar(listas), repeticiones),
+        len(_serializar(fig)), _ms(lambda: _serializar(fig), repeticiones),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meses", default="24,120,1000,5000", help="Largos de historia (evolución)")
+    parser.add_argument("--entidades", default="10,100,2000", help="Acreedores en el último período (torta)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    casos = []
+    # 1) Historias largas: pocos acreedores, muchos meses
+    for n_meses in (int(n) for n in args.meses.split(",")):
+        modelo = normalizar_periodos(generar_periodos(5, n_meses))
+        casos.append((f"evolucion {n_meses} meses", lambda m=modelo: crear_grafico_evolucion(m)))
+    # 2) Carteras: miles de acreedores en un período (barras con "Otros" y sus porcentajes)
+    for n_ent in (int(n) for n in args.entidades.split(",")):
+        modelo = normalizar_periodos(generar_periodos(n_ent, 1, presencia=1.0))
+        casos.append((f"torta {n_ent} acreedores", lambda m=modelo: crear_grafico_torta(m)))
+
+    print(f"{'figura':<28} {'armar ms':>9} {'listas B':>10} {'ms':>7} {'tipado B':>10} {'ms':>7}")
+    for nombre, construir in casos:
+        armar, bytes_listas, ms_listas, bytes_tipado, ms_tipado = medir(construir, args.repeticiones)
+        print(f"{nombre:<28} {armar:>9.2f} {bytes_listas:>10} {ms_listas:>7.2f} {bytes_tipado:>10} {ms_tipado:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# benchmarks/servidor_bcra.py
+"""
+Servidor local que imita la API de la Central de Deudores del BCRA
+(GET /CentralDeDeudores/v1.0/Deudas/Historicas/{cuit}) para medir la app
+sin consultar api.bcra.gob.ar.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.servidor_bcra --puerto 8765 --latencia lognormal:150,0.6 --tasa-5xx 0.02
+    BCRA_URL_BASE=http://127.0.0.1:8765 python app.py
+
+Modos:
+    sintético (por defecto): payload determinístico por CUIT, generado con
+        benchmarks.generador (mismo CUIT, misma respuesta).
+    --fixtures DIR: responde las respuestas grabadas en DIR/{cuit}.json; los
+        CUIT sin grabar se generan (o dan 404 con --solo-fixtures).
+    --grabar URL: reenvía cada consulta a la API real en URL y guarda la
+        respuesta en --fixtures para reproducirla después. Las respuestas
+        reales tienen datos de deudores: benchmarks/fixtures/ está en .gitignore.
+
+GET /_estadisticas devuelve los contadores de lo servido hasta el momento.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bcra_client import ClienteBCRA, ErrorBCRA, LimitadorTasa, SinDatosBCRA, RUTA_HISTORICAS, HOST
+from benchmarks.generador import generar_payload
+
+PREFIJO = RUTA_HISTORICAS.split("{cuit}")[0]
+SIN_DATOS = {"status": 404, "errorMessages": ["No se encontró datos para la identificación ingresada."]}
+
+
+def parsear_latencia(spec):
+    """
+    Convierte una especificación de latencia (milisegundos) en una función
+    que devuelve segundos:
+        fija:120          siempre 120 ms
+        uniforme:50,400   uniforme entre 50 y 400 ms
+        lognormal:150,0.6 lognormal con mediana 150 ms y sigma 0.6 (cola larga)
+    """
+    tipo, _, parametros = spec.partition(":")
+    valores = [float(v) for v in parametros.split(",") if v]
+    if tipo == "fija" and len(valores) == 1:
+        return lambda rng: valores[0] / 1000
+    if tipo == "uniforme" and len(valores) == 2:
+        return lambda rng: rng.uniform(*valores) / 1000
+    if tipo == "lognormal" and len(valores) == 2:
+        mediana, sigma = valores
+        return lambda rng: mediana * rng.lognormvariate(0, sigma) / 1000
+    raise argparse.ArgumentTypeError(f"Latencia inválida: {spec!r}")
+
+
+class Estadisticas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.contadores = {}
+
+    def sumar(self, clave):
+        with self._lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + 1
+
+    def como_dict(self):
+        with self._lock:
+            return dict(self.contadores)
+
+
+class ServidorBCRA:
+    """
+    Genera las respuestas (status, cuerpo, demora) según la configuración.
+    """
+
+    def __init__(self, latencia=None, tasa_5xx=0.0, tasa_timeout=0.0, tasa_404=0.0,
+                 demora_timeout=60.0, max_rps=0, entidades=20, meses=24,
+                 fixtures=None, solo_fixtures=False, grabar=None):
+        self.latencia = latencia or parsear_latencia("fija:0")
+        self.tasa_5xx = tasa_5xx
+        self.tasa_timeout = tasa_timeout
+        self.tasa_404 = tasa_404
+        self.demora_timeout = demora_timeout
+        self.limitador = LimitadorTasa(max_rps) if max_rps else None
+        self.entidades = entidades
+        self.meses = meses
+        self.fixtures = fixtures
+        self.solo_fixtures = solo_fixtures
+        self.upstream = ClienteBCRA(url_base=grabar, host=HOST, reintentos=0) if grabar else None
+        self.estadisticas = Estadisticas()
+        self._rng = random.Random()
+        self._lock_rng = threading.Lock()
+        if fixtures:
+            os.makedirs(fixtures, exist_ok=True)
+
+    def _azar(self):
+        with self._lock_rng:
+            return self._rng.random(), self.latencia(self._rng)
+
+    def _ruta_fixture(self, cuit):
+        return os.path.join(self.fixtures, f"{cuit}.json")
+
+    def _grabada(self, cuit):
+        if not self.fixtures:
+            return None
+        try:
+            with open(self._ruta_fixture(cuit), "rb") as f:
+                grabada = json.load(f)
+        except FileNotFoundError:
+            return None
+        return grabada["status"], grabada["respuesta"]
+
+    def _grabar(self, cuit):
+        try:
+            status, respuesta = 200, self.upstream.get_json(RUTA_HISTORICAS.format(cuit=cuit))
+        except SinDatosBCRA:
+            status, respuesta = 404, SIN_DATOS
+        except ErrorBCRA as e:
+            return 502, {"status": 502, "errorMessages": [str(e)]}
+        with open(self._ruta_fixture(cuit), "w", encoding="utf-8") as f:
+            json.dump({"status": status, "respuesta": respuesta}, f, ensure_ascii=False)
+        return status, respuesta
+
+    def _sintetica(self, cuit):
+        # Tamaño y contenido determinísticos por CUIT
+        semilla = zlib.crc32(cuit.encode())
+        rng = random.Random(semilla)
+        if rng.random() < self.tasa_404:
+            return 404, SIN_DATOS
+        results = generar_payload(
+            max(1, int(self.entidades * rng.uniform(0.25, 1.75))),
+            self.meses,
+            semilla=semilla,
+        )
+        results["identificacion"] = int(cuit)
+        results["denominacion"] = f"DEUDOR SINTETICO {cuit}"
+        return 200, {"status": 200, "results": results}
+
+    def responder(self, cuit):
+        """
+        Devuelve (status, cuerpo dict, demora en segundos, encabezados extra).
+        """
+        if self.limitador is not None:
+            espera = self.limitador.intentar()
+            if espera:
+                self.estadisticas.sumar("429")
+                return 429, {"status": 429, "errorMessages": ["Too Many Requests"]}, 0, {
+                    "Retry-After": str(max(1, round(espera)))
+                }
+
+        sorteo, demora = self._azar()
+        if sorteo < self.tasa_timeout:
+            self.estadisticas.sumar("timeout")
+            return None, None, self.demora_timeout, {}
+        if sorteo < self.tasa_timeout + self.tasa_5xx:
+            self.estadisticas.sumar("503")
+            return 503, {"status": 503, "errorMessages": ["Service Unavailable"]}, demora, {}
+
+        if self.upstream is not None:
+            status, cuerpo = self._grabar(cuit)
+            self.estadisticas.sumar("grabadas")
+        else:
+            grabada = self._grabada(cuit)
+            if grabada is not None:
+                status, cuerpo = grabada
+                self.estadisticas.sumar("reproducidas")
+            elif self.solo_fixtures:
+                status, cuerpo = 404, SIN_DATOS
+            else:
+                status, cuerpo = self._sintetica(cuit)
+                self.estadisticas.sumar("sinteticas")
+        self.estadisticas.sumar(str(status))
+        return status, cuerpo, demora, {}
+
+
+def crear_handler(servidor):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _enviar(self, status, cuerpo, extra=None):
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            for clave, valor in (extra or {}).items():
+                self.send_header(clave, valor)
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            ruta = self.path.split("?")[0]
+            if ruta == "/_estadisticas":
+                return self._enviar(200, servidor.estadisticas.como_dict())
+            cuit = ruta[len(PREFIJO):] if ruta.startswith(PREFIJO) else ""
+            if not cuit.isdigit():
+                return self._enviar(400, {"status": 400, "errorMessages": ["Identificación inválida."]})
+
+            inicio = time.monotonic()
+            status, cuerpo, demora, extra = servidor.responder(cuit)
+            # La demora se cuenta desde que llegó el request (incluye generar el payload)
+            restante = demora - (time.monotonic() - inicio)
+            if restante > 0:
+                time.sleep(restante)
+            if status is None:
+                # Timeout simulado: se corta la conexión sin responder
+                self.close_connection = True
+                return
+            self._enviar(status, cuerpo, extra)
+
+        def log_message(self, formato, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita la API de Deudas/Historicas del BCRA")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=parsear_latencia, default="fija:0",
+                        help="fija:MS | uniforme:MIN,MAX | lognormal:MEDIANA,SIGMA (en ms)")
+    parser.add_argument("--tasa-5xx", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--tasa-timeout", type=float, default=0.0, help="Fracción de requests que no se responden")
+    parser.add_argument("--demora-timeout", type=float, default=60.0,
+                        help="Segundos que se retiene un request antes de cortarlo sin respuesta")
+    parser.add_argument("--tasa-404", type=float, default=0.0, help="Fracción de CUIT sintéticos sin datos")
+    parser.add_argument("--max-rps", type=float, default=0, help="Requests por segundo antes de responder 429")
+    parser.add_argument("--entidades", type=int, default=20, help="Entidades promedio de los payloads sintéticos")
+    parser.add_argument("--meses", type=int, default=24, help="Períodos de los payloads sintéticos")
+    parser.add_argument("--fixtures", help="Directorio de respuestas grabadas")
+    parser.add_argument("--solo-fixtures", action="store_true", help="404 para los CUIT no grabados")
+    parser.add_argument("--grabar", metavar="URL", help="URL de la API real a grabar en --fixtures")
+    args = parser.parse_args()
+
+    if args.grabar and not args.fixtures:
+        parser.error("--grabar requiere --fixtures")
+
+    servidor = ServidorBCRA(
+        latencia=args.latencia,
+        tasa_5xx=args.tasa_5xx,
+        tasa_timeout=args.tasa_timeout,
+        tasa_404=args.tasa_404,
+        demora_timeout=args.demora_timeout,
+        max_rps=args.max_rps,
+        entidades=args.entidades,
+        meses=args.meses,
+        fixtures=args.fixtures,
+        solo_fixtures=args.solo_fixtures,
+        grabar=args.grabar,
+    )
+    http = ThreadingHTTPServer((args.host, args.puerto), crear_handler(servidor))
+    http.daemon_threads = True
+    print(f"Sirviendo Deudas/Historicas en http://{args.host}:{args.puerto} (BCRA_URL_BASE)")
+    try:
+        http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http.server_close()
+
+
+if __name__ == "__main__":
+    main()
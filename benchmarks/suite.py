@@ -0,0 +1,149 @@
+# benchmarks/suite.py
+"""
+Suite de benchmarks de los constructores de vistas sobre payloads sintéticos.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.suite --salida bench.json
+    python -m benchmarks.suite --salida nuevo.json --comparar bench.json --umbral 0.25
+
+Con --comparar termina con código 1 si la mediana de algún caso empeora más
+que el umbral (fracción) respecto del archivo de referencia.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.generador import generar_periodos
+from utils.data_tables import crear_pivot_table_dash
+from utils.data_tables_aggrid import crear_pivot_table_aggrid, crear_tabla_detalle_aggrid, pagina_detalle
+from utils.exportacion import exportar_xlsx, exportar_csv, exportar_parquet
+from utils.modelo_deuda import normalizar_periodos
+from utils.plot_helpers import crear_grafico_torta, crear_grafico_evolucion
+
+# (entidades, meses)
+ESCALAS = {
+    "chica": (5, 12),
+    "mediana": (20, 24),
+    "grande": (60, 36),
+    "enorme": (500, 60),
+}
+
+
+def _detalle(modelo):
+    grilla = crear_tabla_detalle_aggrid("30000000007", modelo.huella(), len(modelo))
+    pagina = pagina_detalle(modelo, {"startRow": 0, "endRow": 100, "sortModel": [{"colId": "monto", "sort": "desc"}]})
+    return grilla, pagina
+
+
+def _exportar(exportador, modelo):
+    # Consume el contenido completo y lo cierra, como lo haría la respuesta de /exportar
+    contenido = exportador(modelo)
+    try:
+        return sum(len(bloque) for bloque in contenido)
+    finally:
+        contenido.close()
+
+
+def casos(escala, nombres_largos=False):
+    """
+    (nombre, función) de cada caso para una escala. Las entradas se generan
+    fuera de la medición.
+    """
+    n_ent, n_meses = ESCALAS[escala]
+    periodos = generar_periodos(n_ent, n_meses, nombres_largos=nombres_largos)
+    # Torta (< 6 acreedores en el último período) y barras (>= 6)
+    periodos_torta = generar_periodos(4, n_meses, presencia=1.0, nombres_largos=nombres_largos)
+    periodos_barras = generar_periodos(max(n_ent, 8), n_meses, presencia=1.0, nombres_largos=nombres_largos)
+    modelo = normalizar_periodos(periodos)
+    modelo_torta = normalizar_periodos(periodos_torta)
+    modelo_barras = normalizar_periodos(periodos_barras)
+    return [
+        ("normalizacion", lambda: normalizar_periodos(periodos)),
+        ("pivot_aggrid", lambda: crear_pivot_table_aggrid(modelo)),
+        ("pivot_dash", lambda: crear_pivot_table_dash(periodos)),
+        ("grafico_torta", lambda: crear_grafico_torta(modelo_torta)),
+        ("grafico_barras", lambda: crear_grafico_torta(modelo_barras)),
+        ("grafico_evolucion", lambda: crear_grafico_evolucion(modelo)),
+        ("detalle", lambda: _detalle(modelo)),
+        ("exportar_excel", lambda: _exportar(exportar_xlsx, modelo)),
+        ("exportar_csv", lambda: _exportar(exportar_csv, modelo)),
+        ("exportar_parquet", lambda: _exportar(exportar_parquet, modelo)),
+    ]
+
+
+def medir(funcion, repeticiones):
+    funcion()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "min_ms": round(tiempos[0], 3),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(0.95 * len(tiempos)))], 3),
+        "repeticiones": repeticiones,
+    }
+
+
+def comparar(resultados, referencia, umbral):
+    """
+    Lista de regresiones (caso, mediana de referencia, mediana actual).
+    """
+    base = {(r["caso"], r["escala"]): r for r in referencia["resultados"]}
+    regresiones = []
+    for r in resultados:
+        anterior = base.get((r["caso"], r["escala"]))
+        if anterior and r["mediana_ms"] > anterior["mediana_ms"] * (1 + umbral):
+            regresiones.append((f"{r['caso']}@{r['escala']}", anterior["mediana_ms"], r["mediana_ms"]))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de AppVerazFV")
+    parser.add_argument("--escalas", nargs="+", default=["chica", "mediana", "grande"], choices=list(ESCALAS))
+    parser.add_argument("--casos", nargs="+", help="Filtrar casos por nombre")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--nombres-largos", action="store_true", help="Razones sociales de 60-90 caracteres")
+    parser.add_argument("--salida", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    parser.add_argument("--umbral", type=float, default=0.25, help="Regresión tolerada (fracción de la mediana)")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for escala in args.escalas:
+        for nombre, funcion in casos(escala, args.nombres_largos):
+            if args.casos and nombre not in args.casos:
+                continue
+            r = {"caso": nombre, "escala": escala, **medir(funcion, args.repeticiones)}
+            resultados.append(r)
+            print(f"{nombre:<18} {escala:<8} mediana {r['mediana_ms']:>9.2f} ms   p95 {r['p95_ms']:>9.2f} ms")
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nombres_largos": args.nombres_largos,
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = comparar(resultados, json.load(f), args.umbral)
+        for caso, antes, ahora in regresiones:
+            print(f"REGRESIÓN {caso}: {antes:.2f} ms -> {ahora:.2f} ms", file=sys.stderr)
+        if regresiones:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# benchmarks/tamano_pivot.py
+"""
+Tamaño del JSON que viaja al navegador para el pivot (AgGrid y DataTable),
+separado en datos (filas) y especificación (columnas, estilos y reglas).
+La especificación debería crecer con los meses, no con meses × reglas.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.tamano_pivot --meses 60
+"""
+import argparse
+import json
+
+from dash import html
+
+from benchmarks.generador import generar_periodos
+from utils.data_tables import crear_pivot_table_dash
+from utils.data_tables_aggrid import crear_pivot_table_aggrid
+from utils.modelo_deuda import normalizar_periodos
+
+
+def _bytes(valor):
+    return len(json.dumps(valor, default=lambda o: o.to_plotly_json(), separators=(",", ":")))
+
+
+def tamanos(componente, prop_datos):
+    """
+    (bytes totales, bytes de datos, bytes de especificación) del componente.
+    """
+    if isinstance(componente, html.Div):
+        componente = componente.children
+    total = _bytes(componente)
+    datos = _bytes(getattr(componente, prop_datos))
+    return total, datos, total - datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meses", type=int, default=60)
+    parser.add_argument("--entidades", default="10,50,500", help="Escalas de entidades separadas por coma")
+    args = parser.parse_args()
+
+    print(f"{'grilla':>10} {'entidades':>10} {'total':>10} {'datos':>10} {'spec':>10}")
+    for n_ent in (int(n) for n in args.entidades.split(",")):
+        periodos = generar_periodos(n_ent, args.meses)
+        modelo = normalizar_periodos(periodos)
+        for nombre, componente, prop in (
+            ("aggrid", crear_pivot_table_aggrid(modelo), "rowData"),
+            ("datatable", crear_pivot_table_dash(periodos), "data"),
+        ):
+            total, datos, spec = tamanos(componente, prop)
+            print(f"{nombre:>10} {n_ent:>10} {total:>10} {datos:>10} {spec:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/transferencia.py
+"""
+Bytes en la red por visita y por consulta:
+- Estáticos de la página (assets, bundles de Dash, favicon): primera visita
+  sin comprimir / gzip / brotli, y visita repetida (lo que tiene huella sale
+  del cache del navegador; lo que no, se revalida con If-None-Match).
+- Respuestas de los callbacks de una consulta grande: crudas, gzip y brotli
+  a los niveles dinámicos de compresion.py, con el CPU que cuesta comprimir.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.transferencia --entidades 200 --meses 60
+"""
+import argparse
+import re
+import tempfile
+import time
+
+from benchmarks.presupuesto_payload import medir_consulta, preparar_entorno
+
+
+def _recursos(cliente):
+    html = cliente.get("/").get_data(as_text=True)
+    return [u for u in re.findall(r'(?:src|href)="([^"]+)"', html) if u.startswith("/")]
+
+
+def estaticos(cliente):
+    """
+    {codificación: (bytes primera visita, bytes visita repetida)}.
+    """
+    resultado = {}
+    for codificacion in ("identity", "gzip", "br"):
+        cabeceras = {"Accept-Encoding": codificacion}
+        primera = repetida = 0
+        for url in _recursos(cliente):
+            r = cliente.get(url, headers=cabeceras)
+            primera += len(r.get_data())
+            if "immutable" in r.headers.get("Cache-Control", ""):
+                continue
+            etag = r.headers.get("ETag")
+            r = cliente.get(url, headers=dict(cabeceras, **({"If-None-Match": etag} if etag else {})))
+            repetida += len(r.get_data())
+        resultado[codificacion] = (primera, repetida)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entidades", type=int, default=200)
+    parser.add_argument("--meses", type=int, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        preparar_entorno(directorio, False)
+        from app import server
+        from compresion import comprimir
+
+        print(f"{'estáticos':<12} {'primera visita':>15} {'visita repetida':>16}")
+        for codificacion, (primera, repetida) in estaticos(server.test_client()).items():
+            print(f"{codificacion:<12} {primera:>15} {repetida:>16}")
+
+        respuestas = []
+        medir_consulta(args.entidades, args.meses, respuestas)
+
+    print(f"\n{'callback':<44} {'crudo':>9} {'gzip':>9} {'ms':>6} {'br':>9} {'ms':>6}")
+    totales = [0, 0, 0]
+    for output, crudo in respuestas:
+        fila = [len(crudo)]
+        for codificacion in ("gzip", "br"):
+            inicio = time.perf_counter()
+            comprimido = comprimir(crudo, codificacion)
+            fila += [len(comprimido), (time.perf_counter() - inicio) * 1000]
+        totales = [totales[0] + fila[0], totales[1] + fila[1], totales[2] + fila[3]]
+        print(f"{output[:44]:<44} {fila[0]:>9} {fila[1]:>9} {fila[2]:>6.1f} {fila[3]:>9} {fila[4]:>6.1f}")
+    print(f"{'total':<44} {totales[0]:>9} {totales[1]:>9} {'':>6} {totales[2]:>9}")
+
+
+if __name__ == "__main__":
+    main()
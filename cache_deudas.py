@@ -0,0 +1,205 @@
+# cache_deudas.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils.formatter import normalizar_periodo
+
+# El BCRA publica la Central de Deudores una vez por mes. Mientras no pueda
+# existir un período más nuevo que el último observado, las respuestas
+# cacheadas se sirven sin salir a la red. Pasada esa fecha se revalidan
+# cada TTL_REVALIDACION segundos hasta que alguien observe el mes nuevo.
+TTL_REVALIDACION = int(os.environ.get("BCRA_CACHE_TTL_REVALIDACION", 6 * 3600))
+MAX_ENTRADAS = int(os.environ.get("BCRA_CACHE_MAX_ENTRADAS", 5000))
+MAX_BYTES = int(os.environ.get("BCRA_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Segundos mínimos entre dos actualizaciones de `accedido` de una misma entrada
+INTERVALO_ACCESO = int(os.environ.get("BCRA_CACHE_INTERVALO_ACCESO", 300))
+
+
+def ultimo_periodo(data):
+    """
+    Último período informado en un payload de Deudas/Historicas.
+    """
+    periodos = [normalizar_periodo(p.get("periodo")) for p in data.get("periodos") or []]
+    periodos = [p for p in periodos if p]
+    return max(periodos) if periodos else None
+
+
+def sumar_meses(periodo, n):
+    anio, mes = int(periodo[:4]), int(periodo[4:])
+    total = anio * 12 + (mes - 1) + n
+    return f"{total // 12:04d}{total % 12 + 1:02d}"
+
+
+def puede_haber_periodo_nuevo(periodo_publicado, ahora=None):
+    """
+    Los datos del mes P+1 recién pueden publicarse una vez terminado ese mes,
+    es decir, a partir del primer día del mes P+2.
+    """
+    if not periodo_publicado:
+        return True
+    ahora = ahora or datetime.now()
+    return f"{ahora.year:04d}{ahora.month:02d}" >= sumar_meses(periodo_publicado, 2)
+
+
+class CacheDeudas:
+    """
+    Cache persistente (SQLite) de respuestas de la Central de Deudores por CUIT,
+    con conocimiento del último período publicado y cota LRU por entradas y bytes.
+    """
+
+    def __init__(self, ruta, ttl_revalidacion=TTL_REVALIDACION,
+                 max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES):
+        self.ruta = ruta
+        self.ttl_revalidacion = ttl_revalidacion
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _conectar(self):
+        # Una conexión por thread y por proceso (no se reutiliza una heredada de un fork).
+        # WAL: las lecturas no toman el lock de escritura ni esperan a las escrituras
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(self.ruta, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS deudas (
+                    cuit TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    ultimo_periodo TEXT,
+                    periodo_publicado TEXT,
+                    consultado REAL NOT NULL,
+                    accedido REAL NOT NULL,
+                    bytes INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_deudas_accedido ON deudas (accedido);
+                CREATE TABLE IF NOT EXISTS meta (
+                    clave TEXT PRIMARY KEY,
+                    valor TEXT
+                );
+            """)
+            self._local.conn, self._local.pid = conn, pid
+        return conn
+
+    def periodo_publicado(self, conn=None):
+        """
+        Último período publicado que se haya observado en cualquier consulta.
+        """
+        conn = conn or self._conectar()
+        rows = conn.execute("SELECT valor FROM meta WHERE clave = 'periodo_publicado'").fetchall()
+        return rows[0][0] if rows else None
+
+    def _es_fresca(self, periodo_entrada, consultado, periodo_global, ahora):
+        # 1) Ya se observó un mes más nuevo que el que conocía esta entrada
+        if periodo_global and (not periodo_entrada or periodo_entrada < periodo_global):
+            return False
+        # 2) Todavía no puede existir un mes nuevo: la entrada vale indefinidamente
+        if not puede_haber_periodo_nuevo(periodo_entrada, datetime.fromtimestamp(ahora)):
+            return True
+        # 3) Puede haber un mes nuevo: revalidar cada ttl_revalidacion
+        return ahora - consultado < self.ttl_revalidacion
+
+    def obtener(self, cuit, permitir_vencida=False):
+        """
+        Devuelve el payload cacheado si sigue vigente (o si permitir_vencida),
+        None en caso contrario.
+        """
+        conn = self._conectar()
+        rows = conn.execute(
+            "SELECT payload, periodo_publicado, consultado, accedido FROM deudas WHERE cuit = ?",
+            (str(cuit),)
+        ).fetchall()
+        if not rows:
+            return None
+        payload, periodo_entrada, consultado, accedido = rows[0]
+        ahora = time.time()
+        if not permitir_vencida and not self._es_fresca(
+            periodo_entrada, consultado, self.periodo_publicado(conn), ahora
+        ):
+            return None
+        # El orden LRU no necesita precisión de segundos: se escribe como mucho una vez por intervalo
+        if ahora - accedido >= INTERVALO_ACCESO:
+            with conn:
+                conn.execute("UPDATE deudas SET accedido = ? WHERE cuit = ?", (ahora, str(cuit)))
+        return json.loads(payload)
+
+    def ultima_conocida(self, cuit):
+        """
+        (payload, timestamp de la consulta) de la última respuesta guardada,
+        vigente o no; None si el CUIT nunca se consultó.
+        """
+        rows = self._conectar().execute(
+            "SELECT payload, consultado FROM deudas WHERE cuit = ?", (str(cuit),)
+        ).fetchall()
+        if not rows:
+            return None
+        return json.loads(rows[0][0]), rows[0][1]
+
+    def guardar(self, cuit, data):
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        ultimo = ultimo_periodo(data)
+        ahora = time.time()
+        conn = self._conectar()
+        with conn:
+            # Se toma el lock de escritura antes de leer para no escalar desde una lectura
+            conn.execute("BEGIN IMMEDIATE")
+            publicado = self.periodo_publicado(conn)
+            if ultimo and (not publicado or ultimo > publicado):
+                publicado = ultimo
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (clave, valor) VALUES ('periodo_publicado', ?)",
+                    (publicado,)
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO deudas "
+                "(cuit, payload, ultimo_periodo, periodo_publicado, consultado, accedido, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(cuit), payload, ultimo, publicado, ahora, ahora, len(payload))
+            )
+            self._desalojar(conn)
+
+    def _desalojar(self, conn):
+        # Se eliminan las entradas menos recientemente accedidas hasta respetar ambas cotas
+        cantidad, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM deudas").fetchone()
+        if cantidad <= self.max_entradas and total <= self.max_bytes:
+            return
+        sobrantes = []
+        for cuit, tam in conn.execute("SELECT cuit, bytes FROM deudas ORDER BY accedido"):
+            if cantidad <= self.max_entradas and total <= self.max_bytes:
+                break
+            sobrantes.append((cuit,))
+            cantidad -= 1
+            total -= tam
+        conn.executemany("DELETE FROM deudas WHERE cuit = ?", sobrantes)
+
+    def invalidar(self, cuit=None):
+        """
+        Elimina la entrada de un CUIT, o todo el cache si no se indica ninguno.
+        """
+        conn = self._conectar()
+        with conn:
+            if cuit is None:
+                conn.execute("DELETE FROM deudas")
+                conn.execute("DELETE FROM meta")
+            else:
+                conn.execute("DELETE FROM deudas WHERE cuit = ?", (str(cuit),))
+
+    def estadisticas(self):
+        conn = self._conectar()
+        cantidad, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM deudas").fetchone()
+        return {
+            "entradas": cantidad,
+            "bytes": total,
+            "periodo_publicado": self.periodo_publicado(conn),
+        }
+
+
+cache = CacheDeudas(os.environ.get("BCRA_CACHE_DB", "cache_deudas.db"))
@@ -0,0 +1,114 @@
+# cache_figuras.py
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from compartido import compartido
+from singleflight import SingleFlight
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el módulo json estándar
+    orjson = None
+
+MAX_BYTES = int(os.environ.get("FIGURAS_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Segundo nivel en el almacén compartido: una figura armada por un worker o job sirve a los demás
+COMPARTIR = os.environ.get("FIGURAS_CACHE_COMPARTIDO", "1") == "1"
+TTL_COMPARTIDO = int(os.environ.get("FIGURAS_CACHE_TTL", 24 * 3600))
+# Cambiar al modificar el estilo de los gráficos para no servir figuras viejas
+VERSION_FIGURAS = "darkly-1"
+
+
+# Motor de plotly.io para serializar figuras (arreglos NumPy como base64 tipado)
+MOTOR_JSON = "orjson" if orjson is not None else "json"
+
+
+def _serializar(fig):
+    if isinstance(fig, dict):
+        return json.dumps(fig)
+    return fig.to_json(engine=MOTOR_JSON)
+
+
+def _deserializar(texto):
+    if orjson is not None:
+        return orjson.loads(texto)
+    return json.loads(texto)
+
+
+class CacheFiguras:
+    """
+    LRU acotado por bytes de figuras Plotly ya serializadas, indexado por la
+    huella del contenido que las origina. Las construcciones concurrentes de
+    la misma figura se coalescen en una sola. Con `almacen`, lo que falta en
+    memoria se busca en el almacén compartido antes de construirlo.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, almacen=None):
+        self.max_bytes = max_bytes
+        self.almacen = almacen
+        self._figuras = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._vuelo = SingleFlight()
+        self.aciertos = 0
+        self.aciertos_compartidos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, construir, *args):
+        """
+        Devuelve la figura (dict listo para dcc.Graph) de `clave`; si no está,
+        la arma con construir(*args), la serializa y la guarda.
+        """
+        clave = (VERSION_FIGURAS,) + tuple(clave)
+        with self._lock:
+            texto = self._figuras.get(clave)
+            if texto is not None:
+                self._figuras.move_to_end(clave)
+                self.aciertos += 1
+        if texto is None:
+            texto = self._vuelo.ejecutar(clave, lambda: self._construir(clave, construir, args))
+        return _deserializar(texto)
+
+    def _construir(self, clave, construir, args):
+        clave_compartida = "figura:" + ":".join(map(str, clave))
+        texto = self.almacen.obtener(clave_compartida) if self.almacen is not None else None
+        if texto is not None:
+            texto = texto.decode()
+            with self._lock:
+                self.aciertos_compartidos += 1
+        else:
+            texto = _serializar(construir(*args))
+            if self.almacen is not None:
+                self.almacen.guardar(clave_compartida, texto.encode(), ttl=TTL_COMPARTIDO)
+            with self._lock:
+                self.fallos += 1
+        with self._lock:
+            if clave not in self._figuras and len(texto) <= self.max_bytes:
+                self._figuras[clave] = texto
+                self._bytes += len(texto)
+                while self._bytes > self.max_bytes:
+                    _, viejo = self._figuras.popitem(last=False)
+                    self._bytes -= len(viejo)
+        return texto
+
+    def invalidar(self):
+        with self._lock:
+            self._figuras.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._lock:
+            aciertos = self.aciertos + self.aciertos_compartidos
+            consultas = aciertos + self.fallos
+            return {
+                "entradas": len(self._figuras),
+                "bytes": self._bytes,
+                "aciertos": self.aciertos,
+                "aciertos_compartidos": self.aciertos_compartidos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(aciertos / consultas, 3) if consultas else 0.0,
+            }
+
+
+figuras = CacheFiguras(almacen=compartido if COMPARTIR else None)
@@ -1,17 +1,27 @@
 # callbacks.py
 
-from dash import Output, Input, State, callback_context, no_update, dcc, html
+from dash import Output, Input, State, MATCH, ClientsideFunction, callback_context, no_update, dcc, html
 from dash.exceptions import PreventUpdate
-import pandas as pd
 import dash_bootstrap_components as dbc
 import json
+import logging
+import time
+from datetime import datetime
 
-from auth import verificar_credenciales
-from sql_api import consultar_deuda_historica
+from flask import session
+
+from auth import firmar_exportacion, verificar_credenciales
+from bcra_client import cliente
+from sql_api import consultar_deuda_historica, obtener_modelo, VENCIDA
+from cache_deudas import cache
+from cache_figuras import figuras
 from layout import login_layout, dashboard_layout
-from utils.data_tables_aggrid import crear_pivot_table_aggrid
+from metricas import medir
+from utils.formatter import cuit_valido
+from utils.data_tables_aggrid import crear_pivot_table_aggrid, crear_tabla_detalle_aggrid, pagina_detalle
 from utils.plot_helpers import crear_grafico_torta, crear_grafico_evolucion
-from utils.formatter import formatear_periodo
+
+logger = logging.getLogger("appveraz")
 
 def formatear_cuit(cuit: str) -> str:
     """
@@ -19,7 +29,164 @@ def formatear_cuit(cuit: str) -> str:
     """
     return f"{cuit[:2]}-{cuit[2:10]}-{cuit[10:]}"
 
-def register_callbacks(app):
+def _construir_evolucion(modelo):
+    fig = crear_grafico_evolucion(modelo)
+    # Volcado de la figura solo con APP_LOG_LEVEL=DEBUG (antes eran print en cada consulta)
+    if logger.isEnabledFor(logging.DEBUG) and fig:
+        logger.debug(json.dumps({
+            "evento": "figura_evolucion",
+            "tickvals": [str(d) for d in fig.layout.xaxis2.tickvals],
+            "layout": fig.layout.to_plotly_json(),
+        }, default=str))
+    return fig
+
+def _alerta_error(texto):
+    return dbc.Alert(
+        [
+            html.Span("❌", className="me-2"),
+            html.Span(texto)
+        ],
+        color="danger",
+        dismissable=False,
+        className="py-2 px-3 mt-3",
+        style={
+            "backgroundColor": "#dc354510",
+            "border": "1px solid #dc354555",
+            "color": "#dc3545",
+            "fontWeight": "500",
+            "borderRadius": "0.5rem",
+        }
+    )
+
+def _alerta_consultando():
+    return dbc.Alert(
+        [
+            dbc.Spinner(size="sm", color="secondary", spinner_class_name="me-2"),
+            html.Span("Consultando…")
+        ],
+        color="secondary",
+        dismissable=False,
+        className="py-2 px-3 mt-3 d-flex align-items-center",
+        style={
+            "backgroundColor": "#6c757d10",
+            "border": "1px solid #6c757d55",
+            "fontWeight": "500",
+            "borderRadius": "0.5rem",
+        }
+    )
+
+def _alerta_vencida(razon_social, cuit_formateado, vencida):
+    fecha = datetime.fromtimestamp(vencida["consultado"]).strftime("%d/%m/%Y %H:%M")
+    return dbc.Alert(
+        [
+            html.Span("⚠", className="me-2"),
+            html.Strong("Datos del " + fecha + " para: "),
+            html.Span(f"{razon_social} ", className="me-2"),
+            html.Span(f"(CUIT: {cuit_formateado})", className="text-muted me-2"),
+            html.Small("La API del BCRA no responde; se actualizarán automáticamente cuando vuelva."),
+        ],
+        color="warning",
+        dismissable=False,
+        className="py-2 px-3 mt-3",
+        style={
+            "backgroundColor": "#ffc10710",
+            "border": "1px solid #ffc10755",
+            "color": "#ffc107",
+            "fontWeight": "500",
+            "borderRadius": "0.5rem",
+        }
+    )
+
+def _sin_cambios(msg):
+    """
+    Salidas de la consulta que solo actualizan el mensaje (y limpian el input).
+    """
+    return msg, no_update, "", no_update, no_update, no_update, no_update
+
+def _renderizar_consulta(cuit, data, compacto=False, token=None):
+    """
+    Arma el mensaje y la tabla unificada a partir del payload del BCRA; el
+    resto de las vistas se completa desde consulta-datos. Con `compacto` la
+    tabla y los gráficos se arman en el navegador desde consulta-modelo.
+    `token` (firmar_exportacion) habilita los enlaces de exportación.
+    """
+    if "error" in data:
+        return _sin_cambios(_alerta_error(f"Error: {data['error']}"))
+
+    if not data.get("periodos"):
+        return _sin_cambios(_alerta_error("El CUIT consultado no tiene información disponible."))
+
+    razon_social = data["denominacion"]
+    cuit_formateado = formatear_cuit(str(cuit))  # aseguramos que sea string
+
+    vencida = data.get(VENCIDA)
+    msg = _alerta_vencida(razon_social, cuit_formateado, vencida) if vencida else dbc.Alert(
+        [
+            html.Span("✔", className="me-2"),
+            html.Strong("Datos para: "),
+            html.Span(f"{razon_social} ", className="me-2"),
+            html.Span(f"(CUIT: {cuit_formateado})", className="text-muted")
+        ],
+        color="info",
+        dismissable=False,
+        className="py-2 px-3 mt-3",
+        style={
+            "backgroundColor": "#0d6efd10",
+            "border": "1px solid #0d6efd55",
+            "color": "#0d6efd",
+            "fontWeight": "500",
+            "borderRadius": "0.5rem",
+        }
+    )
+
+    # Se normaliza el payload una sola vez; todas las vistas usan el mismo modelo
+    with medir("normalizacion"):
+        modelo = obtener_modelo(cuit, data)
+
+    # Gráficos y detalle se arman después, en callbacks encadenados a consulta-datos:
+    # el mensaje y la tabla unificada aparecen apenas llega el payload
+    datos = {"cuit": str(cuit), "huella": modelo.huella(), "filas": len(modelo)}
+    if compacto:
+        compactado, table = modelo.compacto(), no_update
+    else:
+        compactado = no_update
+        with medir("pivot"):
+            table = crear_pivot_table_aggrid(modelo)
+
+    # Con datos vencidos queda activo el reintento periódico
+    actual = {"cuit": str(cuit), "token": token}
+    return msg, table, "", actual, vencida is None, datos, compactado
+
+def _modelo_en_pantalla(datos):
+    """
+    Modelo de la consulta indicada por consulta-datos (sin salir a la red).
+    """
+    cuit = datos["cuit"]
+    modelo = obtener_modelo(cuit, solo_cache=True)
+    if modelo is not None and modelo.huella() != datos["huella"]:
+        # El de este proceso es de una consulta anterior: la nueva se normalizó en un job
+        data = cache.obtener(cuit, permitir_vencida=True)
+        modelo = obtener_modelo(cuit, data) if data else None
+    # Si tampoco coincide, lo que hay es de otra consulta: no se arma nada con él
+    if modelo is None or modelo.huella() != datos["huella"]:
+        raise PreventUpdate
+    return modelo
+
+def _precalentar(cuit, data, con_figuras=True):
+    """
+    Deja listos el modelo y las figuras del payload (en el cache compartido de
+    figuras) para que la consulta posterior solo tenga que armar el layout.
+    """
+    if "error" in data or not data.get("periodos"):
+        return
+    modelo = obtener_modelo(cuit, data)
+    if not con_figuras:
+        return
+    huella = modelo.huella()
+    figuras.obtener(("torta", huella), crear_grafico_torta, modelo)
+    figuras.obtener(("evolucion", huella), _construir_evolucion, modelo)
+
+def register_callbacks(app, segundo_plano=False, render_cliente=False):
 
     @app.callback(
         Output("page-content", "children"),
@@ -27,9 +194,14 @@ def register_callbacks(app):
         State("current-user", "data"),
     )
     def display_page(pathname, current_user):
-        if pathname == "/login" or not current_user:
+        # La página se elige en el servidor: el dashboard (y sus stores) solo se monta con
+        # la sesión iniciada, y volver a /login la cierra y descarta lo que había en pantalla
+        if pathname == "/login":
+            session.pop("usuario", None)
+        usuario = session.get("usuario")
+        if pathname == "/login" or not current_user or not usuario or current_user.get("username") != usuario:
             return login_layout()
-        return dashboard_layout()
+        return dashboard_layout(render_cliente)
 
     @app.callback(
         Output("login-alert", "children"),
@@ -68,7 +240,9 @@ def register_callbacks(app):
         # 2) Verificar credenciales
         user, rol = verificar_credenciales(usuario, contrasena)
         if user:
-            # Login exitoso: redirigimos y almacenamos current-user
+            # Login exitoso: redirigimos y almacenamos current-user (y el usuario en la
+            # sesión de Flask, que es la que habilita las exportaciones)
+            session["usuario"] = user
             return (
                 f"✔️ Bienvenido, {user}!",
                 "success",
@@ -86,173 +260,229 @@ def register_callbacks(app):
             no_update
         )
 
-    @app.callback(
+    # Trabajo de interfaz sin ida y vuelta al servidor (ver assets/clientside.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace="interfaz", function_name="alternar_password"),
         Output("login-password", "type"),
         Input("toggle-pass", "n_clicks"),
         State("login-password", "type"),
         prevent_initial_call=True
     )
-    def toggle_password(n_clicks, tipo):
-        return "text" if tipo == "password" else "password"
+
+    SALIDAS_CONSULTA = [
+        ("consulta-message", "children"),
+        ("tabla-pivot", "children"),
+        ("input-cuit", "value"),
+        ("consulta-actual", "data"),
+        ("reintento-consulta", "disabled"),
+        ("consulta-datos", "data"),
+        ("consulta-modelo", "data"),
+    ]
 
     @app.callback(
-        Output("consulta-message", "children"),
-        Output("tabla-pivot", "children"),
-        Output("grafico-torta", "children"),
-        Output("grafico-evolucion", "children"),
-        Output("tabla-detalle", "children"),
-        Output("input-cuit", "value"),
+        *[Output(id_, prop) for id_, prop in SALIDAS_CONSULTA],
+        Output("consulta-pendiente", "data"),
         Input("consultar-button", "n_clicks"),
         Input("input-cuit", "n_submit"),
         State("input-cuit", "value"),
         prevent_initial_call=True
     )
     def ejecutar_consulta(n_clicks, n_submit, cuit):
+        # La consulta explícita solo exige 11 dígitos: el dígito verificador lo usa la precarga
         if not cuit or not cuit.isdigit() or len(cuit) != 11:
-            msg = dbc.Alert(
-                [
-                    html.Span("❌", className="me-2"),
-                    html.Span("CUIT inválido.")
-                ],
-                color="danger",
-                dismissable=False,
-                className="py-2 px-3 mt-3",
-                style={
-                    "backgroundColor": "#dc354510",
-                    "border": "1px solid #dc354555",
-                    "color": "#dc3545",
-                    "fontWeight": "500",
-                    "borderRadius": "0.5rem",
-                }
-            )
-            return msg, no_update, no_update, no_update, no_update, ""
-
-        data = consultar_deuda_historica(cuit)
-        if "error" in data:
-            msg = dbc.Alert(
-                [
-                    html.Span("❌", className="me-2"),
-                    html.Span(f"Error: {data['error']}")
-                ],
-                color="danger",
-                dismissable=False,
-                className="py-2 px-3 mt-3",
-                style={
-                    "backgroundColor": "#dc354510",
-                    "border": "1px solid #dc354555",
-                    "color": "#dc3545",
-                    "fontWeight": "500",
-                    "borderRadius": "0.5rem",
-                }
-            )
-            return msg, no_update, no_update, no_update, no_update, ""
-
-        if not data.get("periodos"):
-            msg = dbc.Alert(
-                [
-                    html.Span("❌", className="me-2"),
-                    html.Span("El CUIT consultado no tiene información disponible.")
-                ],
-                color="danger",
-                dismissable=False,
-                className="py-2 px-3 mt-3",
-                style={
-                    "backgroundColor": "#dc354510",
-                    "border": "1px solid #dc354555",
-                    "color": "#dc3545",
-                    "fontWeight": "500",
-                    "borderRadius": "0.5rem",
-                }
-            )
-            return msg, no_update, no_update, no_update, no_update, ""
+            return _sin_cambios(_alerta_error("CUIT inválido.")) + (no_update,)
 
+        # Los enlaces de exportación quedan atados a esta consulta y al usuario de la sesión
+        token = firmar_exportacion(cuit)
 
-        razon_social = data["denominacion"]
-        cuit_formateado = formatear_cuit(str(cuit))  # aseguramos que sea string
+        # 1) Si la respuesta está en cache se resuelve acá mismo, en milisegundos
+        data = cache.obtener(cuit)
+        if data is not None:
+            return _renderizar_consulta(cuit, data, render_cliente, token) + (no_update,)
 
-        msg = dbc.Alert(
-            [
-                html.Span("✔", className="me-2"),
-                html.Strong("Datos para: "),
-                html.Span(f"{razon_social} ", className="me-2"),
-                html.Span(f"(CUIT: {cuit_formateado})", className="text-muted")
+        # 2) Con la API caída no se espera a un job: se falla rápido y se sirve lo último conocido
+        if cliente.circuito_abierto():
+            data = consultar_deuda_historica(cuit, permitir_vencida=True)
+            return _renderizar_consulta(cuit, data, render_cliente, token) + (no_update,)
+
+        # 3) Si no, la consulta al BCRA corre como job en segundo plano y el worker queda libre
+        #    (si la precarga del CUIT sigue en vuelo, el job espera su resultado en vez de repetirla)
+        return _sin_cambios(_alerta_consultando()) + ({"cuit": cuit, "pedido": time.time(), "token": token},)
+
+    def consultar_en_segundo_plano(set_progress, pendiente):
+        if not pendiente:
+            raise PreventUpdate
+        cuit = pendiente["cuit"]
+        set_progress("Consultando la Central de Deudores del BCRA…")
+        with medir("consulta_bcra"):
+            data = consultar_deuda_historica(cuit, permitir_vencida=True)
+        set_progress("Procesando la respuesta…")
+        # El job no tiene la sesión: el token ya viene firmado desde el request que lo pidió
+        return _renderizar_consulta(cuit, data, render_cliente, pendiente.get("token"))
+
+    salidas_segundo_plano = [Output(id_, prop, allow_duplicate=True) for id_, prop in SALIDAS_CONSULTA]
+    if segundo_plano:
+        app.callback(
+            *salidas_segundo_plano,
+            Input("consulta-pendiente", "data"),
+            background=True,
+            progress=Output("consulta-progreso", "children"),
+            running=[
+                (Output("consultar-button", "disabled"), True, False),
+                (Output("consulta-en-curso", "style"), {"display": "flex"}, {"display": "none"}),
             ],
-            color="info",
-            dismissable=False,
-            className="py-2 px-3 mt-3",
-            style={
-                "backgroundColor": "#0d6efd10",
-                "border": "1px solid #0d6efd55",
-                "color": "#0d6efd",
-                "fontWeight": "500",
-                "borderRadius": "0.5rem",
-            }
-        )
+            cancel=[Input("cancelar-consulta", "n_clicks")],
+            prevent_initial_call=True
+        )(consultar_en_segundo_plano)
+    else:
+        # Sin administrador de jobs (diskcache no instalado) la consulta corre en el worker
+        @app.callback(*salidas_segundo_plano, Input("consulta-pendiente", "data"), prevent_initial_call=True)
+        def consultar_sin_segundo_plano(pendiente):
+            return consultar_en_segundo_plano(lambda *_: None, pendiente)
 
-        table = crear_pivot_table_aggrid(data["periodos"])
-        
-        periodos = data["periodos"]
-        ultimo = sorted(periodos, key=lambda p: p["periodo"], reverse=True)[0]
-        entidades = ultimo["entidades"]
-
-        # gráfico de torta simple como antes
-        torta = dcc.Graph(
-            figure=crear_grafico_torta(entidades),
-            config={'responsive': True},
-            style={'flex': '1 1 auto', 'minHeight': '0', 'width': '100%'}
-        )
-        
-        # ——— DEBUG: inspeccionamos la figura de evolución antes de renderizarla ———
-        import json
-        from utils.plot_helpers import crear_grafico_evolucion
-        # Generamos la figura y la almacenamos en `fig`
-        fig = crear_grafico_evolucion(data["periodos"])
-        # 1) Layout completo
-        print("LAYOUT JSON:\n", json.dumps(fig.layout.to_plotly_json(), indent=2,default=str))
-        # 2) Tickvals del eje X principal
-        if hasattr(fig.layout, "xaxis") and fig.layout.xaxis.tickvals is not None:
-            tickvals = [d.strftime("%Y-%m") for d in fig.layout.xaxis.tickvals]
-            print("TICKVALS (YYYY-MM):", tickvals)
-        # 3) Configuración de xaxis2 (si existe)
-        if hasattr(fig.layout, "xaxis2"):
-            print("XAXIS2 CONFIG:\n", json.dumps(fig.layout.xaxis2.to_plotly_json(), indent=2,default=str))
-        else:
-            print("No se encontró eje secundario xaxis2.")
-        # ————————————————————————————————————————————————————————————————
-        evo = dcc.Graph(
-            figure=fig,
-            config={'responsive': True},
-            style={'width': '100%', 'height': '100%'}
+    @app.callback(
+        Output("consulta-pendiente", "data", allow_duplicate=True),
+        Output("reintento-consulta", "disabled", allow_duplicate=True),
+        Input("reintento-consulta", "n_intervals"),
+        State("consulta-actual", "data"),
+        prevent_initial_call=True
+    )
+    def reintentar_consulta(n_intervals, actual):
+        # Mientras el circuito siga abierto no tiene sentido volver a consultar
+        if not actual or cliente.circuito_abierto():
+            raise PreventUpdate
+        cuit = actual["cuit"]
+        return {"cuit": cuit, "pedido": time.time(), "token": firmar_exportacion(cuit)}, True
+
+    # Cada vista tiene su propio callback (y su indicador de carga) y se completa por separado
+    if render_cliente:
+        # Gráficos y pivot se arman en el navegador desde el modelo compacto (el servidor
+        # nunca lo recibe de vuelta: sus callbacks se disparan con consulta-datos)
+        for salida, funcion, extra in (
+            (Output("grafico-torta", "children"), "torta", [State("plantilla-graficos", "data")]),
+            (Output("grafico-evolucion", "children"), "evolucion", [State("plantilla-graficos", "data")]),
+            (Output("tabla-pivot", "children", allow_duplicate=True), "pivot", [State("config-pivot", "data")]),
+        ):
+            app.clientside_callback(
+                ClientsideFunction(namespace="render", function_name=funcion),
+                salida,
+                Input("consulta-modelo", "data"),
+                *extra,
+                prevent_initial_call=True
+            )
+    else:
+        @app.callback(
+            Output("grafico-torta", "children"),
+            Input("consulta-datos", "data"),
+            prevent_initial_call=True
         )
+        def renderizar_torta(datos):
+            if not datos:
+                raise PreventUpdate
+            # El modelo solo hace falta si la figura no está en cache
+            with medir("figura_torta"):
+                figura_torta = figuras.obtener(
+                    ("torta", datos["huella"]), lambda: crear_grafico_torta(_modelo_en_pantalla(datos))
+                )
+            return dcc.Graph(
+                figure=figura_torta,
+                config={'responsive': True},
+                style={'flex': '1 1 auto', 'minHeight': '0', 'width': '100%'}
+            )
 
-        header = html.Thead(html.Tr([
-            html.Th("Mes-Año"), html.Th("Entidad"),
-            html.Th("Monto ($)"), html.Th("Situación")
-        ]))
-        rows = []
-        for p in sorted(data["periodos"], key=lambda x: x["periodo"], reverse=True):
-            mes_ano = formatear_periodo(p["periodo"])
-            for ent in p["entidades"]:
-                m = int(ent["monto"] * 1000)
-                rows.append(html.Tr([
-                    html.Td(mes_ano),
-                    html.Td(ent["entidad"]),
-                    html.Td(f"${m:,.0f}".replace(",", ".")),
-                    html.Td(ent.get("situacion", "-"))
-                ]))
-        detalle = dbc.Table(
-            [header] + rows,
-            striped=True, bordered=True, hover=True, responsive=True
+        @app.callback(
+            Output("grafico-evolucion", "children"),
+            Input("consulta-datos", "data"),
+            prevent_initial_call=True
         )
+        def renderizar_evolucion(datos):
+            if not datos:
+                raise PreventUpdate
+            with medir("figura_evolucion"):
+                fig = figuras.obtener(
+                    ("evolucion", datos["huella"]), lambda: _construir_evolucion(_modelo_en_pantalla(datos))
+                )
+            return dcc.Graph(
+                figure=fig,
+                config={'responsive': True},
+                style={'width': '100%', 'height': '100%'}
+            )
+
+    @app.callback(
+        Output("tabla-detalle", "children"),
+        Input("consulta-datos", "data"),
+        prevent_initial_call=True
+    )
+    def renderizar_detalle(datos):
+        if not datos:
+            raise PreventUpdate
+        # Detalle virtualizado: las filas se piden por ventanas a paginar_detalle
+        with medir("detalle"):
+            return crear_tabla_detalle_aggrid(datos["cuit"], datos["huella"], datos["filas"])
 
-        return msg, table, torta, evo, detalle,""
+    # El navegador avisa cuando el CUIT tipeado está completo (ver assets/precarga.js)
+    app.clientside_callback(
+        ClientsideFunction(namespace="precarga", function_name="cuit_completo"),
+        Output("cuit-completo", "data"),
+        Input("input-cuit", "value"),
+        prevent_initial_call=True
+    )
 
     @app.callback(
-        Output("download-excel", "data"),
-        Input("export-excel", "n_clicks"),
-        State("tabla-pivot-table", "data"),
+        Output("precarga-pendiente", "data"),
+        Input("cuit-completo", "data"),
         prevent_initial_call=True
     )
-    def exportar_excel(n, data):
-        df = pd.DataFrame(data)
-        return dcc.send_data_frame(df.to_excel, "tabla_unificada.xlsx", index=False)
+    def precargar_consulta(cuit):
+        # Solo se sale a la red si la consulta no se resolvería ya desde el cache
+        if not cuit_valido(cuit) or cache.obtener(cuit) is not None or cliente.circuito_abierto():
+            raise PreventUpdate
+        return {"cuit": cuit, "pedido": time.time()}
+
+    def precargar_en_segundo_plano(pendiente):
+        if not pendiente:
+            raise PreventUpdate
+        cuit = pendiente["cuit"]
+        with medir("precarga"):
+            _precalentar(cuit, consultar_deuda_historica(cuit, permitir_vencida=True), con_figuras=not render_cliente)
+        return cuit
+
+    app.callback(
+        Output("precarga-lista", "data"),
+        Input("precarga-pendiente", "data"),
+        background=segundo_plano,
+        prevent_initial_call=True
+    )(precargar_en_segundo_plano)
+
+    @app.callback(
+        Output({"type": "tabla-detalle-grid", "cuit": MATCH, "huella": MATCH}, "getRowsResponse"),
+        Input({"type": "tabla-detalle-grid", "cuit": MATCH, "huella": MATCH}, "getRowsRequest"),
+        prevent_initial_call=True
+    )
+    def paginar_detalle(request):
+        if not request:
+            raise PreventUpdate
+        # Nunca sale a la red desde el worker: el modelo debe ser el de la grilla (misma huella)
+        with medir("pagina_detalle"):
+            return pagina_detalle(_modelo_en_pantalla(callback_context.triggered_id), request)
+
+    # Los enlaces de exportación apuntan a la última consulta (se generan en el servidor y
+    # solo se sirven a la sesión que la hizo: ver auth.firmar_exportacion)
+    app.clientside_callback(
+        """
+        function(actual) {
+            const ok = !!(actual && actual.token);
+            const hrefs = ["xlsx", "csv", "parquet"].map(
+                f => ok ? `/exportar/${f}/${actual.cuit}?token=${encodeURIComponent(actual.token)}` : null
+            );
+            return [...hrefs, !ok, !ok, !ok];
+        }
+        """,
+        Output("exportar-xlsx", "href"),
+        Output("exportar-csv", "href"),
+        Output("exportar-parquet", "href"),
+        Output("exportar-xlsx", "disabled"),
+        Output("exportar-csv", "disabled"),
+        Output("exportar-parquet", "disabled"),
+        Input("consulta-actual", "data"),
+    )
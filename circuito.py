@@ -0,0 +1,120 @@
+# circuito.py
+import os
+import time
+
+from compartido import compartido
+
+# Fallas consecutivas (timeouts, errores de conexión, 5xx/429) que abren el circuito (0 = desactivado)
+FALLAS = int(os.environ.get("BCRA_CIRCUITO_FALLAS", 5))
+# Una respuesta exitosa más lenta que esto cuenta como falla para abrir el circuito
+LENTO = float(os.environ.get("BCRA_CIRCUITO_LENTO", 8))
+# Segundos que el circuito queda abierto antes de dejar pasar un request de prueba
+ESPERA = float(os.environ.get("BCRA_CIRCUITO_ESPERA", 30))
+# Si el request de prueba no informa resultado en este tiempo se permite otro
+ESPERA_SONDEO = float(os.environ.get("BCRA_CIRCUITO_ESPERA_SONDEO", 30))
+
+CERRADO, ABIERTO, SEMIABIERTO = "cerrado", "abierto", "semiabierto"
+
+
+class Circuito:
+    """
+    Circuit breaker con el estado en el almacén compartido, visto por todos
+    los workers y los procesos de jobs en segundo plano (un estado en memoria
+    sería uno distinto por proceso).
+
+    - cerrado: pasan todos los requests; FALLAS fallas seguidas lo abren.
+    - abierto: ningún request sale hasta que pasen ESPERA segundos.
+    - semiabierto: un único request de prueba; si sale bien se cierra, si
+      falla se vuelve a abrir.
+    """
+
+    def __init__(self, nombre, almacen=None, fallas=FALLAS, lento=LENTO, espera=ESPERA,
+                 espera_sondeo=ESPERA_SONDEO):
+        self.nombre = nombre
+        self.almacen = almacen or compartido
+        self.fallas = fallas
+        self.lento = lento
+        self.espera = espera
+        self.espera_sondeo = espera_sondeo
+        self._creado = False
+
+    def _conectar(self):
+        conn = self.almacen.conexion()
+        if not self._creado:
+            conn.execute(
+                "INSERT OR IGNORE INTO circuitos (nombre, estado, fallas, hasta) VALUES (?, ?, 0, 0)",
+                (self.nombre, CERRADO)
+            )
+            self._creado = True
+        return conn
+
+    def _leer(self, conn):
+        return conn.execute(
+            "SELECT estado, fallas, hasta FROM circuitos WHERE nombre = ?", (self.nombre,)
+        ).fetchall()[0]
+
+    def estado(self):
+        """
+        (estado, fallas seguidas, timestamp hasta el que sigue abierto o en prueba).
+        """
+        return self._leer(self._conectar())
+
+    def abierto(self):
+        """
+        True si hoy un request sería rechazado (abierto o con una prueba en curso).
+        """
+        if not self.fallas:
+            return False
+        estado, _, hasta = self.estado()
+        return estado != CERRADO and time.time() < hasta
+
+    def permitir(self):
+        """
+        Indica si el request puede salir. Al vencer la espera, solo el primero
+        que llega pasa (como prueba).
+        """
+        if not self.fallas:
+            return True
+        conn = self._conectar()
+        estado, _, hasta = self._leer(conn)
+        ahora = time.time()
+        if estado == CERRADO:
+            return True
+        if ahora < hasta:
+            return False
+        # Se toma la prueba solo si nadie la tomó entre la lectura y el UPDATE
+        cursor = conn.execute(
+            "UPDATE circuitos SET estado = ?, hasta = ? WHERE nombre = ? AND estado = ? AND hasta = ?",
+            (SEMIABIERTO, ahora + self.espera_sondeo, self.nombre, estado, hasta)
+        )
+        return cursor.rowcount == 1
+
+    def registrar(self, exito, duracion=0.0):
+        """
+        Informa el resultado de un request que salió por permitir().
+        """
+        if not self.fallas:
+            return
+        if exito and duracion > self.lento:
+            exito = False
+        estado, fallas, _ = self._leer(self._conectar())
+        if exito and estado == CERRADO and fallas == 0:
+            return
+        with self.almacen.transaccion() as conn:
+            estado, fallas, hasta = self._leer(conn)
+            if exito:
+                estado, fallas, hasta = CERRADO, 0, 0
+            else:
+                fallas += 1
+                if estado == SEMIABIERTO or fallas >= self.fallas:
+                    estado, hasta = ABIERTO, time.time() + self.espera
+            conn.execute(
+                "UPDATE circuitos SET estado = ?, fallas = ?, hasta = ? WHERE nombre = ?",
+                (estado, fallas, hasta, self.nombre)
+            )
+
+    def reiniciar(self):
+        self._conectar().execute(
+            "UPDATE circuitos SET estado = ?, fallas = 0, hasta = 0 WHERE nombre = ?",
+            (CERRADO, self.nombre)
+        )
@@ -0,0 +1,191 @@
+# compartido.py
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+RUTA = os.environ.get("APP_COMPARTIDO_DB", os.path.join(tempfile.gettempdir(), "appveraz_compartido.db"))
+# Cota del almacén clave-valor (figuras y otros resultados compartidos)
+MAX_BYTES_KV = int(os.environ.get("APP_COMPARTIDO_MAX_BYTES", 256 * 1024 * 1024))
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS kv (
+        clave TEXT PRIMARY KEY,
+        valor BLOB NOT NULL,
+        bytes INTEGER NOT NULL,
+        creado REAL NOT NULL,
+        vence REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_kv_creado ON kv (creado);
+    CREATE TABLE IF NOT EXISTS buckets (
+        nombre TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        ultimo REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS circuitos (
+        nombre TEXT PRIMARY KEY,
+        estado TEXT NOT NULL,
+        fallas INTEGER NOT NULL,
+        hasta REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS latencias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        segundos REAL NOT NULL,
+        cobertura INTEGER NOT NULL,
+        registrado REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_latencias_nombre ON latencias (nombre, id);
+    CREATE TABLE IF NOT EXISTS metricas (
+        proceso TEXT NOT NULL,
+        nombre TEXT NOT NULL,
+        etiquetas TEXT NOT NULL,
+        cantidad INTEGER NOT NULL,
+        suma REAL NOT NULL,
+        valores BLOB NOT NULL,
+        PRIMARY KEY (proceso, nombre, etiquetas)
+    );
+    CREATE TABLE IF NOT EXISTS metricas_gauges (
+        proceso TEXT NOT NULL,
+        nombre TEXT NOT NULL,
+        etiquetas TEXT NOT NULL,
+        valor REAL NOT NULL,
+        PRIMARY KEY (proceso, nombre, etiquetas)
+    );
+"""
+
+
+class AlmacenCompartido:
+    """
+    Estado compartido por todos los workers y jobs en segundo plano de la
+    máquina: SQLite en modo WAL (las lecturas no esperan a las escrituras)
+    con una conexión por thread. Las operaciones que leen y escriben van en
+    transacción() para ser atómicas entre procesos.
+    """
+
+    def __init__(self, ruta=RUTA, max_bytes_kv=MAX_BYTES_KV):
+        self.ruta = ruta
+        self.max_bytes_kv = max_bytes_kv
+        self._local = threading.local()
+        self._guardados = 0
+
+    def conexion(self):
+        # La conexión se abre por thread y por proceso: no se usa una heredada de un fork
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != pid:
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(self.ruta, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(ESQUEMA)
+            self._local.conn, self._local.pid = conn, pid
+        return conn
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Transacción con el lock de escritura tomado desde el inicio.
+        """
+        conn = self.conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def lectura(self):
+        """
+        Transacción de solo lectura: una foto consistente sin el lock de escritura.
+        """
+        conn = self.conexion()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.execute("COMMIT")
+
+    def obtener(self, clave):
+        filas = self.conexion().execute("SELECT valor, vence FROM kv WHERE clave = ?", (clave,)).fetchall()
+        if not filas or (filas[0][1] is not None and filas[0][1] < time.time()):
+            return None
+        return filas[0][0]
+
+    def guardar(self, clave, valor, ttl=None):
+        ahora = time.time()
+        with self.transaccion() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (clave, valor, bytes, creado, vence) VALUES (?, ?, ?, ?, ?)",
+                (clave, valor, len(valor), ahora, ahora + ttl if ttl else None)
+            )
+        # La cota se controla cada tanto: sumar los bytes en cada escritura no vale la pena
+        self._guardados += 1
+        if self._guardados % 50 == 0:
+            self._desalojar()
+
+    def _desalojar(self):
+        with self.transaccion() as conn:
+            conn.execute("DELETE FROM kv WHERE vence IS NOT NULL AND vence < ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM kv").fetchall()[0][0]
+            if total <= self.max_bytes_kv:
+                return
+            sobrantes = []
+            for clave, tam in conn.execute("SELECT clave, bytes FROM kv ORDER BY creado"):
+                if total <= self.max_bytes_kv:
+                    break
+                sobrantes.append((clave,))
+                total -= tam
+            conn.executemany("DELETE FROM kv WHERE clave = ?", sobrantes)
+
+    def tomar_token(self, nombre, tasa, rafaga):
+        """
+        Token bucket atómico entre procesos. Devuelve 0 si tomó un token o los
+        segundos que faltan para el próximo.
+        """
+        with self.transaccion() as conn:
+            ahora = time.time()
+            filas = conn.execute("SELECT tokens, ultimo FROM buckets WHERE nombre = ?", (nombre,)).fetchall()
+            tokens, ultimo = filas[0] if filas else (rafaga, ahora)
+            tokens = min(rafaga, tokens + max(0.0, ahora - ultimo) * tasa)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / tasa
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (nombre, tokens, ultimo) VALUES (?, ?, ?)",
+                (nombre, tokens, ahora)
+            )
+        return espera
+
+
+class LimitadorCompartido:
+    """
+    Token bucket global (todos los workers y jobs): misma interfaz que
+    bcra_client.LimitadorTasa.
+    """
+
+    def __init__(self, nombre, tasa, rafaga=None, almacen=None):
+        self.nombre = nombre
+        self.tasa = float(tasa)
+        self.rafaga = float(rafaga or max(1.0, self.tasa))
+        self.almacen = almacen or compartido
+
+    def intentar(self):
+        return self.almacen.tomar_token(self.nombre, self.tasa, self.rafaga)
+
+    def adquirir(self):
+        while True:
+            espera = self.intentar()
+            if not espera:
+                return
+            time.sleep(espera)
+
+
+compartido = AlmacenCompartido()
@@ -0,0 +1,142 @@
+# compresion.py
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Las respuestas dinámicas más chicas que esto viajan sin comprimir (no vale el CPU)
+MIN_BYTES = int(os.environ.get("APP_COMPRIMIR_MIN_BYTES", 1024))
+# Niveles para respuestas dinámicas (callbacks): rápidos, se pagan en cada request
+NIVEL_GZIP = int(os.environ.get("APP_GZIP_NIVEL", 6))
+CALIDAD_BROTLI = int(os.environ.get("APP_BROTLI_CALIDAD", 5))
+# Los estáticos se comprimen una sola vez por proceso: brotli 11 tarda ~10 s en los
+# bundles de varios MB, 9 menos de 1 s con ~10 % más de bytes
+NIVEL_GZIP_ESTATICOS = 9
+CALIDAD_BROTLI_ESTATICOS = int(os.environ.get("APP_BROTLI_CALIDAD_ESTATICOS", 9))
+# Tope de bytes de estáticos comprimidos en memoria por proceso (los de la página ocupan ~1.5 MB)
+MAX_BYTES_PRECOMPRIMIDOS = int(os.environ.get("APP_PRECOMPRIMIDOS_MAX_BYTES", 32 * 1024 * 1024))
+
+TIPOS_COMPRIMIBLES = (
+    "text/", "application/json", "application/javascript", "application/x-javascript", "image/svg+xml",
+)
+# Un año: las URLs de estáticos llevan huella (?m=<mtime> o la versión en el nombre)
+MAX_AGE_ESTATICOS = 365 * 24 * 3600
+
+
+def codificacion_aceptada(accept_encodings):
+    """
+    "br", "gzip" o None según el Accept-Encoding del request (werkzeug).
+    """
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def comprimir(datos, codificacion, estatico=False):
+    if codificacion == "br":
+        return brotli.compress(datos, quality=CALIDAD_BROTLI_ESTATICOS if estatico else CALIDAD_BROTLI)
+    return gzip.compress(datos, compresslevel=NIVEL_GZIP_ESTATICOS if estatico else NIVEL_GZIP, mtime=0)
+
+
+class Precomprimidos:
+    """
+    Versiones comprimidas de los estáticos (assets y bundles de componentes),
+    calculadas la primera vez que se piden y reutilizadas después. La clave es
+    la ruta (sin query: no se puede inflar con parámetros inventados) más el
+    ETag; los bundles llevan la versión en la ruta. LRU acotado a max_bytes.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES_PRECOMPRIMIDOS):
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, codificacion, leer):
+        clave = (clave, codificacion)
+        with self._lock:
+            datos = self._datos.get(clave)
+            if datos is not None:
+                self._datos.move_to_end(clave)
+                return datos
+        datos = comprimir(leer(), codificacion, estatico=True)
+        if len(datos) > self.max_bytes:
+            return datos
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            self._bytes += len(datos) - (len(anterior) if anterior is not None else 0)
+            self._datos[clave] = datos
+            while self._bytes > self.max_bytes:
+                self._bytes -= len(self._datos.popitem(last=False)[1])
+        return datos
+
+    def estadisticas(self):
+        with self._lock:
+            return {"entradas": len(self._datos), "bytes": self._bytes}
+
+
+precomprimidos = Precomprimidos()
+
+
+def comprimir_respuesta(response, request, estatico=False):
+    """
+    Comprime en el lugar una respuesta 200 de tipo texto/JSON si el cliente lo
+    acepta. Los estáticos salen de Precomprimidos; las respuestas dinámicas
+    se comprimen si superan MIN_BYTES. Devuelve la codificación usada o None.
+    """
+    if (
+        response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or not response.mimetype.startswith(TIPOS_COMPRIMIBLES)
+    ):
+        return None
+    # Los streams (exportaciones) no se bufferizan; los archivos estáticos sí se pueden leer
+    if response.is_streamed and not estatico:
+        return None
+    codificacion = codificacion_aceptada(request.accept_encodings)
+    response.vary.add("Accept-Encoding")
+    if codificacion is None:
+        return None
+
+    if estatico:
+        etag = response.get_etag()[0] or ""
+        response.direct_passthrough = False
+        datos = precomprimidos.obtener((request.path, etag), codificacion, response.get_data)
+        # Con la versión ya comprimida el archivo abierto por send_file no se llega a leer
+        if hasattr(response.response, "close"):
+            response.response.close()
+        if etag:
+            # El contenido codificado no es idéntico byte a byte al del ETag original
+            response.set_etag(etag, weak=True)
+    else:
+        crudo = response.get_data()
+        if len(crudo) < MIN_BYTES:
+            return None
+        datos = comprimir(crudo, codificacion)
+
+    response.set_data(datos)
+    response.headers["Content-Encoding"] = codificacion
+    # Los rangos se referirían al contenido sin comprimir
+    response.headers.pop("Accept-Ranges", None)
+    return codificacion
+
+
+def cachear_estatico(response, request):
+    """
+    Cache-Control de un año (immutable) para estáticos pedidos con huella:
+    los assets con ?m=<mtime> y el favicon con ?v=<versión> que agrega Dash,
+    y los bundles versionados.
+    """
+    huella = request.args.get("m") or request.args.get("v")
+    if response.status_code == 200 and (huella or response.cache_control.max_age):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = MAX_AGE_ESTATICOS
+        response.cache_control.immutable = True
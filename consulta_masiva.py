@@ -0,0 +1,161 @@
+# consulta_masiva.py
+"""
+Consulta masiva de deuda histórica para listas de CUITs.
+
+Uso:
+    python consulta_masiva.py cuits.txt --salida resultados.jsonl --workers 8 --rps 5
+
+--rps acota el lote sin saltear el límite global BCRA_MAX_RPS que comparte con
+la app (workers y jobs): rige el más estricto de los dos.
+
+Los resultados se escriben a medida que llegan (una línea JSON por CUIT). Si el
+proceso se interrumpe, volver a ejecutarlo con la misma salida retoma desde los
+CUITs que todavía no tienen un resultado exitoso.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from bcra_client import cliente, LimitadorCombinado, LimitadorTasa
+from sql_api import consultar_deuda_historica
+
+
+class EstadisticasLote:
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.exitosos = 0
+        self.fallidos = 0
+        self.omitidos = 0
+
+    @property
+    def procesados(self):
+        return self.exitosos + self.fallidos
+
+    def resumen(self):
+        duracion = time.monotonic() - self.inicio
+        return {
+            "procesados": self.procesados,
+            "exitosos": self.exitosos,
+            "fallidos": self.fallidos,
+            "omitidos": self.omitidos,
+            "segundos": round(duracion, 2),
+            "cuits_por_segundo": round(self.procesados / duracion, 2) if duracion else 0.0,
+        }
+
+
+def cuits_procesados(ruta_salida):
+    """
+    CUITs con un resultado exitoso en una salida JSONL previa.
+    """
+    hechos = set()
+    if not ruta_salida or not os.path.exists(ruta_salida):
+        return hechos
+    with open(ruta_salida, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                # Última línea truncada por una caída: se vuelve a consultar
+                continue
+            if "error" not in registro:
+                hechos.add(registro["cuit"])
+    return hechos
+
+
+def _consultar(cuit, usar_cache):
+    if not cuit.isdigit() or len(cuit) != 11:
+        return {"error": "CUIT inválido."}
+    return consultar_deuda_historica(cuit, usar_cache=usar_cache)
+
+
+def consultar_lote(cuits, max_workers=8, omitir=(), usar_cache=True, estadisticas=None):
+    """
+    Consulta los CUITs con concurrencia acotada y devuelve (cuit, data) a medida
+    que se completan. Nunca mantiene más de 2 * max_workers consultas pendientes,
+    por lo que el iterable de entrada puede ser arbitrariamente grande.
+    """
+    estadisticas = estadisticas or EstadisticasLote()
+    omitir = set(omitir)
+    pendientes = {}
+    entrada = iter(cuits)
+    agotada = False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            # 1) Completar la ventana de consultas en vuelo
+            while not agotada and len(pendientes) < 2 * max_workers:
+                try:
+                    cuit = str(next(entrada)).strip().replace("-", "")
+                except StopIteration:
+                    agotada = True
+                    break
+                if not cuit:
+                    continue
+                if cuit in omitir:
+                    estadisticas.omitidos += 1
+                    continue
+                omitir.add(cuit)
+                pendientes[pool.submit(_consultar, cuit, usar_cache)] = cuit
+
+            if not pendientes:
+                return
+
+            # 2) Entregar lo que ya terminó
+            listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                cuit = pendientes.pop(futuro)
+                try:
+                    data = futuro.result()
+                except Exception as e:
+                    data = {"error": str(e)}
+                if "error" in data:
+                    estadisticas.fallidos += 1
+                else:
+                    estadisticas.exitosos += 1
+                yield cuit, data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consulta masiva de la Central de Deudores del BCRA")
+    parser.add_argument("entrada", help="Archivo con un CUIT por línea ('-' para stdin)")
+    parser.add_argument("--salida", required=True, help="Archivo JSONL de resultados (se retoma si existe)")
+    parser.add_argument("--workers", type=int, default=8, help="Consultas concurrentes")
+    parser.add_argument("--rps", type=float, default=0,
+                        help="Máximo de requests por segundo del lote (además de BCRA_MAX_RPS; 0 = sin límite propio)")
+    parser.add_argument("--sin-cache", action="store_true", help="Ignorar el cache local")
+    args = parser.parse_args(argv)
+
+    if args.rps:
+        # Sin reemplazar el limitador compartido con la app (BCRA_MAX_RPS): rige el más estricto
+        cliente.limitador = LimitadorCombinado(LimitadorTasa(args.rps), cliente.limitador)
+    # El lote no es interactivo: no consume el presupuesto de hedging de la app
+    cliente.cobertura = False
+
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+    estadisticas = EstadisticasLote()
+    try:
+        with open(args.salida, "a", encoding="utf-8") as salida:
+            for cuit, data in consultar_lote(
+                entrada,
+                max_workers=args.workers,
+                omitir=cuits_procesados(args.salida),
+                usar_cache=not args.sin_cache,
+                estadisticas=estadisticas,
+            ):
+                salida.write(json.dumps({"cuit": cuit, **data}, ensure_ascii=False) + "\n")
+                salida.flush()
+    except KeyboardInterrupt:
+        print("Interrumpido: volver a ejecutar con la misma salida para retomar.", file=sys.stderr)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        print(json.dumps(estadisticas.resumen(), ensure_ascii=False), file=sys.stderr)
+
+    return 1 if estadisticas.fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# gunicorn.conf.py
+# Uso: gunicorn -c gunicorn.conf.py
+import importlib.util
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:application"
+bind = os.environ.get("APP_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("APP_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# La app se importa y precalienta una vez en el maestro (wsgi.precalentar) y los
+# workers se forkean ya listos: escalar workers en una ráfaga no repite el arranque
+preload_app = True
+
+# Con los callbacks en segundo plano (diskcache) el pool de jobs forkea sus procesos desde
+# el worker (al arrancar y al reemplazar uno cancelado): con otros threads vivos el hijo
+# puede heredar locks tomados, así que un thread por worker (se avisa si APP_THREADS pedía más)
+_threads_pedidos = int(os.environ.get("APP_THREADS", 4))
+if importlib.util.find_spec("diskcache") is not None:
+    threads = 1
+else:
+    threads = _threads_pedidos
+
+timeout = int(os.environ.get("APP_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("APP_GRACEFUL_TIMEOUT", 30))
+
+
+def on_starting(server):
+    if "APP_THREADS" in os.environ and _threads_pedidos != threads:
+        server.log.warning(
+            "APP_THREADS=%d ignorado: con diskcache (callbacks en segundo plano) cada "
+            "worker corre %d thread; escalar con APP_WORKERS", _threads_pedidos, threads
+        )
+
+
+def post_fork(server, worker):
+    from wsgi import al_forkear
+    al_forkear()
+
+
+def worker_exit(server, worker):
+    from wsgi import al_terminar
+    al_terminar()
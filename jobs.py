@@ -0,0 +1,179 @@
+# jobs.py
+import functools
+import multiprocessing
+import os
+import signal
+import uuid
+
+from dash import DiskcacheManager
+
+from metricas import registro
+
+# Procesos de larga vida por worker que corren los callbacks en segundo plano
+PROCESOS = int(os.environ.get("APP_JOBS_PROCESOS", 2))
+
+# Estado de un job en el diskcache: PENDIENTE (en cola), el pid del proceso que lo
+# corre, TERMINANDO (la función ya volvió y solo falta guardar el resultado) o
+# (CANCELADO, pid) si se canceló desde un worker que no es el dueño del proceso
+PENDIENTE, TERMINANDO, CANCELADO = "pendiente", "terminando", "cancelado"
+
+# Gestor del proceso: los procesos del pool buscan en él la función de cada job
+_gestor = None
+
+
+def _iniciar_proceso():
+    # Los procesos del pool heredan los handlers del worker de gunicorn: se vuelve a los
+    # de fábrica para que Pool.terminate() funcione y Ctrl-C solo le llegue al worker
+    for senal in (signal.SIGTERM, signal.SIGQUIT, signal.SIGHUP, signal.SIGUSR1, signal.SIGUSR2,
+                  signal.SIGWINCH, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(senal, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # La conexión SQLite del diskcache abierta por el worker no se comparte
+    _gestor.handle.close()
+
+
+class JobCancelado(Exception):
+    """
+    Resultado de un job cuyo proceso se mató al cancelarlo.
+    """
+
+
+def _ejecutar(clave_fn, job, key, progress_key, args, context):
+    _gestor._correr(clave_fn, job, key, progress_key, args, context)
+
+
+class GestorJobs(DiskcacheManager):
+    """
+    DiskcacheManager que corre los jobs en un pool de procesos de larga vida
+    en lugar de forkear un proceso por job: lo que cada proceso arma una vez
+    (sesión keep-alive con el BCRA, caches en memoria, métricas) sirve para
+    los jobs siguientes. El estado de cada job queda en el diskcache, así
+    que cualquier worker puede sondearlo o cancelarlo.
+    """
+
+    def __init__(self, cache, procesos=PROCESOS, **kwargs):
+        global _gestor
+        super().__init__(cache, **kwargs)
+        self.procesos = procesos
+        self._pool = None
+        self._pid = None
+        self._job_actual = None
+        # Jobs lanzados por este worker que siguen en el pool: job -> ApplyResult
+        self._resultados = {}
+        _gestor = self
+
+    def _clave_estado(self, job):
+        return f"appveraz-job-{job}"
+
+    def iniciar(self):
+        """
+        Pool de este proceso; se crea una vez por worker (no se hereda de un fork).
+        Conviene llamarlo apenas arranca el worker, mientras tiene un solo thread.
+        """
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = multiprocessing.get_context("fork").Pool(self.procesos, initializer=_iniciar_proceso)
+            self._pid = os.getpid()
+            self._resultados = {}
+        return self._pool
+
+    def make_job_fn(self, fn, progress, key=None):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # Desde acá ya no se mata el proceso al cancelar: solo falta guardar el resultado
+                self.handle.set(self._clave_estado(self._job_actual), TERMINANDO)
+        return super().make_job_fn(envoltura, progress, key)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        clave_fn = next(clave for clave, funcion in self.func_registry.items() if funcion is job_fn)
+        job = uuid.uuid4().hex
+        self.handle.set(self._clave_estado(job), PENDIENTE)
+        self._atender_cancelaciones()
+
+        def quitar(_):
+            self._resultados.pop(job, None)
+
+        self._resultados[job] = self.iniciar().apply_async(
+            _ejecutar, (clave_fn, job, key, self._make_progress_key(key), args, dict(context)),
+            callback=quitar, error_callback=quitar,
+        )
+        return job
+
+    def _correr(self, clave_fn, job, key, progress_key, args, context):
+        # En un proceso del pool
+        estado = self._clave_estado(job)
+        with self.handle.transact():
+            if self.handle.get(estado) != PENDIENTE:
+                return  # Cancelado antes de empezar
+            self.handle.set(estado, os.getpid())
+        self._job_actual = job
+        try:
+            self.func_registry[clave_fn](key, progress_key, args, context)
+        finally:
+            self.handle.delete(estado)
+            self._job_actual = None
+            registro.publicar()
+
+    def _es_del_pool(self, pid):
+        return (self._pool is not None and self._pid == os.getpid()
+                and pid in {proceso.pid for proceso in self._pool._pool})
+
+    def _matar(self, job, pid):
+        """
+        Mata el proceso que corre el job solo si es del pool de este worker
+        (el pid viene del diskcache) y da por terminado su ApplyResult.
+        """
+        if not self._es_del_pool(pid):
+            return False
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._descartar(job)
+        return True
+
+    def _descartar(self, job):
+        # El pool reemplaza el proceso muerto pero el resultado nunca llegaría y
+        # el ApplyResult quedaría para siempre en su _cache
+        resultado = self._resultados.pop(job, None)
+        if resultado is not None and not resultado.ready():
+            try:
+                resultado._set(0, (False, JobCancelado(job)))
+            except KeyError:
+                pass  # El pool lo completó mientras tanto
+
+    def _atender_cancelaciones(self):
+        # Jobs de este worker cancelados desde otro: se matan acá
+        for job in list(self._resultados):
+            estado = self._clave_estado(job)
+            with self.handle.transact():
+                valor = self.handle.get(estado)
+                if isinstance(valor, tuple):
+                    if not self._matar(job, valor[1]):
+                        self._descartar(job)  # El proceso ya no estaba
+                    self.handle.delete(estado)
+
+    def job_running(self, job):
+        self._atender_cancelaciones()
+        return job is not None and self.handle.get(self._clave_estado(job)) is not None
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        estado = self._clave_estado(job)
+        with self.handle.transact():
+            valor = self.handle.get(estado)
+            if valor is None or valor == TERMINANDO or isinstance(valor, tuple):
+                return
+            if valor == PENDIENTE or self._matar(job, valor):
+                # Sin empezar, o en curso y muerto acá: el pool reemplaza el proceso
+                self.handle.delete(estado)
+            else:
+                # Lo corre el pool de otro worker: lo mata ese worker al ver la marca
+                self.handle.set(estado, (CANCELADO, valor))
+
+    def terminate_unhealthy_job(self, job):
+        # Los procesos del pool no quedan zombies: un job terminado ya no tiene estado
+        return False
@@ -0,0 +1,97 @@
+# latencias.py
+import os
+import threading
+import time
+from collections import deque
+
+from compartido import compartido
+
+# Requests recientes que se usan para estimar los percentiles
+VENTANA = int(os.environ.get("BCRA_LATENCIAS_VENTANA", 500))
+# Cada proceso junta las muestras y las escribe de a LOTE (o cada REFRESCO segundos) y
+# recalcula los percentiles con esa misma frecuencia: no una escritura y un sort por request
+LOTE = int(os.environ.get("BCRA_LATENCIAS_LOTE", 20))
+REFRESCO = float(os.environ.get("BCRA_LATENCIAS_REFRESCO", 5))
+
+
+class HistorialLatencias:
+    """
+    Ventana móvil con la duración de los últimos requests a la API, compartida
+    por workers y jobs en segundo plano. La fracción de requests que fueron de
+    cobertura (hedge) se lleva por proceso y cuenta cada hedge al lanzarlo,
+    termine como termine: acotarla en cada proceso la acota en total.
+    """
+
+    def __init__(self, nombre, almacen=None, ventana=VENTANA, lote=LOTE, refresco=REFRESCO):
+        self.nombre = nombre
+        self.almacen = almacen or compartido
+        self.ventana = ventana
+        self.lote = lote
+        self.refresco = refresco
+        self._reiniciar()
+        os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self):
+        # Un proceso forkeado no hereda las muestras sin escribir ni los percentiles del padre
+        self._lock = threading.Lock()
+        self._nuevas = []
+        self._escrito = time.monotonic()
+        self._resumen = None
+        self._calculado = 0.0
+        self._lanzados = deque(maxlen=self.ventana)
+
+    def registrar(self, segundos, cobertura=False):
+        with self._lock:
+            self._nuevas.append((self.nombre, segundos, int(cobertura), time.time()))
+            if len(self._nuevas) < self.lote and time.monotonic() - self._escrito < self.refresco:
+                return
+            nuevas, self._nuevas = self._nuevas, []
+            self._escrito = time.monotonic()
+            self._resumen = None
+        self._escribir(nuevas)
+
+    def _escribir(self, nuevas):
+        with self.almacen.transaccion() as conn:
+            conn.executemany(
+                "INSERT INTO latencias (nombre, segundos, cobertura, registrado) VALUES (?, ?, ?, ?)", nuevas
+            )
+            conn.execute(
+                "DELETE FROM latencias WHERE nombre = ? AND id <= "
+                "(SELECT MAX(id) FROM latencias WHERE nombre = ?) - ?",
+                (self.nombre, self.nombre, 2 * self.ventana)
+            )
+
+    def lanzado(self, cobertura=False):
+        """
+        Anota un request que sale a la API (el original o su hedge).
+        """
+        self._lanzados.append(int(cobertura))
+
+    def resumen(self):
+        """
+        Percentiles de la ventana: {"muestras", "p50", "p95", "p99", "coberturas"},
+        donde coberturas es la fracción de requests lanzados por este proceso que
+        fueron hedges. Se recalcula cada `lote` muestras o `refresco` segundos.
+        """
+        resumen = self._resumen
+        if resumen is None or time.monotonic() - self._calculado >= self.refresco:
+            resumen = self._calcular()
+        lanzados = list(self._lanzados)
+        return {**resumen, "coberturas": sum(lanzados) / len(lanzados) if lanzados else 0.0}
+
+    def _calcular(self):
+        filas = self.almacen.conexion().execute(
+            "SELECT segundos FROM latencias WHERE nombre = ? ORDER BY id DESC LIMIT ?",
+            (self.nombre, self.ventana)
+        ).fetchall()
+        if not filas:
+            resumen = {"muestras": 0, "p50": None, "p95": None, "p99": None}
+        else:
+            valores = sorted(f[0] for f in filas)
+            n = len(valores)
+            resumen = {
+                "muestras": n,
+                **{f"p{int(q * 100)}": valores[min(n - 1, int(q * n))] for q in (0.5, 0.95, 0.99)},
+            }
+        self._resumen, self._calculado = resumen, time.monotonic()
+        return resumen
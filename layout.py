@@ -1,8 +1,23 @@
 # layout.py
+import os
 
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 
+from utils.data_tables_aggrid import config_pivot
+from utils.plot_helpers import plantilla_figuras
+
+CARPETA_ASSETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+def url_asset(ruta):
+    """
+    URL del asset con huella (?m=<mtime>, como las que arma Dash para css/js):
+    se cachea por un año y cambia cuando cambia el archivo.
+    """
+    return f"/assets/{ruta}?m={int(os.path.getmtime(os.path.join(CARPETA_ASSETS, ruta)))}"
+
+LOGO = url_asset("images/FVLawFirmLogo.png")
+
 def login_layout():
     return dbc.Container(
         [
@@ -10,7 +25,7 @@ def login_layout():
                 [
                     html.Div(
                         html.Img(
-                            src="/assets/images/FVLawFirmLogo.png",
+                            src=LOGO,
                             style={"height": "80px", "marginBottom": "1rem"}
                         ),
                         className="d-flex justify-content-center mt-4"
@@ -145,7 +160,7 @@ def header():
                                 }
                             ),
                             html.Img(
-                                src="/assets/images/FVLawFirmLogo.png",
+                                src=LOGO,
                                 style={"height": "64px", "width": "auto"}
                             ),
                         ],
@@ -163,7 +178,13 @@ def header():
     )
 
 
-def dashboard_layout():
+def dashboard_layout(render_cliente=False):
+    # Con render en el navegador: configuración estática del pivot y template de Plotly
+    # (el mismo que plotly.py agrega a cada figura) para armar las vistas igual que el servidor
+    config_cliente = [
+        dcc.Store(id="config-pivot", data=config_pivot()),
+        dcc.Store(id="plantilla-graficos", data=plantilla_figuras()),
+    ] if render_cliente else []
     return html.Div(
         [
             # HEADER SIN MÁRGENES NI PADDING
@@ -172,7 +193,31 @@ def dashboard_layout():
             # CONTENIDO CON MÁRGENES LATERALES
             html.Div(
                 [
+                    # CUIT de la última consulta exitosa (exportación)
+                    dcc.Store(id="consulta-actual"),
+                    # CUIT, huella y filas del modelo en pantalla: dispara los callbacks del servidor
+                    dcc.Store(id="consulta-datos"),
+                    # Con render en el navegador, el modelo compacto del que salen gráficos y pivot
+                    dcc.Store(id="consulta-modelo"),
+                    *config_cliente,
+                    # Consulta al BCRA pendiente (se resuelve como job en segundo plano)
+                    dcc.Store(id="consulta-pendiente"),
+                    # Precarga mientras se tipea: CUIT completo y válido, pedido y resultado
+                    dcc.Store(id="cuit-completo"),
+                    dcc.Store(id="precarga-pendiente"),
+                    dcc.Store(id="precarga-lista"),
+                    # Mientras se muestran datos vencidos (API caída) se reintenta periódicamente
+                    dcc.Interval(id="reintento-consulta", interval=30 * 1000, disabled=True),
                     html.Div(id="consulta-message", className="mt-3"),
+                    html.Div(
+                        [
+                            html.Small(id="consulta-progreso", className="text-muted me-3"),
+                            dbc.Button("Cancelar", id="cancelar-consulta", color="link", size="sm", className="p-0"),
+                        ],
+                        id="consulta-en-curso",
+                        className="align-items-center mb-2",
+                        style={"display": "none"}
+                    ),
                     dbc.Card(
                         [
                             dbc.CardHeader(
@@ -180,7 +225,17 @@ def dashboard_layout():
                                     [
                                         dbc.Col(html.Span("Tabla Unificada", className="fw-bold")),
                                         dbc.Col(
-                                            dbc.Button("Exportar a Excel", id="export-excel", color="secondary", size="sm"),
+                                            dbc.DropdownMenu(
+                                                [
+                                                    dbc.DropdownMenuItem("Excel (.xlsx)", id="exportar-xlsx", external_link=True, disabled=True),
+                                                    dbc.DropdownMenuItem("CSV", id="exportar-csv", external_link=True, disabled=True),
+                                                    dbc.DropdownMenuItem("Parquet", id="exportar-parquet", external_link=True, disabled=True),
+                                                ],
+                                                label="Exportar",
+                                                color="secondary",
+                                                size="sm",
+                                                align_end=True
+                                            ),
                                             width="auto",
                                             className="ms-auto"
                                         )
@@ -199,7 +254,7 @@ def dashboard_layout():
                                         [
                                             dbc.CardHeader("Distribución por Acreedor"),
                                             dbc.CardBody(
-                                                html.Div(id="grafico-torta"),
+                                                dcc.Loading(html.Div(id="grafico-torta"), type="circle"),
                                                 className="flex-grow-1 d-flex flex-column",
                                                 style={"padding-bottom": "1rem", "overflow": "visible"}
                                             ),
@@ -214,7 +269,7 @@ def dashboard_layout():
                                         [
                                             dbc.CardHeader("Evolución Total"),
                                             dbc.CardBody(
-                                                html.Div(id="grafico-evolucion"),
+                                                dcc.Loading(html.Div(id="grafico-evolucion"), type="circle"),
                                                 className="flex-grow-1 d-flex flex-column",
                                                 style={"padding-bottom": "1rem", "overflow": "visible"}
                                             ),
@@ -231,7 +286,7 @@ def dashboard_layout():
                     dbc.Card(
                         [
                             dbc.CardHeader("Detalle Mes-Año por Entidad"),
-                            dbc.CardBody(html.Div(id="tabla-detalle"))
+                            dbc.CardBody(dcc.Loading(html.Div(id="tabla-detalle"), type="circle"))
                         ]
                     )
                 ],
@@ -254,6 +309,7 @@ def serve_layout():
         [
             dcc.Location(id="url", refresh=False),
             dcc.Store(id="current-user"),
+            # La página (login o dashboard) la elige display_page en el servidor
             html.Div(id="page-content")
         ]
     )
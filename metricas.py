@@ -0,0 +1,410 @@
+# metricas.py
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
+
+from compartido import compartido
+
+logger = logging.getLogger("appveraz")
+
+# Observaciones recientes que se conservan por serie para estimar cuantiles
+VENTANA = 2048
+CUANTILES = (0.5, 0.95, 0.99)
+# Cada proceso (workers de gunicorn, jobs en segundo plano) publica sus series en el
+# almacén compartido y /metrics las suma: si no, cada scrape vería un solo worker
+COMPARTIR = os.environ.get("APP_METRICAS_COMPARTIDAS", "1") == "1"
+# Segundos mínimos entre dos publicaciones de un proceso (/metrics lee las del proceso que
+# atiende el scrape de su memoria; las de los demás pueden tener este atraso)
+INTERVALO_PUBLICACION = float(os.environ.get("APP_METRICAS_INTERVALO", 10))
+# Segundos entre dos compactaciones de las series de procesos terminados (al publicar)
+INTERVALO_COMPACTACION = float(os.environ.get("APP_METRICAS_COMPACTACION", 60))
+# Observaciones por serie y por proceso que se publican para los cuantiles
+VENTANA_PUBLICADA = 512
+# Las series de procesos que ya terminaron se acumulan en este "proceso"
+HISTORICO = "historico"
+
+
+def _cuantiles(valores, cuantiles=CUANTILES):
+    valores = sorted(valores)
+    if not valores:
+        return {q: 0.0 for q in cuantiles}
+    return {q: valores[min(len(valores) - 1, int(q * len(valores)))] for q in cuantiles}
+
+
+class Resumen:
+    """
+    Serie de observaciones: cantidad y suma acumuladas más una ventana de las
+    últimas VENTANA observaciones para calcular p50/p95/p99.
+    """
+
+    def __init__(self, ventana=VENTANA):
+        self._valores = deque(maxlen=ventana)
+        self._lock = threading.Lock()
+        self.cantidad = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        with self._lock:
+            self._valores.append(valor)
+            self.cantidad += 1
+            self.suma += valor
+
+    def cuantiles(self, cuantiles=CUANTILES):
+        with self._lock:
+            valores = list(self._valores)
+        return _cuantiles(valores, cuantiles)
+
+    def estado(self, ultimas=VENTANA):
+        """
+        (cantidad, suma, últimas `ultimas` observaciones).
+        """
+        with self._lock:
+            valores = list(self._valores)
+            return self.cantidad, self.suma, valores[-ultimas:]
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _valores(blob):
+    valores = array("d")
+    valores.frombytes(blob)
+    return valores.tolist()
+
+
+def _decodificar(etiquetas):
+    return tuple(tuple(par) for par in json.loads(etiquetas))
+
+
+def _etiquetas_gauge(etiquetas):
+    # Del almacén vienen en JSON; las del propio proceso, como pares
+    return _decodificar(etiquetas) if isinstance(etiquetas, str) else tuple(etiquetas)
+
+
+def _numero(valor):
+    return int(valor) if float(valor).is_integer() else valor
+
+
+class RegistroMetricas:
+    """
+    Series (summaries) y gauges de /metrics. Con `almacen`, cada proceso
+    publica periódicamente su estado en el almacén compartido y la
+    exportación suma las series de todos los procesos de la máquina; las de
+    procesos que ya terminaron se pasan a un acumulado histórico.
+    """
+
+    def __init__(self, almacen=None):
+        self.almacen = almacen
+        self._series = {}
+        self._pendientes = set()
+        self._ayudas = {}
+        self._colectores = []
+        self._colectores_proceso = []
+        self._lock = threading.Lock()
+        self._publicado = self._compactado = time.monotonic()
+        os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self):
+        # Un proceso forkeado no hereda las observaciones del padre: esas ya las publica el padre
+        self._series = {}
+        self._pendientes = set()
+        self._lock = threading.Lock()
+        self._publicado = self._compactado = time.monotonic()
+
+    def describir(self, nombre, ayuda):
+        self._ayudas[nombre] = ayuda
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        serie = self._series.get(clave)
+        if serie is None:
+            with self._lock:
+                serie = self._series.setdefault(clave, Resumen())
+        serie.observar(valor)
+        with self._lock:
+            self._pendientes.add(clave)
+        self.publicar_pendientes()
+
+    def publicar_pendientes(self):
+        """
+        Publica si hay series sin publicar y pasó INTERVALO_PUBLICACION desde
+        la última vez (un proceso inactivo publica en su próximo request).
+        """
+        if (
+            self.almacen is not None and self._pendientes
+            and time.monotonic() - self._publicado >= INTERVALO_PUBLICACION
+        ):
+            self.publicar()
+
+    def serie(self, nombre, **etiquetas):
+        return self._series.get((nombre, tuple(sorted(etiquetas.items()))))
+
+    def agregar_colector(self, colector, por_proceso=False):
+        """
+        colector() devuelve una lista de (nombre, etiquetas, valor) que se
+        exportan como gauges al momento de leer /metrics. Con `por_proceso`
+        mide estado en memoria de cada proceso (caches, contadores): se
+        publica junto con las series y se exporta por proceso vivo, con la
+        etiqueta `proceso`.
+        """
+        (self._colectores_proceso if por_proceso else self._colectores).append(colector)
+
+    def _muestras(self, colectores):
+        muestras = []
+        for colector in colectores:
+            try:
+                muestras += colector()
+            except Exception:
+                logger.exception("Falló un colector de métricas")
+        return muestras
+
+    def publicar(self):
+        """
+        Guarda en el almacén compartido las series de este proceso que
+        cambiaron desde la última publicación y sus gauges por proceso. Cada
+        INTERVALO_COMPACTACION además compacta las series de procesos terminados.
+        """
+        self._publicado = ahora = time.monotonic()
+        compactar = ahora - self._compactado >= INTERVALO_COMPACTACION
+        if compactar:
+            self._compactado = ahora
+        proceso = str(os.getpid())
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, set()
+        filas = []
+        for clave in pendientes:
+            cantidad, suma, valores = self._series[clave].estado(VENTANA_PUBLICADA)
+            filas.append((proceso, clave[0], json.dumps(clave[1]), cantidad, suma, array("d", valores).tobytes()))
+        gauges = [
+            (proceso, nombre, json.dumps(sorted(etiquetas.items())), valor)
+            for nombre, etiquetas, valor in self._muestras(self._colectores_proceso)
+        ]
+        try:
+            with self.almacen.transaccion() as conn:
+                conn.executemany("INSERT OR REPLACE INTO metricas VALUES (?, ?, ?, ?, ?, ?)", filas)
+                conn.execute("DELETE FROM metricas_gauges WHERE proceso = ?", (proceso,))
+                conn.executemany("INSERT INTO metricas_gauges VALUES (?, ?, ?, ?)", gauges)
+                if compactar:
+                    self._compactar(conn)
+        except sqlite3.Error:
+            with self._lock:
+                self._pendientes |= pendientes
+            logger.exception("No se pudieron publicar las métricas")
+
+    def _compactar(self, conn):
+        # Jobs y workers reciclados: sus series se suman al histórico y sus gauges se descartan
+        procesos = conn.execute(
+            "SELECT proceso FROM metricas UNION SELECT proceso FROM metricas_gauges"
+        ).fetchall()
+        for (proceso,) in procesos:
+            if proceso == HISTORICO or _vivo(int(proceso)):
+                continue
+            filas = conn.execute(
+                "SELECT nombre, etiquetas, cantidad, suma, valores FROM metricas WHERE proceso = ?", (proceso,)
+            ).fetchall()
+            for nombre, etiquetas, cantidad, suma, valores in filas:
+                previa = conn.execute(
+                    "SELECT cantidad, suma, valores FROM metricas WHERE proceso = ? AND nombre = ? AND etiquetas = ?",
+                    (HISTORICO, nombre, etiquetas)
+                ).fetchall()
+                if previa:
+                    cantidad += previa[0][0]
+                    suma += previa[0][1]
+                    valores = array("d", (_valores(previa[0][2]) + _valores(valores))[-VENTANA:]).tobytes()
+                conn.execute(
+                    "INSERT OR REPLACE INTO metricas VALUES (?, ?, ?, ?, ?, ?)",
+                    (HISTORICO, nombre, etiquetas, cantidad, suma, valores)
+                )
+            conn.execute("DELETE FROM metricas WHERE proceso = ?", (proceso,))
+            conn.execute("DELETE FROM metricas_gauges WHERE proceso = ?", (proceso,))
+
+    def _leer_compartido(self):
+        """
+        ({(nombre, etiquetas): (cantidad, suma, valores)}, gauges) de todos los procesos.
+        Solo lee: lo de este proceso sale de su memoria y no del almacén, y los
+        gauges de procesos terminados se omiten (la compactación es al publicar).
+        """
+        proceso = str(os.getpid())
+        with self.almacen.lectura() as conn:
+            filas = conn.execute(
+                "SELECT nombre, etiquetas, cantidad, suma, valores FROM metricas WHERE proceso != ?", (proceso,)
+            ).fetchall()
+            gauges = conn.execute(
+                "SELECT proceso, nombre, etiquetas, valor FROM metricas_gauges WHERE proceso != ?", (proceso,)
+            ).fetchall()
+        series = {}
+        for nombre, etiquetas, cantidad, suma, valores in filas:
+            acumulada = series.setdefault((nombre, _decodificar(etiquetas)), [0, 0.0, []])
+            acumulada[0] += cantidad
+            acumulada[1] += suma
+            acumulada[2] += _valores(valores)
+        for (nombre, etiquetas), serie in list(self._series.items()):
+            cantidad, suma, valores = serie.estado(VENTANA_PUBLICADA)
+            acumulada = series.setdefault((nombre, etiquetas), [0, 0.0, []])
+            acumulada[0] += cantidad
+            acumulada[1] += suma
+            acumulada[2] += valores
+        gauges = [fila for fila in gauges if _vivo(int(fila[0]))] + [
+            (proceso, nombre, sorted(etiquetas.items()), valor)
+            for nombre, etiquetas, valor in self._muestras(self._colectores_proceso)
+        ]
+        return series, [
+            (nombre, tuple(sorted(_etiquetas_gauge(etiquetas) + (("proceso", p),))), _numero(valor))
+            for p, nombre, etiquetas, valor in gauges
+        ]
+
+    def exportar_prometheus(self):
+        """
+        Formato de exposición de texto de Prometheus (summaries + gauges).
+        """
+        if self.almacen is not None:
+            series, gauges = self._leer_compartido()
+        else:
+            series = {clave: serie.estado() for clave, serie in list(self._series.items())}
+            gauges = [
+                (nombre, tuple(sorted(etiquetas.items())), valor)
+                for nombre, etiquetas, valor in self._muestras(self._colectores_proceso)
+            ]
+        gauges += [
+            (nombre, tuple(sorted(etiquetas.items())), valor)
+            for nombre, etiquetas, valor in self._muestras(self._colectores)
+        ]
+
+        lineas = []
+        por_nombre = {}
+        for (nombre, etiquetas), estado in series.items():
+            por_nombre.setdefault(nombre, []).append((etiquetas, estado))
+        for nombre in sorted(por_nombre):
+            if nombre in self._ayudas:
+                lineas.append(f"# HELP {nombre} {self._ayudas[nombre]}")
+            lineas.append(f"# TYPE {nombre} summary")
+            for etiquetas, (cantidad, suma, valores) in por_nombre[nombre]:
+                for q, valor in _cuantiles(valores).items():
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas + (('quantile', q),))} {valor:.6g}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {cantidad}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {suma:.6g}")
+
+        vistos = set()
+        for nombre, etiquetas, valor in sorted(gauges, key=lambda g: g[0]):
+            if nombre not in vistos:
+                vistos.add(nombre)
+                lineas.append(f"# TYPE {nombre} gauge")
+            lineas.append(f"{nombre}{_etiquetas(etiquetas)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    pares = ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas)
+    return "{" + pares + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registro = RegistroMetricas(compartido if COMPARTIR else None)
+registro.describir("appveraz_etapa_segundos", "Duración de cada etapa del pipeline de consulta")
+registro.describir("appveraz_callback_bytes", "Bytes del request y de la respuesta de cada callback de Dash")
+registro.describir("appveraz_componente_bytes", "Bytes serializados de cada entrada y salida de callback por componente")
+
+
+@contextmanager
+def medir(etapa, **etiquetas):
+    """
+    Mide la duración del bloque y la registra en appveraz_etapa_segundos.
+    Con el logger 'appveraz' en INFO además emite una línea JSON por etapa.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_etapa(etapa, time.perf_counter() - inicio, **etiquetas)
+
+
+def registrar_etapa(etapa, duracion, **etiquetas):
+    """
+    Lo que hace medir() al terminar el bloque, para etapas que no caben en
+    un bloque (p. ej. una respuesta que se termina de generar al enviarse).
+    """
+    registro.observar("appveraz_etapa_segundos", duracion, etapa=etapa, **etiquetas)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(
+            {"evento": "etapa", "etapa": etapa, "ms": round(duracion * 1000, 2), **etiquetas},
+            ensure_ascii=False
+        ))
+
+
+def cronometrado(etapa):
+    """
+    Decorador equivalente a envolver la función en medir(etapa).
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def _componente(id_, propiedad):
+    # Los ids con patrón se agrupan por "type" (el resto del id suele ser un dato, p. ej. el CUIT)
+    if isinstance(id_, str) and id_.startswith("{"):
+        id_ = json.loads(id_)
+    if isinstance(id_, dict):
+        id_ = id_.get("type", json.dumps(id_, sort_keys=True))
+    return f"{id_}.{propiedad}"
+
+
+def _tamano(valor):
+    return len(json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def bytes_por_componente(cuerpo, respuesta):
+    """
+    Bytes serializados de cada entrada (inputs y state del request) y de cada
+    salida (response) de un callback: [(direccion, "id.propiedad", bytes)].
+    """
+    medidas = []
+    for clave in ("inputs", "state"):
+        for entrada in cuerpo.get(clave) or []:
+            # Los wildcards ALL/ALLSMALLER llegan como lista de entradas
+            for item in entrada if isinstance(entrada, list) else [entrada]:
+                medidas.append(("entrada", _componente(item["id"], item["property"]), _tamano(item.get("value"))))
+    for id_, propiedades in ((respuesta or {}).get("response") or {}).items():
+        for propiedad, valor in propiedades.items():
+            medidas.append(("salida", _componente(id_, propiedad), _tamano(valor)))
+    return medidas
+
+
+def registrar_payload(callback, bytes_request, bytes_respuesta, medidas=()):
+    """
+    Registra el tamaño de un callback (totales y, si vienen, las medidas de
+    bytes_por_componente) junto a sus tiempos en /metrics y en el log.
+    """
+    registro.observar("appveraz_callback_bytes", bytes_request, callback=callback, direccion="entrada")
+    registro.observar("appveraz_callback_bytes", bytes_respuesta, callback=callback, direccion="salida")
+    for direccion, componente, tamano in medidas:
+        registro.observar("appveraz_componente_bytes", tamano, componente=componente, direccion=direccion)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(
+            {"evento": "payload", "callback": callback, "request": bytes_request, "respuesta": bytes_respuesta,
+             "componentes": {f"{d}:{c}": t for d, c, t in medidas}},
+            ensure_ascii=False
+        ))
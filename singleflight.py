@@ -0,0 +1,106 @@
+# singleflight.py
+import os
+import tempfile
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se coalesce dentro del proceso
+    fcntl = None
+
+DIR_LOCKS = os.environ.get("BCRA_LOCK_DIR", os.path.join(tempfile.gettempdir(), "appveraz_locks"))
+# Los locks entre procesos se reparten en un número fijo de archivos
+FRANJAS_LOCK = 1024
+
+
+class _Llamada:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce llamadas concurrentes con la misma clave: dentro del proceso todas
+    esperan y reciben el resultado de una única ejecución; entre workers se
+    serializan con un lock de archivo y el que espera vuelve a revisar el
+    almacenamiento compartido (cache) antes de ejecutar.
+    """
+
+    def __init__(self, dir_locks=DIR_LOCKS):
+        self.dir_locks = dir_locks
+        self._en_vuelo = {}
+        self._lock = threading.Lock()
+        self._contadores = {
+            "llamadas": 0,
+            "ejecutadas": 0,
+            "deduplicadas_proceso": 0,
+            "deduplicadas_workers": 0,
+        }
+
+    def _contar(self, clave):
+        with self._lock:
+            self._contadores[clave] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return dict(self._contadores)
+
+    def ejecutar(self, clave, funcion, revisar=None):
+        """
+        Ejecuta funcion() una sola vez por clave en vuelo. Si se indica revisar(),
+        se usa entre procesos: devuelve el resultado ya disponible o None.
+        """
+        with self._lock:
+            self._contadores["llamadas"] += 1
+            llamada = self._en_vuelo.get(clave)
+            lider = llamada is None
+            if lider:
+                llamada = self._en_vuelo[clave] = _Llamada()
+            else:
+                self._contadores["deduplicadas_proceso"] += 1
+
+        if not lider:
+            llamada.listo.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            if revisar is not None and fcntl is not None:
+                llamada.resultado = self._ejecutar_entre_procesos(clave, funcion, revisar)
+            else:
+                self._contar("ejecutadas")
+                llamada.resultado = funcion()
+            return llamada.resultado
+        except Exception as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+            llamada.listo.set()
+
+    def _ejecutar_entre_procesos(self, clave, funcion, revisar):
+        os.makedirs(self.dir_locks, exist_ok=True)
+        franja = zlib.crc32(str(clave).encode()) % FRANJAS_LOCK
+        with open(os.path.join(self.dir_locks, f"{franja}.lock"), "a+") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                espero = False
+            except BlockingIOError:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                espero = True
+            try:
+                if espero:
+                    # Otro worker pudo haber resuelto la misma clave mientras esperábamos
+                    resultado = revisar()
+                    if resultado is not None:
+                        self._contar("deduplicadas_workers")
+                        return resultado
+                self._contar("ejecutadas")
+                return funcion()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,18 +1,102 @@
 # sql_api.py
-import requests
-
-def consultar_deuda_historica(cuit):
-    # Usamos la IP obtenida por nslookup: 45.235.97.44
-    # Se debe incluir en las cabeceras el Host original
-    url = f"https://45.235.97.44/CentralDeDeudores/v1.0/Deudas/Historicas/{cuit}"
-    headers = {
-         "Content-Type": "application/json",
-         "Host": "api.bcra.gob.ar"
-    }
+import threading
+import time
+from collections import OrderedDict
+
+from bcra_client import cliente, ErrorBCRA, SinDatosBCRA
+from cache_deudas import cache
+from singleflight import SingleFlight
+from utils.modelo_deuda import normalizar_periodos
+
+# Consultas concurrentes del mismo CUIT comparten una única llamada a la API
+vuelo = SingleFlight()
+
+# Clave que marca un payload servido desde el cache porque la API no respondió
+VENCIDA = "_vencida"
+
+# Últimos modelos columnares construidos en este proceso (paginado, exportación)
+MAX_MODELOS = 64
+TTL_MODELO = 600
+_modelos = OrderedDict()
+_lock_modelos = threading.Lock()
+
+
+def _consultar_bcra(cuit):
     try:
-        response = requests.get(url, headers=headers, verify=False, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("results", {})
-    except Exception as e:
+        return cliente.deudas_historicas(cuit)
+    except SinDatosBCRA:
+        # 404: no es una falla, el CUIT simplemente no tiene información
+        return {}
+    except ErrorBCRA as e:
         return {"error": str(e)}
+
+
+def consultar_deuda_historica(cuit, usar_cache=True, permitir_vencida=False):
+    """
+    Devuelve la deuda histórica del CUIT, desde el cache local mientras no
+    pueda haberse publicado un período más nuevo que el ya consultado.
+    Con `permitir_vencida`, si la API falla se devuelve la última respuesta
+    conocida marcada con VENCIDA en lugar del error.
+    """
+    if usar_cache:
+        data = cache.obtener(cuit)
+        if data is not None:
+            return data
+
+    def consultar():
+        data = _consultar_bcra(cuit)
+        if usar_cache and "error" not in data:
+            cache.guardar(cuit, data)
+        return data
+
+    data = vuelo.ejecutar(
+        str(cuit),
+        consultar,
+        revisar=(lambda: cache.obtener(cuit)) if usar_cache else None
+    )
+    if usar_cache and permitir_vencida and "error" in data:
+        # La API falló: se sirve la última respuesta conocida, marcada como vencida
+        ultima = cache.ultima_conocida(cuit)
+        if ultima is not None:
+            vencida, consultado = ultima
+            vencida[VENCIDA] = {"consultado": consultado, "motivo": data["error"]}
+            return vencida
+    return data
+
+
+def invalidar_cache(cuit=None):
+    """
+    Fuerza una nueva consulta a la API para el CUIT indicado (o para todos).
+    """
+    cache.invalidar(cuit)
+
+
+def obtener_modelo(cuit, data=None, solo_cache=False):
+    """
+    DeudaColumnar del CUIT. Con `data` (payload recién consultado) lo normaliza
+    y lo recuerda; sin `data` reutiliza el último modelo armado en este proceso
+    o lo construye desde consultar_deuda_historica (o, con `solo_cache`, desde
+    la última respuesta guardada, sin salir a la red). Devuelve None si no hay datos.
+    """
+    cuit = str(cuit)
+    ahora = time.monotonic()
+    if data is None:
+        with _lock_modelos:
+            entrada = _modelos.get(cuit)
+            if entrada is not None and ahora - entrada[1] < TTL_MODELO:
+                _modelos.move_to_end(cuit)
+                return entrada[0]
+        if solo_cache:
+            data = cache.obtener(cuit, permitir_vencida=True)
+        else:
+            data = consultar_deuda_historica(cuit)
+        if data is None or "error" in data:
+            return None
+
+    modelo = normalizar_periodos(data.get("periodos"))
+    with _lock_modelos:
+        _modelos[cuit] = (modelo, ahora)
+        _modelos.move_to_end(cuit)
+        while len(_modelos) > MAX_MODELOS:
+            _modelos.popitem(last=False)
+    return modelo
@@ -0,0 +1,91 @@
+# test_cache_deudas.py
+import json
+import types
+from datetime import datetime
+
+import pytest
+
+import cache_deudas
+from cache_deudas import CacheDeudas, puede_haber_periodo_nuevo, sumar_meses
+
+
+def _payload(periodo, relleno=""):
+    return {"periodos": [{"periodo": periodo, "entidades": [{"entidad": "BANCO A" + relleno, "monto": 1.0}]}]}
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    # Reloj manual para el cache: reloj.ahora es el timestamp de time.time()
+    reloj = types.SimpleNamespace(ahora=datetime(2024, 3, 15, 12).timestamp())
+    monkeypatch.setattr(cache_deudas, "time", types.SimpleNamespace(time=lambda: reloj.ahora))
+    return reloj
+
+
+@pytest.fixture
+def cache(tmp_path, reloj):
+    return CacheDeudas(str(tmp_path / "deudas.db"), ttl_revalidacion=3600)
+
+
+def test_sumar_meses_cruza_el_anio():
+    assert sumar_meses("202311", 2) == "202401"
+    assert sumar_meses("202401", -1) == "202312"
+
+
+def test_periodo_nuevo_recien_desde_p_mas_2():
+    # Con 202402 publicado, 202403 recién puede existir terminado marzo
+    assert not puede_haber_periodo_nuevo("202402", datetime(2024, 3, 31, 23, 59))
+    assert puede_haber_periodo_nuevo("202402", datetime(2024, 4, 1))
+    assert puede_haber_periodo_nuevo("202312", datetime(2024, 2, 1))
+    assert not puede_haber_periodo_nuevo("202312", datetime(2024, 1, 31))
+    assert puede_haber_periodo_nuevo(None)
+
+
+def test_vigente_hasta_p_mas_2_sin_importar_el_ttl(cache, reloj):
+    cache.guardar("1", _payload("202402"))
+    reloj.ahora = datetime(2024, 3, 31, 23).timestamp()
+    assert cache.obtener("1") == _payload("202402")
+
+
+def test_desde_p_mas_2_se_revalida_cada_ttl(cache, reloj):
+    reloj.ahora = datetime(2024, 4, 2).timestamp()
+    cache.guardar("1", _payload("202402"))
+    reloj.ahora += 3599
+    assert cache.obtener("1") is not None
+    reloj.ahora += 2
+    assert cache.obtener("1") is None
+    # Vencida igual se puede pedir (fallback) y sigue como última conocida
+    assert cache.obtener("1", permitir_vencida=True) == _payload("202402")
+    assert cache.ultima_conocida("1")[0] == _payload("202402")
+
+
+def test_un_periodo_nuevo_observado_vence_las_entradas_anteriores(cache):
+    cache.guardar("1", _payload("202401"))
+    assert cache.obtener("1") is not None
+    cache.guardar("2", _payload("202402"))
+    assert cache.periodo_publicado() == "202402"
+    assert cache.obtener("1") is None
+    assert cache.obtener("2") is not None
+
+
+def test_lru_por_bytes(tmp_path, reloj, monkeypatch):
+    monkeypatch.setattr(cache_deudas, "INTERVALO_ACCESO", 0)
+    tamano = len(json.dumps(_payload("202402", "x" * 100), ensure_ascii=False, separators=(",", ":")))
+    cache = CacheDeudas(str(tmp_path / "deudas.db"), max_bytes=3 * tamano)
+    for cuit in ("1", "2", "3"):
+        cache.guardar(cuit, _payload("202402", "x" * 100))
+        reloj.ahora += 1
+    # "1" se usó recién: el menos reciente pasa a ser "2"
+    assert cache.obtener("1") is not None
+    reloj.ahora += 1
+    cache.guardar("4", _payload("202402", "x" * 100))
+    assert cache.estadisticas()["bytes"] <= 3 * tamano
+    assert [cuit for cuit in "1234" if cache.ultima_conocida(cuit)] == ["1", "3", "4"]
+
+
+def test_lru_por_entradas(tmp_path, reloj):
+    cache = CacheDeudas(str(tmp_path / "deudas.db"), max_entradas=2)
+    for cuit in ("1", "2", "3"):
+        cache.guardar(cuit, _payload("202402"))
+        reloj.ahora += 1
+    assert cache.estadisticas()["entradas"] == 2
+    assert cache.ultima_conocida("1") is None
@@ -0,0 +1,87 @@
+# test_clientside.py
+import base64
+import json
+import os
+import random
+import shutil
+import subprocess
+
+import numpy as np
+import plotly.io as pio
+import pytest
+
+from benchmarks.generador import generar_periodos
+from utils.data_tables_aggrid import config_pivot, crear_pivot_table_aggrid
+from utils.modelo_deuda import normalizar_periodos
+from utils.plot_helpers import crear_grafico_evolucion, crear_grafico_torta, plantilla_figuras
+
+# assets/clientside.js arma torta, evolución y pivot en el navegador con APP_RENDER_CLIENTE=1:
+# tienen que salir iguales a los de Python para el mismo modelo
+CLIENTSIDE_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "clientside.js")
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="hace falta node")
+
+RENDER_JS = """
+global.window = {dash_clientside: {no_update: null}};
+require(process.argv[1]);
+const r = window.dash_clientside.render;
+const {modelos, config, plantilla} = JSON.parse(require("fs").readFileSync(0, "utf8"));
+process.stdout.write(JSON.stringify(modelos.map(m => ({
+    torta: r.torta(m, plantilla).props.figure,
+    evolucion: r.evolucion(m, plantilla).props.figure,
+    pivot: r.pivot(m, config),
+}))));
+"""
+
+
+def _modelos():
+    modelos = []
+    for semilla in range(60):
+        rng = random.Random(semilla)
+        periodos = generar_periodos(rng.randint(1, 14), rng.randint(1, 30), semilla=semilla,
+                                    nombres_largos=semilla % 2 == 0)
+        if semilla % 3 == 0:
+            # Situación 0 / sin dato y nombres con guiones (corte de renglones)
+            for p in periodos:
+                for i, e in enumerate(p["entidades"]):
+                    if i % 4 == 1:
+                        e["situacion"] = 0
+                    elif i % 4 == 2:
+                        e.pop("situacion", None)
+                    e["entidad"] = e["entidad"].replace(" ", "-", 2)
+        modelos.append(normalizar_periodos(periodos))
+    return modelos
+
+
+def _normalizar(valor):
+    # Arreglos tipados de plotly.py a listas, enteros como int y fechas como "YYYY-MM"
+    if isinstance(valor, dict):
+        if "bdata" in valor:
+            return _normalizar(np.frombuffer(base64.b64decode(valor["bdata"]), dtype=valor["dtype"]).tolist())
+        return {k: _normalizar(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_normalizar(v) for v in valor]
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else round(valor, 9)
+    if isinstance(valor, str) and len(valor) >= 10 and valor[4] == "-" and valor[7] == "-":
+        return valor[:7]
+    return valor
+
+
+def _figura(fig):
+    return _normalizar(json.loads(pio.to_json(fig, engine="json"))) if fig else {}
+
+
+def test_render_en_el_navegador_igual_al_del_servidor():
+    modelos = _modelos()
+    entrada = {"modelos": [m.compacto() for m in modelos], "config": config_pivot(), "plantilla": plantilla_figuras()}
+    salida = subprocess.run(
+        ["node", "-e", RENDER_JS, CLIENTSIDE_JS],
+        input=json.dumps(entrada), capture_output=True, text=True, check=True,
+    ).stdout
+    for i, (modelo, js) in enumerate(zip(modelos, json.loads(salida))):
+        assert _normalizar(js["torta"]) == _figura(crear_grafico_torta(modelo)), f"torta {i}"
+        assert _normalizar(js["evolucion"]) == _figura(crear_grafico_evolucion(modelo)), f"evolución {i}"
+        pivot = json.loads(json.dumps(crear_pivot_table_aggrid(modelo).to_plotly_json(),
+                                      default=lambda o: o.to_plotly_json()))
+        assert _normalizar(js["pivot"]) == _normalizar(pivot), f"pivot {i}"
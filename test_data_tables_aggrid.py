@@ -0,0 +1,131 @@
+# test_data_tables_aggrid.py
+import pytest
+
+from utils.data_tables_aggrid import pagina_detalle
+from utils.modelo_deuda import normalizar_periodos
+
+# Registros en el orden del modelo (período más reciente primero):
+#   202402: BANCO NACION sit 1 $10.500 · Tarjeta Sur sit 3 $2.000 · Coop Norte sin dato $7.000
+#   202401: BANCO NACION sit 2 $10.400 · Coop Norte sit 1 $500
+PERIODOS = [
+    {"periodo": "202402", "entidades": [
+        {"entidad": "BANCO NACION", "situacion": 1, "monto": 10.5},
+        {"entidad": "Tarjeta Sur", "situacion": 3, "monto": 2},
+        {"entidad": "Coop Norte", "monto": 7},
+    ]},
+    {"periodo": "202401", "entidades": [
+        {"entidad": "BANCO NACION", "situacion": 2, "monto": 10.4},
+        {"entidad": "Coop Norte", "situacion": 1, "monto": 0.5},
+    ]},
+]
+
+
+@pytest.fixture(scope="module")
+def modelo():
+    return normalizar_periodos(PERIODOS)
+
+
+def _filas(modelo, **request):
+    respuesta = pagina_detalle(modelo, request)
+    return [(f["entidad"], f["monto"], f["situacion"]) for f in respuesta["rowData"]], respuesta["rowCount"]
+
+
+def test_sin_filtros_ni_orden_respeta_el_modelo(modelo):
+    respuesta = pagina_detalle(modelo, {"startRow": 0, "endRow": 100})
+    assert respuesta["rowCount"] == 5
+    assert [f["periodo"] for f in respuesta["rowData"]] == [modelo.etiquetas_periodo()[0]] * 3 + [
+        modelo.etiquetas_periodo()[1]] * 2
+    assert respuesta["rowData"][2] == {
+        "periodo": modelo.etiquetas_periodo()[0], "entidad": "Coop Norte", "monto": 7000, "situacion": 0,
+    }
+
+
+def test_filtro_texto_contiene_sin_distinguir_mayusculas(modelo):
+    filtro = {"entidad": {"filterType": "text", "type": "contains", "filter": "banco"}}
+    assert _filas(modelo, filterModel=filtro) == ([("BANCO NACION", 10500, 1), ("BANCO NACION", 10400, 2)], 2)
+
+    filtro = {"entidad": {"filterType": "text", "type": "notContains", "filter": "NORTE"}}
+    assert _filas(modelo, filterModel=filtro)[1] == 3
+
+
+def test_filtro_texto_vacio_no_filtra(modelo):
+    filtro = {"entidad": {"filterType": "text", "type": "contains", "filter": ""}}
+    assert _filas(modelo, filterModel=filtro)[1] == 5
+
+
+def test_filtro_periodo_por_etiqueta(modelo):
+    etiqueta = modelo.etiquetas_periodo()[1]
+    filtro = {"periodo": {"filterType": "text", "type": "equals", "filter": etiqueta.upper()}}
+    assert _filas(modelo, filterModel=filtro) == ([("BANCO NACION", 10400, 2), ("Coop Norte", 500, 1)], 2)
+
+
+def test_filtros_numericos_por_rango(modelo):
+    filtro = {"monto": {"filterType": "number", "type": "inRange", "filter": 2000, "filterTo": 10400}}
+    assert _filas(modelo, filterModel=filtro) == (
+        [("Tarjeta Sur", 2000, 3), ("Coop Norte", 7000, 0), ("BANCO NACION", 10400, 2)], 3
+    )
+    filtro = {"situacion": {"filterType": "number", "type": "greaterThanOrEqual", "filter": 2}}
+    assert _filas(modelo, filterModel=filtro)[1] == 2
+    filtro = {"monto": {"filterType": "number", "type": "lessThan", "filter": 2000}}
+    assert _filas(modelo, filterModel=filtro) == ([("Coop Norte", 500, 1)], 1)
+
+
+def test_filtro_vacio_en_situacion_es_sin_dato(modelo):
+    filtro = {"situacion": {"filterType": "number", "type": "blank"}}
+    assert _filas(modelo, filterModel=filtro) == ([("Coop Norte", 7000, 0)], 1)
+    filtro = {"situacion": {"filterType": "number", "type": "notBlank"}}
+    assert _filas(modelo, filterModel=filtro)[1] == 4
+
+
+def test_filtros_combinados(modelo):
+    filtro = {
+        # Condiciones de una columna con OR y columnas distintas con AND
+        "situacion": {"filterType": "number", "operator": "OR", "conditions": [
+            {"filterType": "number", "type": "equals", "filter": 1},
+            {"filterType": "number", "type": "equals", "filter": 3},
+        ]},
+        "entidad": {"filterType": "text", "type": "startsWith", "filter": "coop"},
+    }
+    assert _filas(modelo, filterModel=filtro) == ([("Coop Norte", 500, 1)], 1)
+
+
+def test_orden_por_varias_columnas(modelo):
+    orden = [{"colId": "situacion", "sort": "asc"}, {"colId": "monto", "sort": "desc"}]
+    assert _filas(modelo, sortModel=orden)[0] == [
+        ("Coop Norte", 7000, 0),
+        ("BANCO NACION", 10500, 1),
+        ("Coop Norte", 500, 1),
+        ("BANCO NACION", 10400, 2),
+        ("Tarjeta Sur", 2000, 3),
+    ]
+
+
+def test_orden_por_entidad_y_periodo(modelo):
+    # Empates de entidad: el período más antiguo primero
+    orden = [{"colId": "entidad", "sort": "desc"}, {"colId": "periodo", "sort": "asc"}]
+    assert _filas(modelo, sortModel=orden)[0] == [
+        ("Tarjeta Sur", 2000, 3),
+        ("Coop Norte", 500, 1),
+        ("Coop Norte", 7000, 0),
+        ("BANCO NACION", 10400, 2),
+        ("BANCO NACION", 10500, 1),
+    ]
+
+
+def test_columna_de_orden_desconocida_se_ignora(modelo):
+    orden = [{"colId": "inventada", "sort": "asc"}]
+    assert _filas(modelo, sortModel=orden) == _filas(modelo)
+
+
+def test_ventana_fuera_de_rango(modelo):
+    # Más allá del final: sin filas pero con el total, para que la grilla corte el scroll
+    assert pagina_detalle(modelo, {"startRow": 100, "endRow": 200}) == {"rowData": [], "rowCount": 5}
+    filas, total = _filas(modelo, startRow=3, endRow=100)
+    assert total == 5 and len(filas) == 2
+    filas, total = _filas(modelo, startRow=1, endRow=2)
+    assert filas == [("Tarjeta Sur", 2000, 3)]
+
+
+def test_sin_modelo():
+    assert pagina_detalle(None, {"startRow": 0, "endRow": 100}) == {"rowData": [], "rowCount": 0}
+    assert pagina_detalle(normalizar_periodos([]), {}) == {"rowData": [], "rowCount": 0}
@@ -1,9 +1,9 @@
 # test_plot_helpers.py
 
-from utils.plot_helpers import crear_grafico_torta
+from utils.plot_helpers import crear_grafico_evolucion, crear_grafico_torta
 import plotly.io as pio
 
-# --- Datos de prueba: menos de 6 categorías ---
+# --- Datos de prueba: 8 acreedores (fallback a barras) ---
 sample1 = [
     {"entidad": "Banco A", "monto": 41251, "situacion": 2},
     {"entidad": "Banco B", "monto": 3508, "situacion": 3},
@@ -15,23 +15,71 @@ sample1 = [
     {"entidad": "Banco H", "monto": 1340,  "situacion": 5},
 ]
 
-# --- Datos de prueba: 6 o más categorías para fallback a barras ---
-sample2 = sample1 + [
-    {"entidad": f"Banco Extra{i}", "monto": 30000, "situacion": 3}
-    for i in range(1, 3)  # suma 2 más → 7 categorías totales
-]
+# --- Datos de prueba: menos de 6 acreedores (torta) ---
+sample2 = sample1[:2] + [{"entidad": "Banco Chico", "monto": 100, "situacion": None}]
+
+
+def test_torta_menos_de_6_acreedores():
+    traza = crear_grafico_torta(sample2).data[0]
+    assert traza.type == "pie"
+    # < 3 % se agrupa en "Otros", al final
+    assert traza.labels == ("Banco A", "Banco B", "Otros")
+    assert traza.values == (41251000.0, 3508000.0, 100000.0)
+    # Pull solo en los slices < 10 %
+    assert traza.pull == (0.0, 0.04, 0.04)
+    assert traza.customdata == (2, 3, "N/A")
+    assert traza.text[0] == "Banco A<br>92.0% ($ 41.251.000)"
+
+
+def test_torta_6_o_mas_acreedores_pasa_a_barras():
+    traza = crear_grafico_torta(sample1).data[0]
+    assert traza.type == "bar" and traza.orientation == "h"
+    # Ascendente por situación y "Otros" (< 3 %) en el extremo superior
+    assert traza.y == ("Banco A", "Banco B", "Banco F", "Otros")
+    assert traza.x == (41251000.0, 3508000.0, 2000000.0, 3643000.0)
+    assert traza.customdata == (2, 3, 5, "N/A")
+    assert traza.textposition == ("inside", "outside", "outside", "outside")
+
+
+def test_torta_situacion_sin_dato():
+    data = sample1[:5] + [{"entidad": "Banco Z", "monto": 30000}]
+    traza = crear_grafico_torta(data).data[0]
+    # Sin situación (0) primero en el orden ascendente, "-" en el hover
+    assert traza.y[0] == "Banco Z"
+    assert traza.customdata[0] == "-"
+
+
+def test_torta_sin_montos():
+    assert crear_grafico_torta([]) == {}
+    assert crear_grafico_torta([{"entidad": "Banco A", "monto": 0, "situacion": 1}]) == {}
+
 
-# Elegí cuál probar
-#fig = crear_grafico_torta(sample1)
-fig = crear_grafico_torta(sample2)
+def test_evolucion_cronologica_en_pesos():
+    periodos = [
+        {"periodo": "202402", "entidades": [{"entidad": "A", "monto": 10.5, "situacion": 1},
+                                            {"entidad": "B", "monto": 2, "situacion": 1}]},
+        {"periodo": "202401", "entidades": [{"entidad": "A", "monto": 7, "situacion": 1}]},
+        {"periodo": "202312", "entidades": [{"entidad": "A", "monto": 1, "situacion": 1}]},
+    ]
+    fig = crear_grafico_evolucion(periodos)
+    assert fig.data[0].x == ("2023-12", "2024-01", "2024-02")
+    assert fig.data[0].y == (1000.0, 7000.0, 12500.0)
+    # Eje secundario: el año solo en enero
+    assert fig.layout.xaxis2.tickvals == ("2024-01",)
+    assert fig.layout.xaxis2.ticktext == ("2024",)
+    assert crear_grafico_evolucion([]) == {}
 
-fig.update_layout(
-    paper_bgcolor="#2D2D2D",
-    plot_bgcolor="#2D2D2D",
-)
 
-# Abre la figura en tu navegador
-pio.show(fig)
+if __name__ == "__main__":
+    # Vista previa manual: python test_plot_helpers.py [torta]
+    import sys
 
-# O guarda en un HTML para inspeccionar:
-# pio.write_html(fig, 'debug_torta.html', auto_open=True)
+    fig = crear_grafico_torta(sample2 if "torta" in sys.argv[1:] else sample1)
+    fig.update_layout(
+        paper_bgcolor="#2D2D2D",
+        plot_bgcolor="#2D2D2D",
+    )
+    # Abre la figura en tu navegador
+    pio.show(fig)
+    # O guarda en un HTML para inspeccionar:
+    # pio.write_html(fig, 'debug_torta.html', auto_open=True)
@@ -0,0 +1,128 @@
+# test_singleflight.py
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import singleflight
+from singleflight import SingleFlight
+
+
+def _esperar(condicion, limite=5):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, "no se cumplió a tiempo"
+        time.sleep(0.005)
+
+
+def _en_paralelo(vuelo, n, clave, funcion):
+    resultados, errores = [], []
+
+    def llamar():
+        try:
+            resultados.append(vuelo.ejecutar(clave, funcion))
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=llamar) for _ in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    return hilos, resultados, errores
+
+
+def test_llamadas_concurrentes_comparten_una_ejecucion(tmp_path):
+    vuelo = SingleFlight(str(tmp_path))
+    soltar = threading.Event()
+    ejecuciones = []
+
+    def consultar():
+        ejecuciones.append(1)
+        soltar.wait(5)
+        return {"cuit": "1"}
+
+    hilos, resultados, errores = _en_paralelo(vuelo, 8, "1", consultar)
+    # Se suelta al líder recién cuando los otros 7 están esperándolo
+    _esperar(lambda: vuelo.estadisticas()["deduplicadas_proceso"] == 7)
+    soltar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(ejecuciones) == 1 and not errores
+    assert resultados == [{"cuit": "1"}] * 8
+    assert vuelo.estadisticas() == {
+        "llamadas": 8, "ejecutadas": 1, "deduplicadas_proceso": 7, "deduplicadas_workers": 0,
+    }
+
+
+def test_el_error_llega_a_todos_y_libera_la_clave(tmp_path):
+    vuelo = SingleFlight(str(tmp_path))
+    soltar = threading.Event()
+
+    def fallar():
+        soltar.wait(5)
+        raise ValueError("API caída")
+
+    hilos, resultados, errores = _en_paralelo(vuelo, 4, "1", fallar)
+    _esperar(lambda: vuelo.estadisticas()["deduplicadas_proceso"] == 3)
+    soltar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert not resultados and len(errores) == 4
+    assert all(isinstance(e, ValueError) for e in errores)
+    # La clave ya no está en vuelo: la siguiente llamada ejecuta de nuevo
+    assert vuelo.ejecutar("1", lambda: "ok") == "ok"
+    assert vuelo.estadisticas()["ejecutadas"] == 2
+
+
+def test_claves_distintas_no_se_esperan(tmp_path):
+    vuelo = SingleFlight(str(tmp_path))
+    soltar = threading.Event()
+    hilos, _, _ = _en_paralelo(vuelo, 1, "1", lambda: soltar.wait(5))
+    _esperar(lambda: vuelo.estadisticas()["ejecutadas"] == 1)
+
+    assert vuelo.ejecutar("2", lambda: "dos") == "dos"
+    soltar.set()
+    hilos[0].join()
+
+
+def _otro_worker(dir_locks, guardado, salida):
+    # Un worker tiene su propio SingleFlight; solo comparte el directorio de locks
+    vuelo = SingleFlight(dir_locks)
+    ejecutadas = []
+    resultado = vuelo.ejecutar(
+        "1", lambda: ejecutadas.append(1) or "propio", revisar=lambda: guardado.read_text() or None
+    )
+    salida.put((resultado, len(ejecutadas), vuelo.estadisticas()["deduplicadas_workers"]))
+
+
+@pytest.mark.skipif(singleflight.fcntl is None, reason="sin fcntl solo se coalesce dentro del proceso")
+def test_entre_procesos_el_que_espera_revisa_el_cache(tmp_path):
+    vuelo = SingleFlight(str(tmp_path / "locks"))
+    guardado = tmp_path / "cache.txt"
+    guardado.write_text("")
+    adentro, soltar = threading.Event(), threading.Event()
+
+    def consultar():
+        adentro.set()
+        soltar.wait(5)
+        guardado.write_text("del lider")
+        return "del lider"
+
+    lider = threading.Thread(target=vuelo.ejecutar, args=("1", consultar), kwargs={"revisar": lambda: None})
+    lider.start()
+    adentro.wait(5)
+
+    contexto = multiprocessing.get_context("fork")
+    salida = contexto.Queue()
+    proceso = contexto.Process(target=_otro_worker, args=(vuelo.dir_locks, guardado, salida))
+    proceso.start()
+    # El otro proceso queda bloqueado en el lock de archivo hasta que termina el líder
+    time.sleep(0.2)
+    soltar.set()
+    lider.join()
+    resultado, ejecutadas, deduplicadas = salida.get(timeout=5)
+    proceso.join(5)
+
+    assert (resultado, ejecutadas, deduplicadas) == ("del lider", 0, 1)
@@ -0,0 +1,100 @@
+# test_sql_api.py
+from datetime import datetime
+
+import pytest
+
+import sql_api
+from bcra_client import ClienteBCRA
+from cache_deudas import CacheDeudas
+from circuito import Circuito
+from compartido import AlmacenCompartido
+from singleflight import SingleFlight
+
+CUIT = "20123456786"
+
+
+def _payload(periodo):
+    return {
+        "identificacion": int(CUIT),
+        "denominacion": "PRUEBA",
+        "periodos": [{"periodo": periodo, "entidades": [{"entidad": "BANCO A", "situacion": 1, "monto": 10.0}]}],
+    }
+
+
+class ClienteContado:
+    """
+    Cliente BCRA de prueba que cuenta las consultas y devuelve `respuesta`.
+    """
+
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+        self.consultas = 0
+
+    def deudas_historicas(self, cuit):
+        self.consultas += 1
+        return self.respuesta
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # ttl_revalidacion=0: una entrada que ya puede tener un mes nuevo está vencida
+    cache = CacheDeudas(str(tmp_path / "deudas.db"), ttl_revalidacion=0)
+    monkeypatch.setattr(sql_api, "cache", cache)
+    monkeypatch.setattr(sql_api, "vuelo", SingleFlight(str(tmp_path / "locks")))
+    return cache
+
+
+@pytest.fixture
+def circuito_abierto(tmp_path, monkeypatch):
+    # Cliente real con el circuito abierto: falla sin salir a la red
+    circuito = Circuito("prueba", almacen=AlmacenCompartido(str(tmp_path / "compartido.db")), fallas=1, espera=60)
+    circuito.registrar(False)
+    cliente = ClienteBCRA(url_base="http://127.0.0.1:9", circuito=circuito, reintentos=0)
+    monkeypatch.setattr(sql_api, "cliente", cliente)
+    return cliente
+
+
+def test_entrada_vigente_no_sale_a_la_api(cache, monkeypatch):
+    # Período del mes en curso: el siguiente todavía no puede estar publicado
+    data = _payload(datetime.now().strftime("%Y%m"))
+    cache.guardar(CUIT, data)
+    cliente = ClienteContado(_payload("200001"))
+    monkeypatch.setattr(sql_api, "cliente", cliente)
+
+    assert sql_api.consultar_deuda_historica(CUIT) == data
+    assert cliente.consultas == 0
+
+
+def test_entrada_vencida_se_consulta_y_se_guarda(cache, monkeypatch):
+    cache.guardar(CUIT, _payload("202001"))
+    nueva = _payload(datetime.now().strftime("%Y%m"))
+    cliente = ClienteContado(nueva)
+    monkeypatch.setattr(sql_api, "cliente", cliente)
+
+    assert sql_api.consultar_deuda_historica(CUIT) == nueva
+    assert sql_api.consultar_deuda_historica(CUIT) == nueva
+    assert cliente.consultas == 1
+
+
+def test_circuito_abierto_sirve_la_ultima_conocida_marcada(cache, circuito_abierto):
+    data = _payload("202001")
+    cache.guardar(CUIT, data)
+
+    servida = sql_api.consultar_deuda_historica(CUIT, permitir_vencida=True)
+    assert servida["periodos"] == data["periodos"]
+    assert "no está respondiendo" in servida[sql_api.VENCIDA]["motivo"]
+    assert servida[sql_api.VENCIDA]["consultado"] == cache.ultima_conocida(CUIT)[1]
+
+
+def test_sin_permitir_vencida_devuelve_el_error(cache, circuito_abierto):
+    cache.guardar(CUIT, _payload("202001"))
+
+    data = sql_api.consultar_deuda_historica(CUIT)
+    assert set(data) == {"error"}
+    assert "no está respondiendo" in data["error"]
+    # El error no pisa la última respuesta conocida
+    assert cache.ultima_conocida(CUIT)[0] == _payload("202001")
+
+
+def test_circuito_abierto_sin_historia_devuelve_el_error(cache, circuito_abierto):
+    assert "error" in sql_api.consultar_deuda_historica(CUIT, permitir_vencida=True)
@@ -1,153 +1,270 @@
-import pandas as pd
+import numpy as np
 from dash import html
 from dash_ag_grid import AgGrid
 
+from utils.pivot import FLEX_MESES, MONTH_LABELS, SITUATION_STYLES, armar_pivot
+
 # NOTA: Las reglas CSS para las clases bg-sit-2 a bg-sit-5 deben ir en assets/custom.css
-# .bg-sit-2 { background-color: #FFE5E5; color: #000000; }
-# .bg-sit-3 { background-color: #FFBFBF; color: #000000; }
-# .bg-sit-4 { background-color: #FF8080; color: #FFFFFF; }
-# .bg-sit-5 { background-color: #FF4C4C; color: #FFFFFF; }
-
-# Mapeo de iniciales de mes para los encabezados secundarios
-MONTH_LABELS = {
-    "01": "E", "02": "F", "03": "M", "04": "A", "05": "M",
-    "06": "J", "07": "J", "08": "A", "09": "S", "10": "O",
-    "11": "N", "12": "D"
+# (mismos colores que utils.pivot.SITUATION_STYLES)
+
+# Clase de la celda de un mes según la situación, definida una vez para todos los meses
+REGLAS_SITUACION = {f"bg-sit-{k}": f"params.value == {k}" for k in SITUATION_STYLES}
+
+# defaultColDef del pivot con estilos generales
+DEFAULT_COL_DEF_PIVOT = {
+    "resizable": True,
+    "sortable": True,
+    "filter": True,
+    "suppressMenu": True,
+    "headerClass": "custom-header",
+    "cellStyle": {
+        "backgroundColor": "#2D2D2D",
+        "color": "white",
+        "textAlign": "center",
+        "fontSize": "0.8rem",
+        "whiteSpace": "normal",
+        "overflowWrap": "break-word"
+    },
+    "headerStyle": {
+        "backgroundColor": "#393939",
+        "color": "white",
+        "textAlign": "center",
+        "whiteSpace": "normal",
+        "overflowWrap": "break-word"
+    }
+}
+
+# Columnas principales del pivot, antes de los meses agrupados por año
+COLUMNAS_FIJAS_PIVOT = [
+    {"headerName": "Entidad", "field": "Entidad", "flex": 25},
+    {"headerName": "Situación", "field": "Situación", "flex": 10},
+    {
+        "headerName": "Monto ($)",
+        "field": "Monto",
+        "type": "numericColumn",
+        "valueFormatter": {
+            "function": "params.value != null ? '$ ' + params.value.toLocaleString('es-AR') : ''"
+        },
+        "sort": "desc",
+        "sortIndex": 0,
+        "flex": 10
+    }
+]
+
+OPCIONES_PIVOT = {
+    "domLayout": "autoHeight",
+    "suppressHorizontalScroll": False,
+    "headerHeight": 32,
+    "groupHeaderHeight": 32
 }
 
-# Estilos de color según situación
-SITUATION_STYLES = {
-    2: {}, 3: {}, 4: {}, 5: {}
-}  # Se usan solo para generar cellClassRules en definitions
+
+def config_pivot():
+    """
+    Configuración estática del pivot para armarlo en el navegador
+    (assets/clientside.js) igual que crear_pivot_table_aggrid.
+    """
+    return {
+        "defaultColDef": DEFAULT_COL_DEF_PIVOT,
+        "columnasFijas": COLUMNAS_FIJAS_PIVOT,
+        "flexMeses": FLEX_MESES,
+        "opciones": OPCIONES_PIVOT,
+        "meses": MONTH_LABELS,
+        "reglasMes": REGLAS_SITUACION,
+    }
 
 
 def crear_pivot_table_aggrid(periodos):
     """
     Genera un AgGrid con estructura pivot, encabezados agrupados por año y mes,
     formato monetario y estilos condicionales según situación.
+    Acepta un DeudaColumnar o el JSON crudo de `periodos`.
     """
-    if not periodos:
+    pivot = armar_pivot(periodos)
+    if not len(pivot):
         return html.Div("No hay datos para mostrar.")
 
-    # 1) Organizar años y meses disponibles y cargar datos crudos
-    columnas_por_anio = {}
-    raw_data = {}
-    for p in periodos:
-        periodo = p.get("periodo", "")
-        if len(periodo) == 5:
-            periodo = periodo[:4] + periodo[4:].zfill(2)
-        if len(periodo) == 6:
-            anio, mes = periodo[:4], periodo[4:6]
-            columnas_por_anio.setdefault(anio, set()).add(mes)
-            for ent in p.get("entidades", []):
-                entidad = ent.get("entidad", "")
-                monto = ent.get("monto", 0) * 1000
-                situacion = ent.get("situacion", 0) or 0
-                if entidad not in raw_data:
-                    raw_data[entidad] = {
-                        "Entidad": entidad,
-                        "Situación": situacion,
-                        "Monto": monto,
-                        "hist": {}
-                    }
-                raw_data[entidad]["hist"][(anio, mes)] = situacion
-
-    sorted_anios = sorted(columnas_por_anio.keys(), reverse=True)
-    for anio in sorted_anios:
-        columnas_por_anio[anio] = sorted(columnas_por_anio[anio], reverse=True)
-
-    # 2) Construir registros para AgGrid
-    registros = []
-    for data in raw_data.values():
-        fila = {
-            "Entidad": data["Entidad"],
-            "Situación": data["Situación"],
-            "Monto": int(data["Monto"])
-        }
-        for anio in sorted_anios:
-            for mes in columnas_por_anio[anio]:
-                key = f"{anio}-{mes}"
-                fila[key] = data["hist"].get((anio, mes), "")
-        registros.append(fila)
-
-    df = pd.DataFrame(registros)
-
-    # 3) defaultColDef con estilos generales
-    default_col_def = {
-        "resizable": True,
-        "sortable": True,
-        "filter": True,
-        "suppressMenu": True, 
-        "headerClass": "custom-header", 
-        "cellStyle": {
-            "backgroundColor": "#2D2D2D",
-            "color": "white",
-            "textAlign": "center",
-            "fontSize": "0.8rem",
-            "whiteSpace": "normal",
-            "overflowWrap": "break-word"
-        },
-        "headerStyle": {
-            "backgroundColor": "#393939",
-            "color": "white",
-            "textAlign": "center",
-            "whiteSpace": "normal",
-            "overflowWrap": "break-word"
-        }
-    }
+    # 1) Columnas principales (Entidad, Situación, Monto) con flex por porcentaje
+    col_defs = [dict(c) for c in COLUMNAS_FIJAS_PIVOT]
 
-    # 4) Definir columnas principales con flex por porcentaje
+    # 2) Meses agrupados por año: cada uno referencia el tipo "mes", que lleva
+    #    el flex y las reglas de situación una sola vez para toda la grilla
+    for anio, col_ids in pivot.anios:
+        col_defs.append({
+            "headerName": anio,
+            "children": [
+                {"headerName": MONTH_LABELS.get(c[5:], c[5:]), "field": c, "type": "mes"}
+                for c in col_ids
+            ],
+            "marryChildren": True
+        })
+    opciones = dict(OPCIONES_PIVOT, columnTypes={
+        "mes": {"flex": pivot.ancho_mes(), "cellClassRules": REGLAS_SITUACION}
+    })
+
+    # 3) Renderizado final sin inyección de <style>
+    return html.Div(
+        AgGrid(
+            id="tabla-ag-grid",
+            columnDefs=col_defs,
+            rowData=pivot.registros,
+            defaultColDef=DEFAULT_COL_DEF_PIVOT,
+            dashGridOptions=opciones
+        ),
+        className="ag-theme-alpine-dark",
+        style={"width": "100%"}
+    )
+
+
+# Operadores de los filtros de AG Grid aplicados del lado del servidor
+FILTROS_TEXTO = {
+    "contains": lambda v, f: np.char.find(v, f) >= 0,
+    "notContains": lambda v, f: np.char.find(v, f) < 0,
+    "equals": lambda v, f: v == f,
+    "notEqual": lambda v, f: v != f,
+    "startsWith": lambda v, f: np.char.startswith(v, f),
+    "endsWith": lambda v, f: np.char.endswith(v, f),
+}
+FILTROS_NUMERO = {
+    "equals": lambda v, f, t: v == f,
+    "notEqual": lambda v, f, t: v != f,
+    "lessThan": lambda v, f, t: v < f,
+    "lessThanOrEqual": lambda v, f, t: v <= f,
+    "greaterThan": lambda v, f, t: v > f,
+    "greaterThanOrEqual": lambda v, f, t: v >= f,
+    "inRange": lambda v, f, t: (v >= f) & (v <= t),
+}
+
+
+def crear_tabla_detalle_aggrid(cuit, huella, n_filas):
+    """
+    Detalle Mes-Año por Entidad con row model infinito: el navegador pide
+    solo la ventana visible y el servidor ordena, filtra y pagina
+    (ver pagina_detalle). El id incluye el CUIT y la huella del modelo: cada
+    consulta monta una grilla nueva y las páginas salen del modelo en pantalla.
+    """
     col_defs = [
-        {"headerName": "Entidad", "field": "Entidad", "flex": 25},
-        {"headerName": "Situación", "field": "Situación", "flex": 10},
+        {"headerName": "Mes-Año", "field": "periodo", "filter": "agTextColumnFilter", "flex": 2},
+        {"headerName": "Entidad", "field": "entidad", "filter": "agTextColumnFilter", "flex": 4},
         {
             "headerName": "Monto ($)",
-            "field": "Monto",
+            "field": "monto",
             "type": "numericColumn",
+            "filter": "agNumberColumnFilter",
             "valueFormatter": {
                 "function": "params.value != null ? '$ ' + params.value.toLocaleString('es-AR') : ''"
             },
-            "sort": "desc",
-            "sortIndex": 0,
-            "flex": 10
-        }
+            "flex": 2
+        },
+        {
+            "headerName": "Situación",
+            "field": "situacion",
+            "filter": "agNumberColumnFilter",
+            "valueFormatter": {"function": "params.value ? params.value : '-'"},
+            "flex": 1
+        },
     ]
-
-    # 5) Columnas por año con flex para meses sumando 55%
-    total_meses = sum(len(columnas_por_anio[a]) for a in sorted_anios)
-    flex_mes = 55 / total_meses if total_meses else 0
-    for anio in sorted_anios:
-        children = []
-        for mes in columnas_por_anio[anio]:
-            col_id = f"{anio}-{mes}"
-            children.append({
-                "headerName": MONTH_LABELS.get(mes, mes),
-                "field": col_id,
-                "flex": flex_mes,
-                "cellClassRules": {
-                    f"bg-sit-{k}": f"params.value == {k}" for k in SITUATION_STYLES.keys()
-                }
-            })
-        col_defs.append({
-            "headerName": anio,
-            "children": children,
-            "marryChildren": True
-        })
-
-    # 6) Renderizado final sin inyección de <style>
     return html.Div(
         AgGrid(
-            id="tabla-ag-grid",
+            id={"type": "tabla-detalle-grid", "cuit": str(cuit), "huella": huella},
             columnDefs=col_defs,
-            rowData=df.to_dict("records"),
-            defaultColDef=default_col_def,
+            rowModelType="infinite",
+            defaultColDef={
+                "resizable": True,
+                "sortable": True,
+                "filterParams": {"buttons": ["reset"], "debounceMs": 300, "maxNumConditions": 1},
+            },
             dashGridOptions={
-                "domLayout": "autoHeight",
-                "suppressHorizontalScroll": False,
+                "rowBuffer": 10,
+                "cacheBlockSize": 100,
+                "maxBlocksInCache": 10,
+                "infiniteInitialRowCount": min(n_filas, 100),
                 "headerHeight": 32,
-                "groupHeaderHeight": 32
-            }
+            },
+            style={"height": f"{min(600, 32 + 42 * max(n_filas, 1))}px", "width": "100%"}
         ),
         className="ag-theme-alpine-dark",
         style={"width": "100%"}
     )
+
+
+def _mascara_filtro(valores, filtro):
+    if "conditions" in filtro:
+        mascaras = [_mascara_filtro(valores, c) for c in filtro["conditions"]]
+        combinar = np.logical_or if filtro.get("operator") == "OR" else np.logical_and
+        return combinar.reduce(mascaras)
+
+    tipo = filtro.get("type")
+    if tipo == "blank":
+        return valores == (0 if valores.dtype.kind in "iu" else "")
+    if tipo == "notBlank":
+        return valores != (0 if valores.dtype.kind in "iu" else "")
+    if filtro.get("filterType") == "number":
+        operador = FILTROS_NUMERO.get(tipo)
+        if operador is None or filtro.get("filter") is None:
+            return np.ones(len(valores), dtype=bool)
+        return operador(valores, filtro["filter"], filtro.get("filterTo", filtro["filter"]))
+    operador = FILTROS_TEXTO.get(tipo)
+    if operador is None or not filtro.get("filter"):
+        return np.ones(len(valores), dtype=bool)
+    return operador(np.char.lower(valores), str(filtro["filter"]).lower())
+
+
+def pagina_detalle(modelo, request):
+    """
+    Responde un getRowsRequest del row model infinito a partir del modelo
+    columnar: filtra, ordena y devuelve solo las filas [startRow, endRow).
+    """
+    if modelo is None or not len(modelo):
+        return {"rowData": [], "rowCount": 0}
+
+    lista_etiquetas = modelo.etiquetas_periodo()
+    etiquetas = np.array(lista_etiquetas or [""])
+    nombres = np.array(modelo.entidades or [""])
+
+    # 1) Filtros: los de texto se evalúan una vez por categoría y se expanden por código
+    mascara = np.ones(len(modelo), dtype=bool)
+    for campo, filtro in (request.get("filterModel") or {}).items():
+        if campo == "periodo":
+            mascara &= _mascara_filtro(etiquetas, filtro)[modelo.periodo_idx]
+        elif campo == "entidad":
+            mascara &= _mascara_filtro(nombres, filtro)[modelo.entidad]
+        elif campo == "monto":
+            mascara &= _mascara_filtro(modelo.monto, filtro)
+        elif campo == "situacion":
+            mascara &= _mascara_filtro(modelo.situacion, filtro)
+    indices = np.flatnonzero(mascara)
+
+    # 2) Orden: por defecto el del modelo (período más reciente primero)
+    claves = {
+        "periodo": lambda: modelo.periodos[modelo.periodo_idx],
+        "entidad": lambda: np.argsort(np.argsort(nombres, kind="stable"))[modelo.entidad],
+        "monto": lambda: modelo.monto,
+        "situacion": lambda: modelo.situacion,
+    }
+    for orden in reversed(request.get("sortModel") or []):
+        clave = claves.get(orden.get("colId"))
+        if clave is None:
+            continue
+        valores = clave()[indices]
+        if orden.get("sort") == "desc":
+            # Orden descendente estable sin invertir el orden relativo de los empates
+            posiciones = np.argsort(-valores.astype(np.int64), kind="stable")
+        else:
+            posiciones = np.argsort(valores, kind="stable")
+        indices = indices[posiciones]
+
+    # 3) Ventana pedida por la grilla
+    inicio = int(request.get("startRow") or 0)
+    fin = int(request.get("endRow") or inicio + 100)
+    ventana = indices[inicio:fin]
+    filas = [
+        {"periodo": lista_etiquetas[i], "entidad": modelo.entidades[e], "monto": m, "situacion": s}
+        for i, e, m, s in zip(
+            modelo.periodo_idx[ventana].tolist(),
+            modelo.entidad[ventana].tolist(),
+            modelo.monto[ventana].tolist(),
+            modelo.situacion[ventana].tolist(),
+        )
+    ]
+    return {"rowData": filas, "rowCount": len(indices)}
@@ -0,0 +1,165 @@
+# utils/exportacion.py
+import csv
+import io
+import os
+import tempfile
+
+from utils.pivot import MONTH_LABELS, SITUATION_STYLES, agrupar_por_anio
+
+# Tamaño de los bloques con que se envían los archivos generados
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _filas_ordenadas(modelo):
+    # Mismo orden que la grilla: Monto descendente
+    col_ids, filas = modelo.filas_pivot()
+    filas.sort(key=lambda f: f[2], reverse=True)
+    return col_ids, filas
+
+
+class ArchivoTemporal:
+    """
+    Archivo generado en disco que se envía en bloques. close() lo borra: la
+    respuesta lo llama al cerrarse (call_on_close), se haya leído o no
+    (HEAD, descargas canceladas).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def __iter__(self):
+        with open(self.ruta, "rb") as f:
+            while True:
+                bloque = f.read(TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                yield bloque
+
+    def close(self):
+        try:
+            os.unlink(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+def exportar_xlsx(modelo):
+    """
+    Genera el pivot como .xlsx en modo constant_memory (cada fila se vuelca a
+    disco apenas se escribe) con encabezados agrupados por año/mes y colores
+    por situación. Devuelve un ArchivoTemporal (iterable de bloques de bytes).
+    A diferencia del CSV no se transmite mientras se genera: el .xlsx es un
+    zip que xlsxwriter arma al cerrar el libro, así que el primer byte sale
+    recién con el archivo completo.
+    """
+    import xlsxwriter
+
+    col_ids, filas = _filas_ordenadas(modelo)
+    fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        libro = xlsxwriter.Workbook(ruta, {"constant_memory": True, "tmpdir": tempfile.gettempdir()})
+        hoja = libro.add_worksheet("Tabla Unificada")
+
+        encabezado = libro.add_format({
+            "bold": True, "align": "center", "valign": "vcenter",
+            "bg_color": "#393939", "font_color": "#FFFFFF", "border": 1
+        })
+        centrado = libro.add_format({"align": "center"})
+        moneda = libro.add_format({"num_format": "$ #,##0"})
+        por_situacion = {
+            sit: libro.add_format({
+                "align": "center",
+                "bg_color": estilo["backgroundColor"],
+                "font_color": estilo["color"],
+            })
+            for sit, estilo in SITUATION_STYLES.items()
+        }
+
+        # 1) Encabezados: fila 0 con el año (agrupado), fila 1 con la inicial del mes.
+        #    En constant_memory cada fila debe completarse antes de pasar a la siguiente.
+        hoja.write_row(0, 0, ["", "", ""], encabezado)
+        col = 3
+        for anio, meses in agrupar_por_anio(col_ids):
+            if len(meses) > 1:
+                hoja.merge_range(0, col, 0, col + len(meses) - 1, anio, encabezado)
+            else:
+                hoja.write(0, col, anio, encabezado)
+            col += len(meses)
+        hoja.write_row(1, 0, ["Entidad", "Situación", "Monto ($)"], encabezado)
+        hoja.write_row(1, 3, [MONTH_LABELS.get(c[5:], c[5:]) for c in col_ids], encabezado)
+
+        hoja.set_column(0, 0, 40)
+        hoja.set_column(1, 1, 10)
+        hoja.set_column(2, 2, 16)
+        hoja.set_column(3, 2 + len(col_ids), 4)
+        hoja.freeze_panes(2, 3)
+
+        # 2) Datos, fila por fila
+        for i, fila in enumerate(filas, start=2):
+            hoja.write_string(i, 0, fila[0])
+            hoja.write_number(i, 1, fila[1], centrado)
+            hoja.write_number(i, 2, fila[2], moneda)
+            for j, valor in enumerate(fila[3:], start=3):
+                if valor != "":
+                    hoja.write_number(i, j, valor, por_situacion.get(valor, centrado))
+        libro.close()
+    except Exception:
+        os.unlink(ruta)
+        raise
+    return ArchivoTemporal(ruta)
+
+
+def exportar_csv(modelo):
+    """
+    Genera el pivot como CSV (UTF-8 con BOM para Excel), fila por fila: la
+    descarga empieza antes de terminar de generarse.
+    """
+    col_ids, filas = _filas_ordenadas(modelo)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    def generar():
+        yield "\ufeff".encode("utf-8")
+        escritor.writerow(["Entidad", "Situación", "Monto"] + col_ids)
+        for fila in filas:
+            escritor.writerow(fila)
+            if buffer.tell() >= TAMANO_BLOQUE:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    return generar()
+
+
+def exportar_parquet(modelo):
+    """
+    Genera el pivot como Parquet (columnas de meses int8 con nulos). Requiere pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    col_ids, filas = _filas_ordenadas(modelo)
+    columnas = {
+        "Entidad": pa.array([f[0] for f in filas], pa.string()),
+        "Situación": pa.array([f[1] for f in filas], pa.int8()),
+        "Monto": pa.array([f[2] for f in filas], pa.int64()),
+    }
+    for j, col_id in enumerate(col_ids, start=3):
+        columnas[col_id] = pa.array([None if f[j] == "" else f[j] for f in filas], pa.int8())
+
+    fd, ruta = tempfile.mkstemp(suffix=".parquet")
+    os.close(fd)
+    try:
+        pq.write_table(pa.table(columnas), ruta, compression="zstd")
+    except Exception:
+        os.unlink(ruta)
+        raise
+    return ArchivoTemporal(ruta)
+
+
+FORMATOS = {
+    "xlsx": (exportar_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (exportar_csv, "text/csv; charset=utf-8"),
+    "parquet": (exportar_parquet, "application/vnd.apache.parquet"),
+}
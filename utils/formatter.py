@@ -7,6 +7,28 @@ def formatear_moneda(valor):
     except:
         return str(valor)
 
+def cuit_valido(cuit):
+    """
+    True si `cuit` tiene 11 dígitos y el dígito verificador (módulo 11) es correcto.
+    """
+    cuit = str(cuit or "")
+    if len(cuit) != 11 or not cuit.isdigit():
+        return False
+    resto = sum(int(d) * p for d, p in zip(cuit, (5, 4, 3, 2, 7, 6, 5, 4, 3, 2))) % 11
+    verificador = 11 - resto if resto else 0
+    return verificador < 10 and verificador == int(cuit[10])
+
+def normalizar_periodo(periodo):
+    """
+    Devuelve el período como 'YYYYMM' (completa meses de un dígito) o None.
+    """
+    periodo = str(periodo or "")
+    if len(periodo) == 5:
+        periodo = periodo[:4] + periodo[4:].zfill(2)
+    if len(periodo) == 6 and periodo.isdigit():
+        return periodo
+    return None
+
 def formatear_periodo(periodo_str):
     try:
         fecha = datetime.strptime(periodo_str, "%Y%m")
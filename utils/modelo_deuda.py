@@ -0,0 +1,214 @@
+# utils/modelo_deuda.py
+import base64
+import hashlib
+from itertools import repeat
+
+import numpy as np
+
+from utils.formatter import normalizar_periodo, formatear_periodo
+
+
+def _tipado(arreglo, dtype):
+    """
+    {"dtype", "bdata"}: el arreglo little-endian en base64, como los arreglos
+    tipados de Plotly.
+    """
+    datos = np.ascontiguousarray(arreglo, dtype="<" + dtype).tobytes()
+    return {"dtype": dtype, "bdata": base64.b64encode(datos).decode("ascii")}
+
+
+class DeudaColumnar:
+    """
+    Representación columnar de `periodos` de la Central de Deudores, construida
+    una sola vez por consulta y compartida por todas las vistas.
+
+    - periodos: int32 YYYYMM, únicos, del más reciente al más antiguo.
+    - entidades: nombres; `entidad` guarda el código (índice) de cada registro,
+      asignado por orden de aparición desde el período más reciente.
+    - registros ordenados por período descendente (respetando el orden de la
+      API dentro de cada período): periodo_idx, entidad, monto (en pesos,
+      ya multiplicado por 1000) y situacion (int8, 0 = sin dato).
+    """
+
+    __slots__ = ("periodos", "entidades", "periodo_idx", "entidad", "monto", "situacion", "_offsets")
+
+    def __init__(self, periodos, entidades, periodo_idx, entidad, monto, situacion):
+        self.periodos = periodos
+        self.entidades = entidades
+        self.periodo_idx = periodo_idx
+        self.entidad = entidad
+        self.monto = monto
+        self.situacion = situacion
+        # Registros del período i: [_offsets[i], _offsets[i + 1])
+        self._offsets = np.searchsorted(periodo_idx, np.arange(len(periodos) + 1))
+
+    def __len__(self):
+        return len(self.monto)
+
+    def huella(self):
+        """
+        Hash del contenido: dos consultas con los mismos datos tienen la misma huella.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for arreglo in (self.periodos, self.periodo_idx, self.entidad, self.monto, self.situacion):
+            h.update(arreglo.tobytes())
+        h.update("\x00".join(self.entidades).encode())
+        return h.hexdigest()
+
+    def rango(self, i):
+        """
+        Slice de los registros del i-ésimo período (0 = el más reciente).
+        """
+        return slice(int(self._offsets[i]), int(self._offsets[i + 1]))
+
+    def totales_por_periodo(self):
+        """
+        Suma de montos (en pesos) por período, en el orden de `periodos`.
+        """
+        return np.bincount(self.periodo_idx, weights=self.monto, minlength=len(self.periodos))
+
+    def columnas_pivot(self):
+        """
+        Ids de columna 'YYYY-MM' del pivot, del período más reciente al más antiguo.
+        """
+        return [f"{p // 100}-{p % 100:02d}" for p in self.periodos.tolist()]
+
+    def primeros(self):
+        """
+        Índice del primer registro de cada entidad. Los códigos siguen el orden
+        de aparición: una entidad aparece por primera vez donde crece el máximo
+        acumulado de `entidad` (sin ordenar los registros como np.unique).
+        """
+        return np.flatnonzero(np.diff(np.maximum.accumulate(self.entidad), prepend=-1) > 0)
+
+    def filas_pivot(self):
+        """
+        Matriz entidad × período de situaciones, armada por scatter de códigos
+        numéricos que una tabla traduce a celdas. Devuelve (col_ids, filas) con
+        una lista por entidad: Entidad, Situación y Monto del período más
+        reciente en que figura, más una celda por período ("" si no figura ese mes).
+        """
+        col_ids = self.columnas_pivot()
+        n_ent, n_per = len(self.entidades), len(self.periodos)
+
+        # 1) Situación + 1 por celda (0 = no figura ese mes) y tabla código -> celda
+        celdas = np.zeros((n_ent, n_per), dtype=np.intp)
+        celdas[self.entidad, self.periodo_idx] = self.situacion + 1
+        tabla = np.array([""] + list(range(int(self.situacion.max(initial=0)) + 1)), dtype=object)
+        matriz = np.empty((n_ent, 3 + n_per), dtype=object)
+        matriz[:, 3:] = tabla[celdas]
+
+        # 2) Primer registro de cada entidad
+        primeros = self.primeros()
+        matriz[:, 0] = self.entidades
+        matriz[:, 1] = self.situacion[primeros].astype(object)
+        matriz[:, 2] = self.monto[primeros].astype(object)
+        return col_ids, matriz.tolist()
+
+    def pivot(self):
+        """
+        Filas del pivot como dicts (formato rowData de AgGrid), ver filas_pivot.
+        """
+        col_ids, filas = self.filas_pivot()
+        claves = ["Entidad", "Situación", "Monto"] + col_ids
+        return col_ids, list(map(dict, map(zip, repeat(claves), filas)))
+
+    def compacto(self):
+        """
+        Lo que necesitan las vistas armadas en el navegador (torta, evolución y
+        pivot), con los arreglos en base64 tipado:
+        - totales por período y registros del período más reciente;
+        - situación y monto del primer registro de cada entidad;
+        - matriz entidad × período con situación + 1 (0 = no figura ese mes),
+          de a 4 bits por celda si las situaciones entran.
+        """
+        n_ent, n_per = len(self.entidades), len(self.periodos)
+        ultimo = self.rango(0) if n_per else slice(0, 0)
+        primeros = self.primeros()
+
+        # 1) Matriz de situaciones por scatter, como en filas_pivot
+        celdas = np.zeros((n_ent, n_per), dtype=np.uint8)
+        celdas[self.entidad, self.periodo_idx] = self.situacion.astype(np.uint8) + 1
+        celdas = celdas.ravel()
+        bits = 4 if celdas.max(initial=0) < 16 else 8
+        if bits == 4:
+            celdas = np.append(celdas, np.zeros(len(celdas) % 2, dtype=np.uint8))
+            celdas = celdas[0::2] << 4 | celdas[1::2]
+
+        return {
+            "periodos": self.periodos.tolist(),
+            "entidades": self.entidades,
+            "totales": _tipado(self.totales_por_periodo(), "f8"),
+            "ultimo": {
+                "entidad": _tipado(self.entidad[ultimo], "i4"),
+                "monto": _tipado(self.monto[ultimo], "f8"),
+                "situacion": _tipado(self.situacion[ultimo], "u1"),
+            },
+            "primero": {
+                "monto": _tipado(self.monto[primeros], "f8"),
+                "situacion": _tipado(self.situacion[primeros], "u1"),
+            },
+            "situaciones": dict(_tipado(celdas, "u1"), bits=bits),
+        }
+
+    def fechas(self):
+        """
+        Primer día de cada período como datetime64[M] (meses desde 1970).
+        """
+        return ((self.periodos // 100 - 1970) * 12 + self.periodos % 100 - 1).astype("datetime64[M]")
+
+    def etiquetas_periodo(self):
+        """
+        'Mes Año' de cada período, calculado una vez por período.
+        """
+        return [formatear_periodo(str(p)) for p in self.periodos]
+
+
+def normalizar_periodos(periodos):
+    """
+    Convierte el JSON crudo (`data["periodos"]`) en un DeudaColumnar.
+    Ignora períodos con formato inválido y no modifica la entrada.
+    """
+    # 1) Períodos válidos, del más reciente al más antiguo (orden estable)
+    validos = []
+    for p in periodos or []:
+        per = normalizar_periodo(p.get("periodo"))
+        if per:
+            validos.append((int(per), p.get("entidades") or []))
+    validos.sort(key=lambda x: x[0], reverse=True)
+
+    # 2) Una sola pasada por los registros
+    unicos, codigos, nombres = [], {}, []
+    periodo_idx, entidad, monto, situacion = [], [], [], []
+    for valor, entidades in validos:
+        if not unicos or unicos[-1] != valor:
+            unicos.append(valor)
+        i = len(unicos) - 1
+        for ent in entidades:
+            nombre = ent.get("entidad", "") or ""
+            codigo = codigos.get(nombre)
+            if codigo is None:
+                codigo = codigos[nombre] = len(nombres)
+                nombres.append(nombre)
+            periodo_idx.append(i)
+            entidad.append(codigo)
+            monto.append(ent.get("monto", 0) or 0)
+            situacion.append(ent.get("situacion", 0) or 0)
+
+    return DeudaColumnar(
+        periodos=np.array(unicos, dtype=np.int32),
+        entidades=nombres,
+        periodo_idx=np.array(periodo_idx, dtype=np.int32),
+        entidad=np.array(entidad, dtype=np.int32),
+        monto=np.rint(np.array(monto, dtype=np.float64) * 1000).astype(np.int64),
+        situacion=np.array(situacion, dtype=np.int8),
+    )
+
+
+def como_modelo(periodos):
+    """
+    Acepta un DeudaColumnar ya construido o el JSON crudo de `periodos`.
+    """
+    if isinstance(periodos, DeudaColumnar):
+        return periodos
+    return normalizar_periodos(periodos)
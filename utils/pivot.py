@@ -0,0 +1,78 @@
+# utils/pivot.py
+from utils.modelo_deuda import como_modelo
+
+# Mapeo de iniciales de mes para los encabezados secundarios
+MONTH_LABELS = {
+    "01": "E", "02": "F", "03": "M", "04": "A", "05": "M",
+    "06": "J", "07": "J", "08": "A", "09": "S", "10": "O",
+    "11": "N", "12": "D"
+}
+
+# Estilos de color según situación (las clases bg-sit-N de assets/custom.css usan los mismos)
+SITUATION_STYLES = {
+    2: {"backgroundColor": "#FFE5E5", "color": "#000000"},
+    3: {"backgroundColor": "#FFBFBF", "color": "#000000"},
+    4: {"backgroundColor": "#FF8080", "color": "#FFFFFF"},
+    5: {"backgroundColor": "#FF4C4C", "color": "#FFFFFF"}
+}
+
+# Porcentaje del ancho que se reparten las columnas de meses
+FLEX_MESES = 55
+
+
+class PivotDeuda:
+    """
+    Pivot entidad × período que comparten las grillas (AgGrid y DataTable):
+    se calcula una vez y cada renderer solo traduce la estructura y las
+    reglas de situación a su formato.
+    - col_ids: 'YYYY-MM' del período más reciente al más antiguo
+    - registros: una fila (dict) por entidad, ver DeudaColumnar.pivot
+    - anios: [(anio, [col_id, ...]), ...] para los encabezados agrupados
+    - modelo: el DeudaColumnar de origen
+    Con omitir_vacios se descartan los meses sin ningún registro.
+    """
+    __slots__ = ("modelo", "col_ids", "registros", "anios")
+
+    def __init__(self, modelo, omitir_vacios=False):
+        self.modelo = modelo
+        self.col_ids, self.registros = modelo.pivot()
+        if omitir_vacios:
+            con_registros = set(modelo.periodo_idx.tolist())
+            self.col_ids = [c for i, c in enumerate(self.col_ids) if i in con_registros]
+        self.anios = agrupar_por_anio(self.col_ids)
+
+    def __len__(self):
+        return len(self.col_ids)
+
+    def ancho_mes(self):
+        """
+        Porcentaje de ancho de cada columna de mes.
+        """
+        return FLEX_MESES / len(self.col_ids) if self.col_ids else 0
+
+    def situaciones_por_columna(self):
+        """
+        Pares (col_id, situación) con estilo que aparecen en los datos, para
+        emitir solo las reglas que alguna celda usa.
+        """
+        modelo = self.modelo
+        col_ids = modelo.columnas_pivot()
+        presentes = sorted(set(zip(modelo.periodo_idx.tolist(), modelo.situacion.tolist())))
+        return [(col_ids[i], s) for i, s in presentes if s in SITUATION_STYLES]
+
+
+def agrupar_por_anio(col_ids):
+    """
+    [(anio, [col_id, ...]), ...] respetando el orden de col_ids.
+    """
+    grupos = {}
+    for col_id in col_ids:
+        grupos.setdefault(col_id[:4], []).append(col_id)
+    return list(grupos.items())
+
+
+def armar_pivot(periodos, omitir_vacios=False):
+    """
+    PivotDeuda a partir de un DeudaColumnar o del JSON crudo de `periodos`.
+    """
+    return PivotDeuda(como_modelo(periodos), omitir_vacios)
@@ -1,74 +1,139 @@
 # utils/plot_helpers.py
 
-import plotly.express as px
+import os
 import plotly.graph_objs as go
+import plotly.io as pio
 import textwrap
-from datetime import datetime
+
+import numpy as np
+
+from utils.modelo_deuda import DeudaColumnar, como_modelo
 
 # Paleta corporativa de tres tonos
 CORP_PALETTE = ["#0d6efd", "#DFA83D", "#947F57"]
 
+# Largo desde el que los arreglos viajan tipados (base64) en el JSON de la figura:
+# con pocos puntos convertirlos cuesta más de lo que achican el payload
+MIN_TIPADO = int(os.environ.get("APP_FIGURAS_MIN_TIPADO", 500))
+
+
+def plantilla_figuras():
+    """
+    Template de Plotly que plotly.py agrega a cada figura (para armarlas en el navegador).
+    """
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+
+def _a_plotly(arreglo):
+    """
+    El arreglo tal cual si es largo (Plotly lo tipa) o como lista si es corto.
+    Las fechas datetime64[M] cortas van como "YYYY-MM", igual que tipadas.
+    """
+    if len(arreglo) >= MIN_TIPADO:
+        return arreglo
+    if arreglo.dtype.kind == "M":
+        return np.datetime_as_string(arreglo).tolist()
+    return arreglo.tolist()
+
+
+def _slices_torta(entidades):
+    """
+    (nombres, valores en pesos, situaciones) con monto > 0, ordenados desc.,
+    como arreglos de NumPy (nombres de tipo object, situaciones enteras con
+    0 = sin dato). Con un DeudaColumnar se toma el período más reciente.
+    """
+    if isinstance(entidades, DeudaColumnar):
+        modelo = entidades
+        if not len(modelo.periodos):
+            return None
+        s = modelo.rango(0)
+        valores = modelo.monto[s]
+        positivos = valores > 0
+        valores = valores[positivos]
+        orden = np.argsort(-valores, kind="stable")
+        nombres = np.array(modelo.entidades, dtype=object)[modelo.entidad[s][positivos][orden]]
+        return nombres, valores[orden], modelo.situacion[s][positivos][orden]
+
+    # Lista de entidades de un período (formato de la API); no se modifica
+    data = [e for e in entidades if e.get("monto", 0) > 0]
+    valores = np.array([e["monto"] for e in data], dtype=np.float64) * 1000
+    orden = np.argsort(-valores, kind="stable")
+    nombres = np.array([e["entidad"] for e in data], dtype=object)
+    situaciones = np.array([e.get("situacion") or 0 for e in data], dtype=np.int64)
+    return nombres[orden], valores[orden], situaciones[orden]
+
+
+def _situaciones_hover(situaciones, otros):
+    """
+    Situaciones para el hover: "-" sin dato y "N/A" para "Otros" (el último).
+    """
+    textos = [int(x) if x else "-" for x in situaciones.tolist()]
+    if otros > 0:
+        textos[-1] = "N/A"
+    return textos
+
+
+def _textos_torta(etiquetas, valores, total):
+    """
+    "Nombre (máx 2 renglones)<br>% ($ valor)" de cada slice. Porcentaje y
+    armado del texto vectorizados; el corte de renglones es por etiqueta.
+    """
+    envueltas = ["<br>".join(textwrap.wrap(lbl, width=20)[:2]) for lbl in etiquetas]
+    montos = np.char.replace([f"{v:,}" for v in valores.astype(np.int64).tolist()], ",", ".")
+    porcentajes = np.char.mod("%.1f%%", 100 * valores / total)
+    return np.char.add(
+        np.char.add(np.char.add(np.array(envueltas, dtype=str), "<br>"), porcentajes),
+        np.char.add(np.char.add(" ($ ", montos), ")")
+    )
+
 
 def crear_grafico_torta(entidades):
     """
     - Agrupa en “Otros” todo slice < 3 %.
     - Pull dinámico (0.04) en slices < 10 %.
     - Texto externo con salto de línea (máx 2 renglones) + "% ($valor)".
+    Acepta un DeudaColumnar (usa el último período) o la lista de entidades.
+    Montos y pulls viajan tipados desde MIN_TIPADO slices.
     """
-    # 1) Filtrar y escalar
-    data = [e for e in entidades if e.get("monto", 0) > 0]
-    for e in data:
-        e["_valor"] = e["monto"] * 1000
-
-    # 2) Ordenar desc.
-    data.sort(key=lambda x: x["_valor"], reverse=True)
-    if not data:
+    # 1) Filtrar, escalar y ordenar desc.
+    data = _slices_torta(entidades)
+    if data is None or not len(data[1]):
         return {}
+    nombres, valores, situaciones = data
+    total = valores.sum()
 
-    total = sum(e["_valor"] for e in data)
+    # 2) Agrupar < 3% en “Otros”
+    mayores = valores / total >= 0.03
+    otros = valores[~mayores].sum()
+    labels, sizes, situations = nombres[mayores], valores[mayores], situaciones[mayores]
 
     # 3) Fallback a barras si ≥ 6 categorías
-    if len(data) >= 6:
-        # 1) Agrupar < 3% en “Otros”
-        mayores, otros_sum = [], 0
-        for e in data:
-            if e["_valor"] / total < 0.03:
-                otros_sum += e["_valor"]
-            else:
-                mayores.append((e["entidad"], e["_valor"], e.get("situacion", "-")))
-        if otros_sum > 0:
-            mayores.insert(0, ("Otros", otros_sum, "N/A"))
-
-        # 2) Desempaquetar y reordenar: “Otros” arriba, resto ASC
-        others, *rest = mayores
-        rest_sorted = sorted(rest, key=lambda x: x[-1])
-        ordered = rest_sorted + [others]
-        labels, sizes, situations = zip(*ordered)
-
-        # 3) Textos multilínea
-        wrapped = [textwrap.wrap(lbl, width=20)[:2] for lbl in labels]
-        wrapped_html = ["<br>".join(lines) for lines in wrapped]
-        formatted = [f"{int(v):,}".replace(",", ".") for v in sizes]
-        percent = [f"{100 * v / total:.1f}%" for v in sizes]
-        texts = [
-            f"{wrapped_html[i]}<br>{percent[i]} ($ {formatted[i]})"
-            for i in range(len(labels))
-        ]
-
-        # 4) Gráfico de barras horizontal
-        textpos = ["inside" if v / total >= 0.10 else "outside" for v in sizes]
+    if len(valores) >= 6:
+        # 1) “Otros” (o el mayor) arriba, resto ASC por situación (numérica: 0 = sin dato)
+        if otros > 0:
+            labels = np.insert(labels, 0, "Otros")
+            sizes = np.insert(sizes, 0, otros)
+            situations = np.insert(situations, 0, 0)
+        orden = np.concatenate([1 + np.argsort(situations[1:], kind="stable"), [0]])
+        labels, sizes, situations = labels[orden], sizes[orden], situations[orden]
+
+        # 2) Textos multilínea
+        texts = _textos_torta(labels, sizes, total)
+
+        # 3) Gráfico de barras horizontal
+        textpos = np.where(sizes / total >= 0.10, "inside", "outside")
         fig = go.Figure(
             go.Bar(
-                x=sizes,
-                y=list(labels),
+                x=_a_plotly(sizes),
+                y=labels.tolist(),
                 orientation="h",
-                marker_color=[CORP_PALETTE[i % len(CORP_PALETTE)] for i in range(len(labels))],
+                marker_color=np.resize(CORP_PALETTE, len(labels)).tolist(),
                 marker_line_color="#2D2D2D",
                 marker_line_width=1,
-                text=texts,
-                textposition=textpos,
+                text=_a_plotly(texts),
+                textposition=_a_plotly(textpos),
                 textangle=0,
-                customdata=list(situations),
+                customdata=_situaciones_hover(situations, otros),
                 hovertemplate=(
                     "%{y}<br>"
                     "Situación: %{customdata}<br>"
@@ -77,12 +142,12 @@ def crear_grafico_torta(entidades):
                 ),
             )
         )
-        # 5) Ejes y layout
+        # 4) Ejes y layout
         fig.update_yaxes(
             showticklabels=False,
             title_text="Acreedores",
             categoryorder="array",
-            categoryarray=list(labels)
+            categoryarray=labels.tolist()
         )
         fig.update_xaxes(
             tickformat="~s",
@@ -105,52 +170,41 @@ def crear_grafico_torta(entidades):
         )
         return fig
 
-    # 4) Agrupar < 3% en “Otros”
-    mayores, otros = [], 0
-    for e in data:
-        if e["_valor"] / total < 0.03:
-            otros += e["_valor"]
-        else:
-            mayores.append((e["entidad"], e["_valor"], e.get("situacion", "-")))
+    # 4) “Otros” al final
     if otros > 0:
-        mayores.append(("Otros", otros, "N/A"))
-
-    # 5) Desempaquetar
-    labels = [m[0] for m in mayores]
-    sizes = [m[1] for m in mayores]
-    situations = [m[2] for m in mayores]
-    colors = [CORP_PALETTE[i % 3] for i in range(len(labels))]
-
-    # 6) Pull para <10%
-    pulls = [0.04 if size / total < 0.10 else 0 for size in sizes]
-
-    # 7) Textos multilínea
-    wrapped = [textwrap.wrap(lbl, 20)[:2] for lbl in labels]
-    wrapped_html = ["<br>".join(w) for w in wrapped]
-    formatted = [f"{int(v):,}".replace(",", ".") for v in sizes]
-    percent_vals = [f"{100 * v / total:.1f}%" for v in sizes]
-    texts = [
-        f"{wrapped_html[i]}<br>{percent_vals[i]} ($ {formatted[i]})"
-        for i in range(len(labels))
-    ]
-
-    # 8) Pie
+        labels = np.append(labels, "Otros")
+        sizes = np.append(sizes, otros)
+        situations = np.append(situations, 0)
+    colors = np.resize(CORP_PALETTE, len(labels)).tolist()
+
+    # 5) Pull para <10%
+    pulls = np.where(sizes / total < 0.10, 0.04, 0.0)
+
+    # 6) Textos multilínea
+    texts = _textos_torta(labels, sizes, total)
+
+    # 7) Pie (plotly.express se importa recién acá: no hace falta para el login)
+    import plotly.express as px
     fig = px.pie(
-        values=sizes,
-        names=labels,
+        values=_a_plotly(sizes),
+        names=labels.tolist(),
         hole=0.4,
         color_discrete_sequence=colors
     )
     fig.data[0].rotation = 90
+    # px.pie deja nombres y montos en arreglos de NumPy (y Plotly no reasigna un valor igual)
+    fig.data[0].update(labels=None, values=None)
     fig.update_traces(
-        text=texts,
+        labels=labels.tolist(),
+        values=_a_plotly(sizes),
+        text=_a_plotly(texts),
         textinfo="text",
         textposition="outside",
-        pull=pulls,
+        pull=_a_plotly(pulls),
         textfont=dict(size=10),
         marker=dict(line=dict(color="#2D2D2D", width=1)),
         hovertemplate="Situación: %{customdata}<extra></extra>",
-        customdata=situations
+        customdata=_situaciones_hover(situations, otros)
     )
     try:
         fig.data[0].update(connector=dict(visible=True, line=dict(color="white", width=1)))
@@ -175,24 +229,26 @@ def crear_grafico_torta(entidades):
     return fig
 
 def crear_grafico_evolucion(periodos):
-    if not periodos:
+    """
+    Deuda total por período. Acepta un DeudaColumnar o el JSON crudo de `periodos`.
+    Fechas datetime64[M] y montos float64, tipados en el JSON desde MIN_TIPADO períodos.
+    """
+    modelo = como_modelo(periodos)
+    if not len(modelo.periodos):
         return {}
 
-    # 1) Orden cronológico y parse de fechas
-    sorted_p   = sorted(periodos, key=lambda p: p.get("periodo", ""))
-    period_dates = [datetime.strptime(p["periodo"], "%Y%m") for p in sorted_p]
+    # 1) Orden cronológico: el modelo viene del más reciente al más antiguo
+    period_dates = modelo.fechas()[::-1]
+    eneros = modelo.periodos[::-1] % 100 == 1
 
     # 2) Valores en pesos
-    valores = [
-        sum(e.get("monto", 0) for e in p["entidades"]) * 1000
-        for p in sorted_p
-    ]
+    valores = modelo.totales_por_periodo()[::-1]
 
     # 3) Scatter línea corporativa
     fig = go.Figure(
         go.Scatter(
-            x=period_dates,
-            y=valores,
+            x=_a_plotly(period_dates),
+            y=_a_plotly(valores),
             mode="lines+markers",
             name="Deuda Total",
             line_color="#6da8fd"
@@ -229,8 +285,8 @@ def crear_grafico_evolucion(periodos):
             type="date",
             title_text="",
             tickmode="array",
-            tickvals=[d for d in period_dates if d.month == 1],
-            ticktext=[str(d.year) for d in period_dates if d.month == 1],
+            tickvals=_a_plotly(period_dates[eneros]),
+            ticktext=(modelo.periodos[::-1][eneros] // 100).astype(str).tolist(),
             overlaying="x",
             side="bottom",
             anchor="y",
@@ -0,0 +1,72 @@
+# wsgi.py
+# Punto de entrada de producción: gunicorn -c gunicorn.conf.py (ver ese archivo).
+# La app se arma una sola vez en el proceso maestro y los workers la heredan
+# por copy-on-write al forkearse.
+import gc
+import re
+
+from app import background_manager, server
+from metricas import registro
+
+application = server
+
+
+def precalentar():
+    """
+    Hace en el maestro el trabajo que cada worker pagaría en su primera
+    consulta: setup de Dash (dependencias y layout), compresión de los
+    estáticos, plotly.express y los validadores de plotly que se cargan al
+    armar la primera figura. No sale a la red ni escribe en los caches.
+    """
+    from utils.data_tables_aggrid import crear_pivot_table_aggrid
+    from utils.modelo_deuda import normalizar_periodos
+    from utils.plot_helpers import crear_grafico_evolucion, crear_grafico_torta
+
+    cliente = server.test_client()
+    for ruta in ("/_dash-layout", "/_dash-dependencies"):
+        cliente.get(ruta)
+
+    # Estáticos de la página ya comprimidos (compresion.precomprimidos) para todos los workers
+    pagina = cliente.get("/").get_data(as_text=True)
+    for url in re.findall(r'(?:src|href)="(/[^"]+)"', pagina):
+        for codificacion in ("br", "gzip"):
+            cliente.get(url, headers={"Accept-Encoding": codificacion})
+
+    # Torta con pocas entidades (px.pie) y con muchas (barras), evolución y pivot
+    for n_entidades in (3, 7):
+        modelo = normalizar_periodos([
+            {"periodo": periodo, "entidades": [
+                {"entidad": f"ENTIDAD {i}", "monto": 10.0 * (i + 1), "situacion": 1 + i % 5}
+                for i in range(n_entidades)
+            ]}
+            for periodo in ("202402", "202401")
+        ])
+        crear_grafico_torta(modelo)
+        crear_grafico_evolucion(modelo)
+        crear_pivot_table_aggrid(modelo).to_plotly_json()
+
+    # Lo cargado hasta acá no se vuelve a recorrer en el GC: así los workers no
+    # tocan (y copian) esas páginas de memoria
+    gc.collect()
+    gc.freeze()
+
+
+def al_forkear():
+    """
+    En cada worker recién forkeado: no reutilizar conexiones abiertas por el
+    maestro (la de SQLite del administrador de jobs se reabre sola al usarla)
+    y crear el pool de jobs mientras el worker tiene un solo thread.
+    """
+    if background_manager is not None:
+        background_manager.handle.close()
+        background_manager.iniciar()
+
+
+def al_terminar():
+    """
+    Al salir un worker: publica las métricas que le queden pendientes.
+    """
+    registro.publicar()
+
+
+precalentar()